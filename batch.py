@@ -0,0 +1,237 @@
+"""
+Headless Batch Simulation
+Runs many independent scenarios (seeds x light timings x signal control x demand) faster than real time
+across a process pool, with no server, and streams aggregate results to disk
+
+Each scenario steps a TrafficSimulator with server-side physics at a fixed dt
+and reports, per reporting window: arrivals, departures (throughput), average
+wait per departed vehicle and queue lengths per approach.
+
+Usage:
+    python batch.py --hours 24 --seeds 8 --green 20,30,45 --workers 4
+    python batch.py --controller fixed,actuated --event "Rush Hour,Accident"
+    python batch.py --demand classic,poisson,platoon --start-hour 6
+    python batch.py --out results.jsonl
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+from demand import DEMAND_MODELS, make_demand
+from traffic_simulation import (
+    DIRECTIONS,
+    EVENTS,
+    ActuatedLightController,
+    TrafficLightController,
+    TrafficSimulator,
+)
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_DT = 0.1          # seconds per step, the live server's physics tick
+DEFAULT_WINDOW = 3600     # seconds of simulated time per result row
+DEFAULT_INTERVAL = 60     # seconds between vehicle batches, as in traffic.py
+
+CONTROLLERS = {"fixed": TrafficLightController, "actuated": ActuatedLightController}
+# Scenario event names; "Normal" is no event, and a scenario without one draws from EVENTS as usual
+EVENTS_BY_NAME = {"Normal": None, **{event["name"]: event for event in EVENTS if event}}
+
+
+# ============================================================================
+#  SCENARIOS
+# ============================================================================
+
+def make_scenarios(seeds, greens, yellows, base_seed=0, controllers=("fixed",), events=(None,),
+                   demands=("classic",)):
+    """One scenario per (controller, event, demand, green, yellow, seed index), each with its own derived seed.
+
+    Seeds come from a SeedSequence over base_seed, so a scenario's random stream
+    depends only on its replicate index, not on which worker runs it. Replicates
+    share seeds across controllers, events, demand models and timings for paired comparisons.
+    """
+    configs = list(itertools.product(controllers, events, demands, greens, yellows, range(seeds)))
+    children = np.random.SeedSequence(base_seed).spawn(seeds)
+    return [
+        {
+            "scenario": index,
+            "seed": int(children[replicate].generate_state(1)[0]),
+            "controller": controller,
+            "event": event,
+            "demand": demand,
+            "green": green,
+            "yellow": yellow,
+            "replicate": replicate,
+        }
+        for index, (controller, event, demand, green, yellow, replicate) in enumerate(configs)
+    ]
+
+
+# ============================================================================
+#  SCENARIO RUNNER
+# ============================================================================
+
+def run_scenario(scenario, duration, dt=DEFAULT_DT, window=DEFAULT_WINDOW, interval=DEFAULT_INTERVAL,
+                 start_hour=0.0):
+    """Simulate one scenario for duration seconds from start_hour (the demand profile's clock).
+    Returns (result rows, wall seconds)."""
+    started = time.perf_counter()
+    controller = CONTROLLERS[scenario["controller"]](scenario["green"], scenario["yellow"])
+    event = scenario["event"]
+    simulator = TrafficSimulator(interval=interval, physics=True, seed=scenario["seed"],
+                                 controller=controller,
+                                 events=None if event is None else [EVENTS_BY_NAME[event]],
+                                 demand=make_demand(scenario["demand"], scenario["seed"], start_hour))
+    vehicles = simulator.vehicles
+    num_directions = len(DIRECTIONS)
+
+    steps_per_interval = max(1, round(interval / dt))
+    steps_per_window = max(1, round(window / dt))
+    total_steps = round(duration / dt)
+
+    rows = []
+    arrivals = departures = 0
+    queue_sum = np.zeros(num_directions, dtype=np.int64)
+    queue_max = np.zeros(num_directions, dtype=np.int64)
+    window_steps = 0
+
+    for step in range(total_steps):
+        if step % steps_per_interval == 0:
+            before = simulator.vehicle_counter
+            simulator.generate_state()
+            arrivals += simulator.vehicle_counter - before
+
+        simulator.update_lights(dt)
+        departures += simulator.update_vehicles(dt)
+
+        queues = np.bincount(vehicles.direction[vehicles.waiting], minlength=num_directions)
+        queue_sum += queues
+        np.maximum(queue_max, queues, out=queue_max)
+        window_steps += 1
+
+        if window_steps == steps_per_window or step == total_steps - 1:
+            window_seconds = window_steps * dt
+            # Every queued vehicle waits dt per step, so the queue integral is total wait time
+            wait_seconds = float(queue_sum.sum()) * dt
+            rows.append({
+                **scenario,
+                "window_start": round((step + 1 - window_steps) * dt, 6),
+                "window_end": round((step + 1) * dt, 6),
+                "arrivals": arrivals,
+                "departures": departures,
+                "throughput_per_hour": departures * 3600 / window_seconds,
+                "avg_wait_s": wait_seconds / departures if departures else 0.0,
+                "mean_queue": dict(zip(DIRECTIONS, (queue_sum / window_steps).tolist())),
+                "max_queue": dict(zip(DIRECTIONS, queue_max.tolist())),
+            })
+            arrivals = departures = window_steps = 0
+            queue_sum[:] = 0
+            queue_max[:] = 0
+
+    return rows, time.perf_counter() - started
+
+
+def _run_job(job):
+    """Pool entry point: unpack (scenario, options) and tag the result with the scenario."""
+    scenario, options = job
+    rows, wall_seconds = run_scenario(scenario, **options)
+    return scenario, rows, wall_seconds
+
+
+# ============================================================================
+#  BATCH
+# ============================================================================
+
+def run_batch(scenarios, duration, out_path, workers=None, dt=DEFAULT_DT, window=DEFAULT_WINDOW,
+              interval=DEFAULT_INTERVAL, start_hour=0.0):
+    """Run scenarios across a process pool, appending result rows to out_path as each finishes.
+
+    Returns a summary with total simulated seconds, wall seconds and the
+    headline simulated-seconds-per-wall-second rate.
+    """
+    workers = workers or os.cpu_count() or 1
+    options = {"duration": duration, "dt": dt, "window": window, "interval": interval, "start_hour": start_hour}
+    jobs = [(scenario, options) for scenario in scenarios]
+
+    started = time.perf_counter()
+    context = multiprocessing.get_context("spawn")
+    with open(out_path, "w") as out, context.Pool(workers) as pool:
+        for scenario, rows, wall_seconds in pool.imap_unordered(_run_job, jobs):
+            for row in rows:
+                out.write(json.dumps(row) + "\n")
+            out.flush()
+            logger.info(f"Scenario {scenario['scenario']} ({scenario['controller']}, "
+                        f"green {scenario['green']}s, seed {scenario['seed']}) done in {wall_seconds:.1f}s, "
+                        f"{duration / wall_seconds:,.0f} sim-s/s")
+    wall_seconds = time.perf_counter() - started
+
+    simulated = duration * len(scenarios)
+    return {
+        "scenarios": len(scenarios),
+        "workers": workers,
+        "simulated_seconds": simulated,
+        "wall_seconds": wall_seconds,
+        "sim_seconds_per_wall_second": simulated / wall_seconds,
+    }
+
+
+def parse_list(text, cast=float):
+    """Parse a comma-separated list (of numbers, by default)."""
+    return [cast(value) for value in text.split(",") if value]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless faster-than-real-time traffic simulation")
+    parser.add_argument("--hours", type=float, default=24, help="simulated hours per scenario")
+    parser.add_argument("--seeds", type=int, default=4, help="random replicates per light timing")
+    parser.add_argument("--green", default="30", help="comma-separated green durations (s)")
+    parser.add_argument("--yellow", default="3", help="comma-separated yellow durations (s)")
+    parser.add_argument("--controller", default="fixed", help="comma-separated: fixed, actuated")
+    parser.add_argument("--event", default=None,
+                        help=f"comma-separated events to hold fixed ({', '.join(EVENTS_BY_NAME)}); "
+                             f"default draws a random event each interval")
+    parser.add_argument("--demand", default="classic", help=f"comma-separated: {', '.join(DEMAND_MODELS)}")
+    parser.add_argument("--start-hour", type=float, default=0.0, help="time of day the demand profile starts at")
+    parser.add_argument("--base-seed", type=int, default=0, help="root seed for every scenario")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: CPU count)")
+    parser.add_argument("--dt", type=float, default=DEFAULT_DT, help="simulation step (s)")
+    parser.add_argument("--window", type=float, default=DEFAULT_WINDOW, help="seconds per result row")
+    parser.add_argument("--out", default="batch_results.jsonl", help="JSON Lines output path")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+
+    controllers = parse_list(args.controller, str)
+    events = parse_list(args.event, str) if args.event else [None]
+    demands = parse_list(args.demand, str)
+    for name in controllers:
+        if name not in CONTROLLERS:
+            parser.error(f"unknown controller '{name}'")
+    for name in events:
+        if name is not None and name not in EVENTS_BY_NAME:
+            parser.error(f"unknown event '{name}'")
+    for name in demands:
+        if name not in DEMAND_MODELS:
+            parser.error(f"unknown demand model '{name}'")
+    scenarios = make_scenarios(args.seeds, parse_list(args.green), parse_list(args.yellow), args.base_seed,
+                               controllers, events, demands)
+    logger.info(f"Running {len(scenarios)} scenarios of {args.hours}h each, writing {args.out}")
+    summary = run_batch(scenarios, args.hours * 3600, args.out, args.workers, args.dt, args.window,
+                        start_hour=args.start_hour)
+    logger.info(f"{summary['simulated_seconds']:,.0f} simulated seconds in {summary['wall_seconds']:.1f}s "
+                f"on {summary['workers']} workers: {summary['sim_seconds_per_wall_second']:,.0f} sim-s/s")
+
+
+if __name__ == "__main__":
+    main()
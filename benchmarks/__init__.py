@@ -0,0 +1,4 @@
+"""
+Benchmarks for the traffic simulation server
+Run from the repository root, e.g. `python -m benchmarks.broadcast_bench`
+"""
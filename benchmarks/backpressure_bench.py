@@ -0,0 +1,208 @@
+"""
+Slow-Consumer Benchmark
+Runs a live server in its own process (physics on, heavy demand so frames are
+large, vehicles broadcast at a high rate) with healthy clients alongside a few
+stalled ones: raw sockets that complete the
+WebSocket handshake with a tiny receive buffer and then never read. Once per
+SLOW_CLIENT_POLICY it reports:
+- the healthy clients' delivery latency and lost frames
+- the largest transport write buffer any client reached, and the server's RSS
+- what happened to the stalled clients (congestion events, frames coalesced,
+  disconnects, still connected at the end)
+
+Usage:
+    python -m benchmarks.backpressure_bench [policy,...]
+"""
+
+import asyncio
+import base64
+import json
+import logging
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import aiohttp
+
+from benchmarks.load_test import (
+    HOST, ROOT, free_port, percentile, process_stats, raise_file_limit, scrape_counters, wait_ready,
+)
+from demand import FLAT_PROFILE, DemandModel, turning_od
+from server import SLOW_CLIENT_POLICIES, WebSocketServer
+from traffic_simulation import TrafficSimulator
+
+
+HEALTHY = 50
+STALLED = 10
+DURATION = 30
+SAMPLE_EVERY = 0.5
+STALLED_RCVBUF = 4096
+HEAVY_FLOW = 300  # vehicles/min per approach, enough to keep every approach queued
+
+
+# ============================================================================
+#  SERVER PROCESS
+# ============================================================================
+
+def serve(port):
+    """Server process: a physics simulator under HEAVY_FLOW demand (traffic.py has no flow setting)."""
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    demand = DemandModel(turning_od(HEAVY_FLOW), profile=FLAT_PROFILE, seed=0)
+    simulator = TrafficSimulator(interval=60, physics=True, seed=0, demand=demand)
+    asyncio.run(WebSocketServer(simulator, host=HOST, port=port).run())
+
+
+def start_server(port, policy, log_path):
+    env = dict(os.environ)
+    env.update({
+        "MAX_CLIENTS": str(HEALTHY + STALLED + 10),
+        "PHYSICS_HZ": "50",
+        "VEHICLE_BROADCAST_HZ": "50",
+        "WS_COMPRESSION": "off",  # Full-size frames fill a stalled socket sooner
+        "SLOW_CLIENT_POLICY": policy,
+        "RATE_LIMIT_ENABLED": "0",
+        "ALLOWED_ORIGINS": "",
+        "WORKERS": "0",
+        "CHECKPOINT_PATH": "",  # Every run starts from a fresh simulation
+    })
+    log = open(log_path, "w")
+    return subprocess.Popen([sys.executable, "-m", "benchmarks.backpressure_bench", "--serve", str(port)],
+                            cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+async def scrape_client_peaks(session, base_url, peaks):
+    """Fold the per-client gauges' largest values into peaks (metric name -> max)."""
+    async with session.get(f"{base_url}/metrics", params={"format": "prometheus"}) as response:
+        text = await response.text()
+    for line in text.splitlines():
+        if line.startswith("traffic_client_") and "{" in line:
+            name = line.split("{", 1)[0]
+            peaks[name] = max(peaks.get(name, 0), float(line.rsplit(" ", 1)[1]))
+
+
+# ============================================================================
+#  CLIENTS
+# ============================================================================
+
+async def stalled_client(port):
+    """Open a WebSocket by hand on a socket with a tiny receive buffer, then never read from it."""
+    loop = asyncio.get_running_loop()
+    sock = socket.socket()
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, STALLED_RCVBUF)
+    sock.setblocking(False)
+    await loop.sock_connect(sock, (HOST, port))
+    key = base64.b64encode(os.urandom(16)).decode()
+    await loop.sock_sendall(sock, (
+        f"GET / HTTP/1.1\r\nHost: {HOST}:{port}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+        f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n"
+    ).encode())
+    response = b""
+    while b"\r\n\r\n" not in response:
+        chunk = await loop.sock_recv(sock, 1024)
+        if not chunk:
+            raise RuntimeError("stalled client refused")
+        response += chunk
+    return sock
+
+
+async def healthy_client(session, url, stats, recording):
+    """Read everything, recording latency and Seq gaps while recording is set."""
+    last_seq = None
+    async with session.ws_connect(url) as ws:
+        async for msg in ws:
+            received_ms = time.time() * 1000
+            data = json.loads(msg.data)
+            seq = data.get("Seq")
+            if recording.is_set():
+                stats["latencies"].append(received_ms - data["ServerTime"])
+                if last_seq is not None and seq > last_seq + 1:
+                    stats["lost"] += seq - last_seq - 1
+            last_seq = seq
+
+
+# ============================================================================
+#  BENCHMARK
+# ============================================================================
+
+async def run_policy(policy):
+    port = free_port()
+    base_url = f"http://{HOST}:{port}"
+    server = start_server(port, policy, os.path.join(ROOT, "backpressure_bench.server.log"))
+    stats = {"latencies": [], "lost": 0}
+    peaks = {}
+    recording = asyncio.Event()
+    stalled = []
+    try:
+        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0)) as session:
+            await wait_ready(session, base_url)
+            healthy = [asyncio.create_task(healthy_client(session, base_url + "/", stats, recording))
+                       for _ in range(HEALTHY)]
+            stalled = [await stalled_client(port) for _ in range(STALLED)]
+            await asyncio.sleep(1)
+            before = await scrape_counters(session, base_url)
+            baseline_rss, _ = process_stats(server.pid)
+            peak_rss = baseline_rss
+
+            recording.set()
+            deadline = time.monotonic() + DURATION
+            while time.monotonic() < deadline:
+                await asyncio.sleep(SAMPLE_EVERY)
+                await scrape_client_peaks(session, base_url, peaks)
+                peak_rss = max(peak_rss, process_stats(server.pid)[0])
+            recording.clear()
+
+            after = await scrape_counters(session, base_url)
+            for task in healthy:
+                task.cancel()
+            await asyncio.gather(*healthy, return_exceptions=True)
+    finally:
+        for sock in stalled:
+            sock.close()
+        server.terminate()
+        server.wait()
+
+    def delta(name):
+        return int(after.get(name, 0) - before.get(name, 0))
+
+    latencies = sorted(stats["latencies"])
+    return {
+        "p50": statistics.median(latencies) if latencies else 0,
+        "p99": percentile(latencies, 0.99) or 0,
+        "messages": len(latencies),
+        "lost": stats["lost"],
+        "buffer_kb": peaks.get("traffic_client_write_buffer_bytes", 0) / 1024,
+        "lag": int(peaks.get("traffic_client_lag_messages", 0)),
+        "rss_growth_mb": (peak_rss - baseline_rss) / 2**20,
+        "congested": delta("traffic_clients_congested_total"),
+        "coalesced": delta("traffic_frames_coalesced_total"),
+        "disconnected": delta("traffic_slow_clients_disconnected_total"),
+        "dropped": delta("traffic_frames_dropped_total"),
+        "stalled_left": int(after.get("traffic_connected_clients", 0)) - HEALTHY,
+    }
+
+
+async def run_all(policies):
+    print(f"{HEALTHY} healthy and {STALLED} stalled clients, {DURATION}s with physics broadcasts at 50 Hz")
+    print(f"{'policy':>10} {'p50 ms':>7} {'p99 ms':>7} {'msgs':>6} {'lost':>5} {'max buf kB':>11} "
+          f"{'max lag':>8} {'RSS +MB':>8} {'congested':>10} {'coalesced':>10} {'dropped':>8} "
+          f"{'kicked':>7} {'stalled left':>13}")
+    for policy in policies:
+        r = await run_policy(policy)
+        print(f"{policy:>10} {r['p50']:>7.1f} {r['p99']:>7.1f} {r['messages']:>6} {r['lost']:>5} "
+              f"{r['buffer_kb']:>11.0f} {r['lag']:>8} {r['rss_growth_mb']:>8.1f} {r['congested']:>10} "
+              f"{r['coalesced']:>10} {r['dropped']:>8} {r['disconnected']:>7} {r['stalled_left']:>13}")
+
+
+def main():
+    if sys.argv[1:2] == ["--serve"]:
+        serve(int(sys.argv[2]))
+        return
+    raise_file_limit()
+    asyncio.run(run_all(sys.argv[1].split(",") if len(sys.argv) > 1 else SLOW_CLIENT_POLICIES))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""
+Batch Simulation Benchmark
+Headline rate of the headless batch mode: simulated seconds per wall second,
+for one worker and for one worker per CPU.
+
+Usage:
+    python -m benchmarks.batch_bench
+"""
+
+import os
+import tempfile
+
+from batch import make_scenarios, run_batch
+
+
+SIMULATED_SECONDS = 1800  # per scenario
+SCENARIOS_PER_WORKER = 2
+
+
+def main():
+    cpus = os.cpu_count() or 1
+    print(f"{SIMULATED_SECONDS}s simulated per scenario, {cpus} CPUs")
+    print(f"{'workers':>8} {'scenarios':>10} {'wall s':>8} {'sim-s/s':>10}")
+    for workers in sorted({1, cpus}):
+        scenarios = make_scenarios(SCENARIOS_PER_WORKER * workers, [30], [3])
+        with tempfile.NamedTemporaryFile(suffix=".jsonl") as out:
+            summary = run_batch(scenarios, SIMULATED_SECONDS, out.name, workers)
+        print(f"{workers:>8} {len(scenarios):>10} {summary['wall_seconds']:>8.2f} "
+              f"{summary['sim_seconds_per_wall_second']:>10,.0f}")
+
+
+if __name__ == "__main__":
+    main()
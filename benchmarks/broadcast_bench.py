@@ -0,0 +1,121 @@
+"""
+Broadcast Fan-out Benchmark
+Measures WebSocketServer.broadcast latency at 10/100/1000 clients,
+comparing the per-client send_json loop with the serialize-once fan-out.
+
+Usage:
+    python -m benchmarks.broadcast_bench
+"""
+
+import asyncio
+import statistics
+import time
+
+from protocol import encode_message, make_snapshot
+from server import ClientConnection, WebSocketServer
+from traffic_simulation import TrafficSimulator
+
+
+CLIENT_COUNTS = [10, 100, 1000]
+ROUNDS = 20
+SLOW_CLIENT_DELAY = 0.05  # seconds per send for the single slow client
+
+
+# ============================================================================
+#  FAKE SOCKETS
+# ============================================================================
+
+class FakeWebSocket:
+    """Minimal stand-in for aiohttp's WebSocketResponse that records deliveries."""
+    
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.closed = False
+        self.received = 0
+        self.on_receive = None
+    
+    async def _deliver(self):
+        await asyncio.sleep(self.delay)
+        self.received += 1
+        if self.on_receive:
+            self.on_receive()
+    
+    async def send_str(self, data):
+        await self._deliver()
+    
+    async def send_json(self, data):
+        encode_message(data)
+        await self._deliver()
+    
+    async def close(self):
+        self.closed = True
+
+
+def legacy_broadcast(sockets):
+    """The original broadcast: encode and await every client in turn."""
+    async def broadcast(state):
+        for ws in sockets:
+            await ws.send_json(state)
+    return broadcast
+
+
+# ============================================================================
+#  BENCHMARK
+# ============================================================================
+
+async def measure(num_clients, fanout, slow_client=False):
+    """Return per-round latencies (ms) until every fast client received the state."""
+    simulator = TrafficSimulator()
+    server = WebSocketServer(simulator)
+    state = make_snapshot(simulator.generate_state(), 1)
+    
+    sockets = [FakeWebSocket() for _ in range(num_clients)]
+    if slow_client:
+        sockets[0].delay = SLOW_CLIENT_DELAY
+    fast_sockets = [ws for ws in sockets if ws.delay == 0]
+    
+    if fanout:
+        for ws in sockets:
+            client = ClientConnection(ws, "bench", queue_size=ROUNDS)
+            client.start()
+            server.clients.add(client)
+        broadcast = server.broadcast
+    else:
+        broadcast = legacy_broadcast(sockets)
+    
+    latencies = []
+    for round_index in range(ROUNDS):
+        done = asyncio.Event()
+        expected = round_index + 1
+        
+        def check():
+            if all(ws.received >= expected for ws in fast_sockets):
+                done.set()
+        
+        for ws in fast_sockets:
+            ws.on_receive = check
+        
+        start = time.perf_counter()
+        await broadcast(state)
+        await done.wait()
+        latencies.append((time.perf_counter() - start) * 1000)
+    
+    for client in list(server.clients):
+        await client.close()
+    return latencies
+
+
+async def main():
+    print(f"{'clients':>8} {'mode':>8} {'slow':>5} {'median ms':>10} {'p95 ms':>8}")
+    for num_clients in CLIENT_COUNTS:
+        for slow_client in (False, True):
+            for fanout in (False, True):
+                latencies = sorted(await measure(num_clients, fanout, slow_client))
+                p95 = latencies[int(len(latencies) * 0.95) - 1]
+                mode = "fanout" if fanout else "legacy"
+                print(f"{num_clients:>8} {mode:>8} {str(slow_client):>5} "
+                      f"{statistics.median(latencies):>10.2f} {p95:>8.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,214 @@
+"""
+Checkpoint Benchmark
+Measures simulation checkpoints (see checkpoint.py and WebSocketServer):
+- in process, for a heavy-demand physics simulation: the event loop's cost to
+  capture a checkpoint, the cost to serialize and durably write it, its size,
+  and how long a restore takes after various downtimes
+- end to end: runs traffic.py with physics, kills it (SIGKILL, like a crash),
+  restarts it a few seconds later and compares the first snapshot after the
+  restart with where the old server's lights and vehicles were heading; once
+  restoring from the checkpoint and once as a cold start
+
+Usage:
+    python -m benchmarks.checkpoint_bench
+"""
+
+import asyncio
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import aiohttp
+
+from benchmarks.load_test import HOST, ROOT, free_port, scrape_counters, wait_ready
+from checkpoint import save_checkpoint
+from demand import FLAT_PROFILE, DemandModel, turning_od
+from server import WebSocketServer
+from traffic_simulation import TrafficLightController, TrafficSimulator
+
+
+HEAVY_FLOW = 300  # vehicles/min per approach
+WARMUP = 60       # simulated seconds before the in-process measurements
+REPEATS = 50
+DOWNTIMES = (0, 10, 60, 600, 86400)
+RUN_BEFORE_KILL = 8
+DOWNTIME = 3
+
+
+# ============================================================================
+#  IN PROCESS
+# ============================================================================
+
+def heavy_server(path):
+    demand = DemandModel(turning_od(HEAVY_FLOW), profile=FLAT_PROFILE, seed=0)
+    server = WebSocketServer(TrafficSimulator(interval=60, physics=True, seed=0, demand=demand))
+    server.checkpoint_path = path
+    return server
+
+
+def warmed_up_server(path):
+    server = heavy_server(path)
+    server.regenerate_state()
+    for _ in range(int(WARMUP * server.physics_hz)):
+        server.advance(1.0 / server.physics_hz)
+    return server
+
+
+def in_process():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "checkpoint.json")
+        server = warmed_up_server(path)
+        captures, writes = [], []
+        for _ in range(REPEATS):
+            started = time.perf_counter()
+            data = server.checkpoint_state(30.0)
+            captured = time.perf_counter()
+            size = save_checkpoint(path, data)
+            captures.append(captured - started)
+            writes.append(time.perf_counter() - captured)
+        print(f"Heavy-demand physics ({len(server.simulator.vehicles)} vehicles on the road, "
+              f"{len(server.simulator.pending or [])} pending), median of {REPEATS}")
+        print(f"  capture on the loop: {statistics.median(captures) * 1000:.2f} ms")
+        print(f"  serialize + fsync + rename off the loop: {statistics.median(writes) * 1000:.2f} ms")
+        print(f"  checkpoint size: {size / 1024:.0f} KiB")
+
+        print(f"{'downtime s':>11} {'restore ms':>11} {'interval':>9}")
+        for downtime in DOWNTIMES:
+            data = server.checkpoint_state(30.0)
+            data["saved_at"] -= downtime
+            save_checkpoint(path, data)
+            restored = heavy_server(path)
+            started = time.perf_counter()
+            remaining = restored.restore_checkpoint()
+            elapsed = time.perf_counter() - started
+            print(f"{downtime:>11} {elapsed * 1000:>11.1f} {'resumed' if remaining else 'new':>9}")
+
+
+# ============================================================================
+#  END TO END: KILL AND RESTART
+# ============================================================================
+
+def start_server(port, checkpoint_path, log):
+    env = dict(os.environ)
+    env.update({
+        "PORT": str(port),
+        "SERVER_PHYSICS": "1",
+        "DEMAND_MODEL": "poisson",
+        "DEMAND_START_HOUR": "8",  # Morning peak, so vehicles are on the road
+        "CHECKPOINT_PATH": checkpoint_path,
+        "CHECKPOINT_INTERVAL": "1",
+        "RATE_LIMIT_ENABLED": "0",
+        "ALLOWED_ORIGINS": "",
+        "WORKERS": "0",
+    })
+    return subprocess.Popen([sys.executable, "traffic.py"], cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+async def watch(session, url, seconds, seen):
+    """Track the latest light records, vehicle IDs and Seq for a while; returns the first snapshot."""
+    first = None
+    deadline = time.monotonic() + seconds
+    async with session.ws_connect(url) as ws:
+        while time.monotonic() < deadline:
+            try:
+                msg = await ws.receive(timeout=deadline - time.monotonic())
+            except asyncio.TimeoutError:
+                break
+            if msg.type != aiohttp.WSMsgType.TEXT:
+                break
+            data = json.loads(msg.data)
+            first = first or data
+            seen["seq"] = data["Seq"]
+            for light in data.get("Lights") or []:
+                seen["lights"][light["Sens"]] = light
+            seen["ids"].update(vehicle["Id"] for vehicle in data.get("Vehicles") or [])
+    return first
+
+
+def predicted_lights(lights, at_ms):
+    """(color, ExpiresAt) of the lights last seen as of at_ms, if the server had kept running."""
+    controller = TrafficLightController()
+    reference_ms = max(light["ExpiresAt"] - light["TimerMs"] for light in lights.values())
+    for direction, light in lights.items():
+        controller.lights[direction] = {"color": light["Couleur"], "timer": (light["ExpiresAt"] - reference_ms) / 1000}
+    controller.update((at_ms - reference_ms) / 1000)
+    return {d: (light["color"], at_ms + int(max(0.0, light["timer"]) * 1000)) for d, light in controller.lights.items()}
+
+
+async def kill_and_restart(warm):
+    port = free_port()
+    base_url = f"http://{HOST}:{port}"
+    log = open(os.path.join(ROOT, "checkpoint_bench.server.log"), "w")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "checkpoint.json")
+        server = start_server(port, path, log)
+        before = {"lights": {}, "ids": set()}
+        after = {"lights": {}, "ids": set()}
+        try:
+            async with aiohttp.ClientSession() as session:
+                await wait_ready(session, base_url)
+                await watch(session, base_url + "/", RUN_BEFORE_KILL, before)
+                counters = await scrape_counters(session, base_url)
+                server.kill()
+                server.wait()
+                await asyncio.sleep(DOWNTIME)
+
+                log.write("---- restart ----\n")
+                log.flush()
+                started = time.monotonic()
+                server = start_server(port, path if warm else "", log)
+                await wait_ready(session, base_url, timeout=30)
+                ready_ms = (time.monotonic() - started) * 1000
+                snapshot = await watch(session, base_url + "/", 1, after)
+        finally:
+            server.kill()
+            server.wait()
+            log.close()
+
+    with open(os.path.join(ROOT, "checkpoint_bench.server.log")) as f:
+        restored = re.search(r"Restored checkpoint .* in (\d+) ms", f.read())
+    expected = predicted_lights(before["lights"], snapshot["ServerTime"])
+    lights = {light["Sens"]: light for light in snapshot["Lights"]}
+    ids = [vehicle["Id"] for vehicle in snapshot["Vehicles"]]
+    return {
+        "ready_ms": ready_ms,
+        "restore_ms": int(restored.group(1)) if restored else None,
+        "colors_match": all(lights[d]["Couleur"] == expected[d][0] for d in expected),
+        "expires_drift_ms": max(abs(lights[d]["ExpiresAt"] - expected[d][1]) for d in expected),
+        "seq": (before["seq"], snapshot["Seq"]),
+        "max_id_before": max(before["ids"], default=0),
+        "ids_after": (min(ids, default=0), max(ids, default=0)),
+        "carried_over": len(set(ids) & before["ids"]),
+        "vehicles_after": len(ids),
+        "capture_ms": counters.get("traffic_checkpoint_capture_seconds_sum", 0)
+                      / max(1, counters.get("traffic_checkpoint_capture_seconds_count", 0)) * 1000,
+        "write_ms": counters.get("traffic_checkpoint_write_seconds_sum", 0)
+                    / max(1, counters.get("traffic_checkpoint_write_seconds_count", 0)) * 1000,
+    }
+
+
+async def end_to_end():
+    print(f"\ntraffic.py with physics: killed after {RUN_BEFORE_KILL}s, restarted {DOWNTIME}s later")
+    print(f"{'start':>6} {'ready ms':>9} {'restore ms':>11} {'lights':>8} {'drift ms':>9} {'Seq':>11} "
+          f"{'max ID before':>14} {'IDs after':>10} {'carried over':>13}")
+    for warm in (True, False):
+        r = await kill_and_restart(warm)
+        print(f"{'warm' if warm else 'cold':>6} {r['ready_ms']:>9.0f} {r['restore_ms'] or '-':>11} "
+              f"{'match' if r['colors_match'] else 'differ':>8} {r['expires_drift_ms']:>9} "
+              f"{'%d->%d' % r['seq']:>11} {r['max_id_before']:>14} {'%d-%d' % r['ids_after']:>10} "
+              f"{r['carried_over']:>6}/{r['vehicles_after']:<6}")
+    print(f"while running: capture {r['capture_ms']:.2f} ms on the loop, write {r['write_ms']:.2f} ms off it, per checkpoint")
+
+
+def main():
+    in_process()
+    asyncio.run(end_to_end())
+
+
+if __name__ == "__main__":
+    main()
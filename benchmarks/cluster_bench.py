@@ -0,0 +1,80 @@
+"""
+Broadcaster Cluster Benchmark
+Starts the simulator publisher plus N broadcaster workers on one local port,
+attaches clients, and reports delivery latency (from ServerTime) and the
+aggregated /metrics for 1 and 4 workers.
+
+Usage:
+    python -m benchmarks.cluster_bench
+"""
+
+import asyncio
+import json
+import os
+import statistics
+import time
+
+import aiohttp
+
+from bus import run_cluster
+from traffic_simulation import TrafficSimulator
+
+
+HOST = "127.0.0.1"
+PORT = 8790
+WORKER_COUNTS = [1, 4]
+NUM_CLIENTS = 400
+DURATION = 6  # seconds of traffic to measure
+INTERVAL = 2  # seconds per state update, so snapshots are included
+
+
+async def client(session, index, latencies, stop_at):
+    """Connect as a distinct forwarded IP and record delivery latency of every message."""
+    headers = {"X-Forwarded-For": f"10.{index // 65536}.{index // 256 % 256}.{index % 256}"}
+    async with session.ws_connect(f"http://{HOST}:{PORT}/", headers=headers) as ws:
+        while time.time() < stop_at:
+            try:
+                msg = await asyncio.wait_for(ws.receive(), stop_at - time.time())
+            except asyncio.TimeoutError:
+                break
+            if msg.type != aiohttp.WSMsgType.TEXT:
+                break
+            latencies.append(time.time() * 1000 - json.loads(msg.data)["ServerTime"])
+
+
+async def measure(workers):
+    bus_path = f"/tmp/traffic-bench-bus-{os.getpid()}.sock"
+    cluster = asyncio.create_task(
+        run_cluster(TrafficSimulator(interval=INTERVAL), HOST, PORT, workers, bus_path))
+    await asyncio.sleep(3)  # let the worker processes start and attach
+
+    latencies = []
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0)) as session:
+        stop_at = time.time() + DURATION
+        await asyncio.gather(*[client(session, i, latencies, stop_at) for i in range(NUM_CLIENTS)])
+        async with session.get(f"http://{HOST}:{PORT}/metrics") as response:
+            metrics = await response.json()
+
+    cluster.cancel()
+    try:
+        await cluster
+    except asyncio.CancelledError:
+        pass
+    return latencies, metrics
+
+
+async def main():
+    os.environ["MAX_CLIENTS"] = str(NUM_CLIENTS)  # per worker; inherited by spawned workers
+    os.environ["CHECKPOINT_PATH"] = ""  # Every run starts from a fresh simulation
+    print(f"{'workers':>8} {'messages':>9} {'median ms':>10} {'p99 ms':>8}  metrics")
+    for workers in WORKER_COUNTS:
+        latencies, metrics = await measure(workers)
+        latencies.sort()
+        p99 = latencies[int(len(latencies) * 0.99) - 1] if latencies else float('nan')
+        median = statistics.median(latencies) if latencies else float('nan')
+        print(f"{workers:>8} {len(latencies):>9} {median:>10.1f} {p99:>8.1f}  "
+              f"workers={metrics.get('workers')} clients={metrics.get('connected_clients')}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,169 @@
+"""
+Compression Benchmark
+Replays a recorded-style message stream (a physics snapshot, then light and
+vehicle patches) to N clients and compares, per broadcast, the bytes on the
+wire and the CPU spent compressing:
+- off: no permessage-deflate
+- per connection: what aiohttp does by itself, one compressor per client (context takeover)
+- shared: each payload deflated once and the same bytes sent to everyone
+- zjson: JSON deflated once against the preset schema dictionary
+Then runs a live server in process and checks that real aiohttp clients with
+and without the extension (and with zjson) decode identical messages.
+
+Usage:
+    python -m benchmarks.compression_bench
+"""
+
+import asyncio
+import json
+import socket
+import time
+import zlib
+
+import aiohttp
+
+from protocol import (
+    ZJSON,
+    changed_lights,
+    deflate_payload,
+    encode_message,
+    make_patch,
+    make_snapshot,
+    zjson_decompress,
+)
+from server import WebSocketServer
+from traffic_simulation import TrafficSimulator
+
+
+CLIENT_COUNTS = (1, 10, 100, 1000)
+PATCHES = 60             # 30 s of patches at the default 2 Hz vehicle broadcast
+SHARED_LEVEL = 6         # WS_COMPRESS_LEVEL default
+CONNECTION_LEVEL = 1     # aiohttp compresses with Z_BEST_SPEED
+MIN_BYTES = 128          # WS_COMPRESS_MIN_BYTES default
+
+
+# ============================================================================
+#  MESSAGE STREAM
+# ============================================================================
+
+def message_stream():
+    """A snapshot followed by PATCHES light/vehicle patches from a physics simulation."""
+    simulator = TrafficSimulator(physics=True, seed=0)
+    for _ in range(3):
+        simulator.generate_state()
+        simulator.update_vehicles(5.0)
+    state = simulator.generate_state()
+    messages = [make_snapshot(state, 1)]
+    lights = state["Lights"]
+    for seq in range(2, PATCHES + 2):
+        for _ in range(5):
+            simulator.update_lights(0.1)
+            simulator.update_vehicles(0.1)
+        current = simulator.get_current_lights()
+        messages.append(make_patch(changed_lights(lights, current), seq, state["ServerTime"] + seq * 500,
+                                   simulator.get_current_vehicles()))
+        lights = current
+    return [encode_message(message) for message in messages], messages
+
+
+def per_connection(payloads, clients):
+    """(wire bytes, CPU seconds) with one takeover compressor per client, as aiohttp does."""
+    compressors = [zlib.compressobj(CONNECTION_LEVEL, zlib.DEFLATED, -15) for _ in range(clients)]
+    wire = 0
+    start = time.process_time()
+    for payload in payloads:
+        data = payload.encode()
+        for compressor in compressors:
+            wire += len(compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)) - 4
+    return wire, time.process_time() - start
+
+
+def shared(payloads, clients):
+    """(wire bytes, CPU seconds) deflating each payload once for every client."""
+    wire = 0
+    start = time.process_time()
+    for payload in payloads:
+        size = len(deflate_payload(payload, 15, SHARED_LEVEL).data) if len(payload) >= MIN_BYTES else len(payload)
+        wire += size * clients
+    return wire, time.process_time() - start
+
+
+def zjson(messages, clients):
+    """(wire bytes, CPU seconds) encoding each message once as zjson (including the JSON encode)."""
+    wire = 0
+    start = time.process_time()
+    for message in messages:
+        wire += len(encode_message(message, ZJSON)) * clients
+    return wire, time.process_time() - start
+
+
+def wire_costs():
+    payloads, messages = message_stream()
+    broadcasts = len(payloads)
+    raw = sum(len(payload) for payload in payloads)
+    print(f"{broadcasts} broadcasts (1 snapshot of {len(payloads[0]) / 1000:.1f} kB, then patches), "
+          f"{raw / broadcasts / 1000:.2f} kB JSON each on average")
+    print(f"{'clients':>7} {'mode':>15} {'kB/broadcast':>13} {'ratio':>6} {'compress ms/broadcast':>22}")
+    for clients in CLIENT_COUNTS:
+        rows = [("off", (raw * clients, 0.0)),
+                ("per connection", per_connection(payloads, clients)),
+                ("shared", shared(payloads, clients)),
+                ("zjson", zjson(messages, clients))]
+        for label, (wire, cpu) in rows:
+            print(f"{clients:>7} {label:>15} {wire / broadcasts / 1000:>13.1f} {raw * clients / wire:>6.1f} "
+                  f"{cpu / broadcasts * 1000:>22.3f}")
+
+
+# ============================================================================
+#  LIVE CHECK
+# ============================================================================
+
+async def receive(session, url, count, **options):
+    """First count messages from one client, decoded to dicts."""
+    messages = []
+    async with session.ws_connect(url, **options) as ws:
+        async for msg in ws:
+            if msg.type == aiohttp.WSMsgType.BINARY:
+                messages.append(json.loads(zjson_decompress(msg.data)))
+            else:
+                messages.append(json.loads(msg.data))
+            if len(messages) == count:
+                break
+    return messages
+
+
+async def live_check():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = WebSocketServer(TrafficSimulator(interval=60, physics=True, seed=0), host="127.0.0.1", port=port)
+    server.physics_hz = server.vehicle_broadcast_hz = 20
+    server.checkpoint_path = ""  # Start from a fresh simulation
+    task = asyncio.create_task(server.run())
+    await asyncio.sleep(0.5)
+    url = f"http://127.0.0.1:{port}/"
+    try:
+        async with aiohttp.ClientSession() as session:
+            deflating, plain, dictionary = await asyncio.gather(
+                receive(session, url, 20),
+                receive(session, url, 20, compress=0),
+                receive(session, url, 20, protocols=["traffic.zjson"]),
+            )
+    finally:
+        task.cancel()
+    # Clients connect a moment apart, so compare the messages all three received
+    by_seq = [{message["Seq"]: message for message in stream[1:]} for stream in (deflating, plain, dictionary)]
+    common = set(by_seq[0]) & set(by_seq[1]) & set(by_seq[2])
+    same = all(by_seq[0][seq] == by_seq[1][seq] == by_seq[2][seq] for seq in common)
+    print(f"\nlive server: {len(common)} broadcasts seen by all three clients "
+          f"(permessage-deflate, none, zjson) decode identically: {same}; "
+          f"snapshots decode: {deflating[0]['Type'] == plain[0]['Type'] == dictionary[0]['Type'] == 'snapshot'}")
+
+
+def main():
+    wire_costs()
+    asyncio.run(live_check())
+
+
+if __name__ == "__main__":
+    main()
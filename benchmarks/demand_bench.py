@@ -0,0 +1,100 @@
+"""
+Demand Model Benchmark
+Measures the cost of generating one interval of arrivals at growing volumes:
+the classic per-car Python loop (with its cap lifted) against the vectorized
+demand model, both alone and with the snapshot's vehicle records built. Also
+checks the arrival statistics (Poisson and platoon dispersion), that a seed
+reproduces the stream, and the hourly volumes over a simulated weekday.
+
+Usage:
+    python -m benchmarks.demand_bench
+"""
+
+import random
+import statistics
+import time
+
+import numpy as np
+
+from demand import PLATOON_SIZE, DemandModel, turning_od
+from traffic_simulation import DIRECTIONS, TrafficSimulator, VehicleRecord
+
+
+INTERVAL = 60
+VOLUMES = (10, 100, 300, 1000)  # vehicles/min per approach
+REPEATS = 20
+DISPERSION_INTERVALS = 2000
+
+
+def python_loop(rng, flow, interval):
+    """The classic generation loop, uncapped: one record and two uniform draws per car."""
+    vehicles = []
+    vehicle_id = 0
+    for direction in DIRECTIONS:
+        for _ in range(int(flow * interval / 60)):
+            vehicle_id += 1
+            vehicles.append(VehicleRecord(vehicle_id, direction, 1, -50 - rng.uniform(0, interval) * 10,
+                                          rng.uniform(8, 15)))
+    return vehicles
+
+
+def median_ms(function):
+    times = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def generation_costs():
+    print(f"One {INTERVAL}s interval (flat profile), median of {REPEATS}")
+    print(f"{'veh/min/approach':>17} {'vehicles':>9} {'python loop ms':>15} {'arrays ms':>10} "
+          f"{'arrays+records ms':>18} {'speedup':>8}")
+    for volume in VOLUMES:
+        rng = random.Random(0)
+        model = DemandModel(turning_od(volume), profile=(1.0,), seed=0)
+        simulator = TrafficSimulator(interval=INTERVAL, seed=0, events=[None],
+                                     demand=DemandModel(turning_od(volume), profile=(1.0,), seed=0))
+        loop_ms = median_ms(lambda: python_loop(rng, volume, INTERVAL))
+        arrays_ms = median_ms(lambda: model.arrivals(INTERVAL))
+        state_ms = median_ms(simulator.generate_state)
+        vehicles = len(model.arrivals(INTERVAL))
+        print(f"{volume:>17} {vehicles:>9} {loop_ms:>15.3f} {arrays_ms:>10.3f} {state_ms:>18.3f} "
+              f"{loop_ms / arrays_ms:>7.1f}x")
+
+
+def dispersion(platoon_size):
+    """Variance over mean of one approach's per-interval counts (1 for a Poisson process)."""
+    model = DemandModel(profile=(1.0,), platoon_size=platoon_size, seed=1)
+    counts = np.array([model.arrivals(INTERVAL).counts()[0] for _ in range(DISPERSION_INTERVALS)])
+    return counts.mean(), counts.var() / counts.mean()
+
+
+def arrival_statistics():
+    print(f"\nCounts per approach per interval over {DISPERSION_INTERVALS} intervals (10 veh/min configured)")
+    for label, platoon_size in (("poisson", 1.0), ("platoon", PLATOON_SIZE)):
+        mean, index = dispersion(platoon_size)
+        print(f"{label:>8}: mean {mean:.2f}, variance/mean {index:.2f}")
+
+    first = DemandModel(platoon_size=PLATOON_SIZE, seed=7).arrivals(3600)
+    second = DemandModel(platoon_size=PLATOON_SIZE, seed=7).arrivals(3600)
+    same = all(np.array_equal(getattr(first, field), getattr(second, field)) for field in first.__slots__)
+    print(f"same seed, same arrivals: {same}")
+
+
+def weekday_volumes():
+    model = DemandModel(seed=0)
+    hourly = [int(sum(len(model.arrivals(INTERVAL)) for _ in range(3600 // INTERVAL))) for _ in range(24)]
+    print("\nVehicles per hour, all approaches, simulated weekday from midnight:")
+    print(" ".join(f"{hour:02d}h:{count}" for hour, count in enumerate(hourly)))
+
+
+def main():
+    generation_costs()
+    arrival_statistics()
+    weekday_volumes()
+
+
+if __name__ == "__main__":
+    main()
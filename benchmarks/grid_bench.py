@@ -0,0 +1,64 @@
+"""
+Grid Step Benchmark
+Measures GridSimulator step time versus intersection count (1 to 100k),
+alongside one TrafficLightController per intersection for reference.
+
+Usage:
+    python -m benchmarks.grid_bench
+"""
+
+import time
+
+import numpy as np
+
+from grid_simulation import GridSimulator
+from traffic_simulation import TrafficLightController
+
+
+INTERSECTION_COUNTS = [1, 10, 100, 1_000, 10_000, 100_000]
+MAX_LOOP_COUNT = 10_000  # Per-object loop gets too slow to be worth timing beyond this
+STEPS = 200
+DT = 0.1
+
+
+def time_grid(num_intersections):
+    """Mean seconds per batched step, with staggered offsets so transitions spread out."""
+    offsets = np.random.default_rng(0).uniform(0, 66, num_intersections)
+    grid = GridSimulator(num_intersections, offsets=offsets, seed=0)
+    start = time.perf_counter()
+    for _ in range(STEPS):
+        grid.step(DT)
+    return (time.perf_counter() - start) / STEPS
+
+
+def time_interval(num_intersections):
+    """Seconds to draw one interval of events, flows and vehicles for the grid."""
+    grid = GridSimulator(num_intersections, seed=0)
+    start = time.perf_counter()
+    grid.new_interval()
+    return time.perf_counter() - start
+
+
+def time_loop(num_intersections):
+    """Mean seconds per step when updating one controller object per intersection."""
+    controllers = [TrafficLightController() for _ in range(num_intersections)]
+    steps = max(1, STEPS // 10)
+    start = time.perf_counter()
+    for _ in range(steps):
+        for controller in controllers:
+            controller.update(DT)
+    return (time.perf_counter() - start) / steps
+
+
+def main():
+    print(f"{'intersections':>14} {'grid step us':>13} {'per-int ns':>11} {'interval ms':>12} {'loop step us':>13}")
+    for count in INTERSECTION_COUNTS:
+        grid_step = time_grid(count)
+        interval = time_interval(count)
+        loop_step = f"{time_loop(count) * 1e6:>13.1f}" if count <= MAX_LOOP_COUNT else f"{'-':>13}"
+        print(f"{count:>14} {grid_step * 1e6:>13.1f} {grid_step / count * 1e9:>11.1f} "
+              f"{interval * 1e3:>12.2f} {loop_step}")
+
+
+if __name__ == "__main__":
+    main()
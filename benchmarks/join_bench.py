@@ -0,0 +1,181 @@
+"""
+Join Storm Benchmark
+Measures what a reconnect storm costs the server:
+- in process: serving N join snapshots from the pre-encoded cache versus
+  encoding one per join (physics-mode state, clients spread over a few views)
+- end to end: a live `traffic.py` with observers already connected, hit by
+  STORM simultaneous joins with admission pacing off and on; reports how late
+  the observers' patches arrive during the storm, state_loop lag and how long
+  joins took to receive their first snapshot
+
+Usage:
+    python -m benchmarks.join_bench [storm size]
+"""
+
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+
+import aiohttp
+
+from benchmarks.load_test import HOST, ROOT, free_port, percentile, raise_file_limit, scrape_counters, wait_ready
+from benchmarks.subscription_bench import VIEWS, make_server
+from protocol import encode_message, make_snapshot
+
+
+DEFAULT_STORM = 2000
+OBSERVERS = 20
+JOINS = 1000
+STORM_TIMEOUT = 30
+
+
+# ============================================================================
+#  IN-PROCESS: CACHED VERSUS PER-JOIN SNAPSHOTS
+# ============================================================================
+
+def time_joins(server, clients, cached):
+    """Milliseconds to produce a join snapshot for every client."""
+    start = time.perf_counter()
+    for client in clients:
+        if cached:
+            server.client_snapshot(client)
+        else:
+            encode_message(client.view(make_snapshot(server.current_state, server.seq)), client.format)
+    return (time.perf_counter() - start) * 1000
+
+
+def cache_comparison():
+    server = make_server(list(VIEWS.values()))
+    clients = list(server.clients)[:JOINS]
+    per_join = time_joins(server, clients, cached=False)
+    cached = time_joins(server, clients, cached=True)
+    print(f"{JOINS} join snapshots over {len(VIEWS)} views: {per_join:.1f} ms encoding each, "
+          f"{cached:.1f} ms from the cache ({per_join / cached:.0f}x)")
+
+
+# ============================================================================
+#  END TO END: RECONNECT STORM
+# ============================================================================
+
+def start_server(port, paced, size, log_path):
+    env = dict(os.environ)
+    env.update({
+        "PORT": str(port),
+        "MAX_CLIENTS": str(OBSERVERS + size),
+        "INTERVAL": "60",
+        "SERVER_PHYSICS": "1",
+        "RATE_LIMIT_ENABLED": "0",
+        "ALLOWED_ORIGINS": "",
+        "WORKERS": "0",
+        "CHECKPOINT_PATH": "",  # Every run starts from a fresh simulation
+    })
+    if not paced:
+        env["ADMISSION_RATE"] = "0"
+    log = open(log_path, "w")
+    return subprocess.Popen([sys.executable, "traffic.py"], cwd=ROOT, env=env,
+                            stdout=log, stderr=subprocess.STDOUT)
+
+
+async def observe(session, url, latencies, recording):
+    """Stay connected, recording how late each message arrives while recording is set."""
+    async with session.ws_connect(url) as ws:
+        async for msg in ws:
+            if recording.is_set():
+                latencies.append(time.time() * 1000 - json.loads(msg.data)["ServerTime"])
+
+
+async def join(session, url, join_times, failures, done):
+    """Connect and wait for the first snapshot; stay connected until the storm is over."""
+    started = time.monotonic()
+    try:
+        async with session.ws_connect(url) as ws:
+            await ws.receive()
+            join_times.append((time.monotonic() - started) * 1000)
+            await done.wait()
+    except aiohttp.WSServerHandshakeError as e:
+        failures[str(e.status)] += 1
+    except (aiohttp.ClientError, OSError) as e:
+        failures[type(e).__name__] += 1
+
+
+async def storm(paced, size):
+    port = free_port()
+    base_url = f"http://{HOST}:{port}"
+    server = start_server(port, paced, size, os.path.join(ROOT, "join_bench.server.log"))
+    latencies, join_times, failures = [], [], Counter()
+    recording, done = asyncio.Event(), asyncio.Event()
+    try:
+        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0)) as session:
+            await wait_ready(session, base_url)
+            observers = [asyncio.create_task(observe(session, base_url + "/", latencies, recording))
+                         for _ in range(OBSERVERS)]
+            await asyncio.sleep(2)
+            before = await scrape_counters(session, base_url)
+
+            recording.set()
+            started = time.monotonic()
+            joins = [asyncio.create_task(join(session, base_url + "/", join_times, failures, done))
+                     for _ in range(size)]
+            while len(join_times) + sum(failures.values()) < size and time.monotonic() - started < STORM_TIMEOUT:
+                await asyncio.sleep(0.05)
+            storm_seconds = time.monotonic() - started
+            await asyncio.sleep(1)  # Let the observers see the loop recover
+            recording.clear()
+
+            after = await scrape_counters(session, base_url)
+            done.set()
+            for task in observers + joins:
+                task.cancel()
+            await asyncio.gather(*observers, *joins, return_exceptions=True)
+    finally:
+        server.terminate()
+        server.wait()
+
+    def delta(name):
+        return after.get(name, 0) - before.get(name, 0)
+
+    lag_count = delta("traffic_state_loop_lag_seconds_count")
+    latencies.sort()
+    join_times.sort()
+    return {
+        "storm_s": storm_seconds,
+        "observer_p50": statistics.median(latencies) if latencies else 0,
+        "observer_p99": percentile(latencies, 0.99) or 0,
+        "observer_max": latencies[-1] if latencies else 0,
+        "loop_lag_mean_ms": delta("traffic_state_loop_lag_seconds_sum") / lag_count * 1000 if lag_count else 0,
+        "join_p50": statistics.median(join_times) if join_times else 0,
+        "join_p99": percentile(join_times, 0.99) or 0,
+        "joined": len(join_times),
+        "failed": dict(failures),
+        "cache_hits": int(delta("traffic_snapshot_cache_hits_total")),
+        "cache_misses": int(delta("traffic_snapshot_cache_misses_total")),
+    }
+
+
+async def storms(size):
+    print(f"\n{size} simultaneous joins, {OBSERVERS} observers already connected (physics on)")
+    print(f"{'pacing':>7} {'storm s':>8} {'obs p50':>8} {'obs p99':>8} {'obs max':>8} {'lag ms':>7} "
+          f"{'join p50':>9} {'join p99':>9} {'joined':>7} {'hits':>6} {'misses':>7}  failed")
+    for paced in (False, True):
+        r = await storm(paced, size)
+        print(f"{'on' if paced else 'off':>7} {r['storm_s']:>8.2f} {r['observer_p50']:>8.1f} "
+              f"{r['observer_p99']:>8.1f} {r['observer_max']:>8.1f} {r['loop_lag_mean_ms']:>7.2f} "
+              f"{r['join_p50']:>9.1f} {r['join_p99']:>9.1f} {r['joined']:>7} {r['cache_hits']:>6} "
+              f"{r['cache_misses']:>7}  {r['failed'] or '-'}")
+    print("(observer and join columns in ms)")
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_STORM
+    raise_file_limit()
+    cache_comparison()
+    asyncio.run(storms(size))
+
+
+if __name__ == "__main__":
+    main()
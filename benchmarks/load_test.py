@@ -0,0 +1,298 @@
+"""
+Connection-Scale Load Test
+Starts `traffic.py` as a separate local process, ramps up thousands of asyncio
+WebSocket clients in steps, and at each step measures:
+- end-to-end delivery latency (client receive time minus the message's ServerTime)
+- frames lost (gaps in Seq) and refused or failed connections
+- server memory per connection (RSS growth over the idle baseline) and CPU
+It writes a JSON report with stable keys so runs can be diffed between releases.
+Runs entirely on one Linux host (server stats come from /proc).
+
+Usage:
+    python -m benchmarks.load_test --clients 100,1000,2000 --out load_report.json
+    python -m benchmarks.load_test --rate-limit --origin http://evil.example --allowed-origins http://ok.example
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+
+import aiohttp
+
+
+HOST = "127.0.0.1"
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONNECT_BATCH = 200  # clients opened concurrently while ramping up
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+
+# ============================================================================
+#  SERVER PROCESS
+# ============================================================================
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+def start_server(args, port):
+    """Run traffic.py with the test's limits; its output goes to a log file next to the report."""
+    env = dict(os.environ)
+    env.update({
+        "PORT": str(port),
+        "MAX_CLIENTS": str(max(args.clients) + 100),
+        "INTERVAL": str(args.interval),
+        "SERVER_PHYSICS": "1" if args.physics else "0",
+        "RATE_LIMIT_ENABLED": "1" if args.rate_limit else "0",
+        "ALLOWED_ORIGINS": args.allowed_origins,
+        "WORKERS": "0",
+        "CHECKPOINT_PATH": "",  # Every run starts from a fresh simulation
+    })
+    log = open(os.path.splitext(args.out)[0] + ".server.log", "w")
+    return subprocess.Popen([sys.executable, "traffic.py"], cwd=ROOT, env=env,
+                            stdout=log, stderr=subprocess.STDOUT)
+
+
+def process_stats(pid):
+    """(RSS bytes, CPU seconds) of a process, from /proc."""
+    with open(f"/proc/{pid}/status") as status:
+        rss_kb = next(int(line.split()[1]) for line in status if line.startswith("VmRSS:"))
+    with open(f"/proc/{pid}/stat") as stat:
+        fields = stat.read().rsplit(")", 1)[1].split()
+    cpu_seconds = (int(fields[11]) + int(fields[12])) / CLOCK_TICKS  # utime + stime
+    return rss_kb * 1024, cpu_seconds
+
+
+async def wait_ready(session, base_url, timeout=15):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with session.get(f"{base_url}/healthz") as response:
+                if response.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("server did not become ready")
+
+
+async def scrape_counters(session, base_url):
+    """Counters from the server's Prometheus endpoint (name -> value)."""
+    async with session.get(f"{base_url}/metrics", params={"format": "prometheus"}) as response:
+        text = await response.text()
+    counters = {}
+    for line in text.splitlines():
+        if line.startswith("traffic_") and "{" not in line:
+            name, value = line.split()
+            counters[name] = float(value)
+    return counters
+
+
+# ============================================================================
+#  CLIENTS
+# ============================================================================
+
+class LoadStats:
+    """Measurements shared by every client, reset at the start of each step's window."""
+
+    def __init__(self):
+        self.connected = 0
+        self.refused = Counter()  # HTTP status (or error name) -> count
+        self.reset()
+
+    def reset(self):
+        self.recording = False
+        self.latencies = []
+        self.messages = 0
+        self.lost_frames = 0
+        self.disconnects = 0
+
+
+async def run_client(session, url, headers, stats):
+    """Hold one socket open, recording latency and Seq gaps for every message."""
+    try:
+        ws = await session.ws_connect(url, headers=headers, autoping=True)
+    except aiohttp.WSServerHandshakeError as e:
+        stats.refused[str(e.status)] += 1
+        return
+    except (aiohttp.ClientError, OSError) as e:
+        stats.refused[type(e).__name__] += 1
+        return
+
+    stats.connected += 1
+    last_seq = None
+    try:
+        async for msg in ws:
+            if msg.type != aiohttp.WSMsgType.TEXT:
+                break
+            received_ms = time.time() * 1000
+            data = json.loads(msg.data)
+            seq = data.get("Seq")
+            if stats.recording:
+                stats.messages += 1
+                stats.latencies.append(received_ms - data["ServerTime"])
+                if last_seq is not None and seq > last_seq + 1:
+                    stats.lost_frames += seq - last_seq - 1
+            last_seq = seq
+    finally:
+        stats.connected -= 1
+        if stats.recording:
+            stats.disconnects += 1
+        await ws.close()
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else None
+
+
+# ============================================================================
+#  LOAD TEST
+# ============================================================================
+
+async def run(args):
+    port = free_port()
+    base_url = f"http://{HOST}:{port}"
+    server = start_server(args, port)
+    headers = {"Origin": args.origin} if args.origin else {}
+    stats = LoadStats()
+    tasks = []
+    steps = []
+
+    try:
+        connector = aiohttp.TCPConnector(limit=0)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            await wait_ready(session, base_url)
+            await asyncio.sleep(1)
+            baseline_rss, _ = process_stats(server.pid)
+
+            for target in args.clients:
+                # Ramp up to the target in batches
+                while len(tasks) < target:
+                    batch = min(CONNECT_BATCH, target - len(tasks))
+                    tasks += [asyncio.create_task(run_client(session, base_url + "/", headers, stats))
+                              for _ in range(batch)]
+                    await asyncio.sleep(0.05)
+                await asyncio.sleep(args.settle)
+
+                # Measurement window
+                counters_before = await scrape_counters(session, base_url)
+                _, server_cpu_before = process_stats(server.pid)
+                client_cpu_before = time.process_time()
+                started = time.monotonic()
+                stats.reset()
+                stats.recording = True
+                await asyncio.sleep(args.duration)
+                stats.recording = False
+                elapsed = time.monotonic() - started
+                rss, server_cpu = process_stats(server.pid)
+                client_cpu = time.process_time() - client_cpu_before
+                counters = await scrape_counters(session, base_url)
+
+                latencies = sorted(stats.latencies)
+                connected = stats.connected
+                step = {
+                    "clients_requested": target,
+                    "clients_connected": connected,
+                    "connections_refused_total": dict(sorted(stats.refused.items())),
+                    "disconnects": stats.disconnects,
+                    "messages_received": stats.messages,
+                    "latency_ms": {
+                        "p50": round(statistics.median(latencies), 2) if latencies else None,
+                        "p95": round(percentile(latencies, 0.95), 2) if latencies else None,
+                        "p99": round(percentile(latencies, 0.99), 2) if latencies else None,
+                        "max": round(latencies[-1], 2) if latencies else None,
+                    },
+                    "frames_lost_client": stats.lost_frames,
+                    "frames_dropped_server": int(counters.get("traffic_frames_dropped_total", 0)
+                                                 - counters_before.get("traffic_frames_dropped_total", 0)),
+                    "server_rss_mb": round(rss / 2**20, 1),
+                    "server_kb_per_connection": round((rss - baseline_rss) / 1024 / connected, 1) if connected else None,
+                    "server_cpu_percent": round((server_cpu - server_cpu_before) / elapsed * 100, 1),
+                    "loadgen_cpu_percent": round(client_cpu / elapsed * 100, 1),
+                }
+                steps.append(step)
+                print(f"{target:>7} {connected:>9} {stats.messages:>9} "
+                      f"{step['latency_ms']['p50'] or 0:>8.1f} {step['latency_ms']['p99'] or 0:>8.1f} "
+                      f"{stats.lost_frames:>6} {step['server_kb_per_connection'] or 0:>8.1f} "
+                      f"{step['server_cpu_percent']:>7.1f} {step['loadgen_cpu_percent']:>8.1f}")
+
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        server.terminate()
+        server.wait()
+
+    return {
+        "settings": {
+            "clients": args.clients,
+            "duration_s": args.duration,
+            "interval_s": args.interval,
+            "physics": args.physics,
+            "rate_limit": args.rate_limit,
+            "origin": args.origin,
+            "allowed_origins": args.allowed_origins,
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "revision": git_revision(),
+        },
+        "baseline_server_rss_mb": round(baseline_rss / 2**20, 1),
+        "steps": steps,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def raise_file_limit():
+    """Thousands of sockets need thousands of descriptors (inherited by the server too)."""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WebSocket connection-scale load test")
+    parser.add_argument("--clients", default="100,500,1000,2000",
+                        help="comma-separated client counts to step through")
+    parser.add_argument("--duration", type=float, default=10, help="seconds measured per step")
+    parser.add_argument("--settle", type=float, default=2, help="seconds to wait after ramping up")
+    parser.add_argument("--interval", type=int, default=10, help="server INTERVAL (s between snapshots)")
+    parser.add_argument("--physics", action="store_true", help="enable server-side vehicle physics")
+    parser.add_argument("--rate-limit", action="store_true",
+                        help="keep the per-IP rate limiter on (all clients share 127.0.0.1)")
+    parser.add_argument("--origin", default="", help="Origin header the clients send")
+    parser.add_argument("--allowed-origins", default="", help="server ALLOWED_ORIGINS (empty allows all)")
+    parser.add_argument("--out", default="load_report.json", help="JSON report path")
+    args = parser.parse_args()
+    args.clients = [int(count) for count in args.clients.split(",") if count]
+
+    raise_file_limit()
+    print(f"{'clients':>7} {'connected':>9} {'messages':>9} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'lost':>6} {'kB/conn':>8} {'srv CPU%':>7} {'gen CPU%':>8}")
+    report = asyncio.run(run(args))
+    with open(args.out, "w") as out:
+        json.dump(report, out, indent=2, sort_keys=True)
+        out.write("\n")
+    print(f"Report written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Metrics Overhead Benchmark
+Runs the server hot path (light updates, state generation and fan-out to
+fake clients) with metrics enabled and disabled and reports the overhead.
+
+Usage:
+    python -m benchmarks.metrics_bench
+"""
+
+import asyncio
+import gc
+import statistics
+import time
+
+from benchmarks.broadcast_bench import FakeWebSocket
+from metrics import REGISTRY
+from server import ClientConnection, WebSocketServer
+from traffic_simulation import TrafficSimulator
+
+
+NUM_CLIENTS = 200
+TICKS = 200
+REPEATS = 15
+SNAPSHOT_EVERY = 20  # ticks between full snapshots, as with a short interval
+TICK_SECONDS = 1.0   # one displayed-second change per tick, so every tick sends a patch
+
+
+# ============================================================================
+#  BENCHMARK
+# ============================================================================
+
+async def run_hot_path(enabled):
+    """Seconds to run TICKS iterations of the state loop body and drain every queue."""
+    simulator = TrafficSimulator()
+    server = WebSocketServer(simulator)
+    REGISTRY.enabled = enabled
+    server.current_state = simulator.generate_state()
+
+    sockets = [FakeWebSocket() for _ in range(NUM_CLIENTS)]
+    for ws in sockets:
+        client = ClientConnection(ws, "bench", queue_size=TICKS)
+        client.start()
+        server.clients.add(client)
+
+    first_seq = server.seq
+    start = time.perf_counter()
+    for tick in range(TICKS):
+        # Same instrumented calls state_loop makes each wakeup
+        server.advance(TICK_SECONDS)
+        if tick % SNAPSHOT_EVERY == 0:
+            server.regenerate_state()
+            await server.broadcast_snapshot()
+        else:
+            await server.broadcast_lights()
+        await asyncio.sleep(0)
+    sent = server.seq - first_seq
+    while any(ws.received < sent for ws in sockets):
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start
+
+    for client in list(server.clients):
+        await client.close()
+    return elapsed
+
+
+async def main():
+    results = {True: [], False: []}
+    for repeat in range(REPEATS):
+        # Alternate which mode runs first so warm-up and heap growth do not favour one
+        order = (False, True) if repeat % 2 == 0 else (True, False)
+        for enabled in order:
+            gc.collect()
+            results[enabled].append(await run_hot_path(enabled))
+
+    disabled = statistics.median(results[False])
+    enabled = statistics.median(results[True])
+    print(f"{NUM_CLIENTS} clients, {TICKS} ticks, median of {REPEATS} runs")
+    print(f"{'metrics':>8} {'total ms':>10} {'per tick us':>12}")
+    for label, seconds in (("off", disabled), ("on", enabled)):
+        print(f"{label:>8} {seconds * 1000:>10.2f} {seconds / TICKS * 1e6:>12.1f}")
+    print(f"overhead: {(enabled - disabled) / disabled * 100:+.2f}%")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,65 @@
+"""
+Vehicle Physics Benchmark
+Measures VehicleKinematics.step time for up to 100k vehicles and checks that
+a 10 Hz tick fits on one core.
+
+Usage:
+    python -m benchmarks.physics_bench
+"""
+
+import time
+
+import numpy as np
+
+from grid_simulation import GridSimulator
+from traffic_simulation import DIRECTIONS
+from vehicle_physics import VehicleKinematics
+
+
+VEHICLE_COUNTS = [1_000, 10_000, 100_000]
+VEHICLES_PER_LANE = 25
+TICK_HZ = 10
+TICKS = 50
+
+
+def make_grid(num_vehicles, seed=0):
+    """Grid with the requested number of vehicles queued on every approach."""
+    lanes = num_vehicles // VEHICLES_PER_LANE
+    num_intersections = max(1, lanes // len(DIRECTIONS))
+    rng = np.random.default_rng(seed)
+    grid = GridSimulator(num_intersections, offsets=rng.uniform(0, 66, num_intersections),
+                         seed=seed, physics=True)
+
+    lane = np.repeat(np.arange(num_intersections * len(DIRECTIONS)), VEHICLES_PER_LANE)
+    slot = np.tile(np.arange(VEHICLES_PER_LANE), num_intersections * len(DIRECTIONS))
+    grid.vehicles = VehicleKinematics()
+    grid.vehicles.replace(
+        lane // len(DIRECTIONS),
+        lane % len(DIRECTIONS),
+        np.arange(1, lane.size + 1),
+        40 - slot * rng.uniform(6, 12, lane.size),
+        rng.uniform(8, 15, lane.size)
+    )
+    return grid
+
+
+def main():
+    dt = 1.0 / TICK_HZ
+    budget_ms = 1000.0 / TICK_HZ
+    print(f"{'vehicles':>9} {'step ms':>8} {'p99 ms':>8} {'budget ms':>10} {'sustains':>9}")
+    for count in VEHICLE_COUNTS:
+        grid = make_grid(count)
+        timings = []
+        for _ in range(TICKS):
+            start = time.perf_counter()
+            grid.step(dt)
+            grid.update_vehicles(dt)
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        mean = sum(timings) / len(timings)
+        p99 = timings[int(len(timings) * 0.99) - 1]
+        print(f"{count:>9} {mean:>8.2f} {p99:>8.2f} {budget_ms:>10.1f} {str(p99 < budget_ms):>9}")
+
+
+if __name__ == "__main__":
+    main()
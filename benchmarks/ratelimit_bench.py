@@ -0,0 +1,105 @@
+"""
+Rate Limiter Stress Benchmark
+Feeds 1M distinct IPs (plus a few hot ones) through the original list-based
+limiter and RateLimiter, reporting check throughput, tracked entries, memory
+and the cost of counting limited IPs for /metrics.
+
+Usage:
+    python -m benchmarks.ratelimit_bench
+"""
+
+import gc
+import time
+import tracemalloc
+from collections import defaultdict
+
+from server import RateLimiter
+
+
+DISTINCT_IPS = 1_000_000
+HOT_IPS = 100
+WINDOW = 60
+MAX_CONNECTIONS = 10
+MAX_TRACKED_IPS = 100_000
+ATTEMPTS_PER_SECOND = 50_000  # simulated arrival rate of the scan
+
+
+# ============================================================================
+#  ORIGINAL LIMITER (module-global dict of timestamp lists)
+# ============================================================================
+
+class ListLimiter:
+    def __init__(self):
+        self.connection_attempts = defaultdict(list)
+
+    def allow(self, client_ip, now):
+        self.connection_attempts[client_ip] = [
+            ts for ts in self.connection_attempts[client_ip]
+            if now - ts < WINDOW
+        ]
+        if len(self.connection_attempts[client_ip]) >= MAX_CONNECTIONS:
+            return False
+        self.connection_attempts[client_ip].append(now)
+        return True
+
+    def limited_count(self, now):
+        return len([ip for ip, attempts in self.connection_attempts.items()
+                    if len(attempts) >= MAX_CONNECTIONS])
+
+    def tracked(self):
+        return len(self.connection_attempts)
+
+
+class BucketLimiter(RateLimiter):
+    def __init__(self):
+        super().__init__(WINDOW, MAX_CONNECTIONS, MAX_TRACKED_IPS)
+
+    def tracked(self):
+        return len(self.buckets)
+
+
+# ============================================================================
+#  BENCHMARK
+# ============================================================================
+
+def workload():
+    """Yield (ip, now): a scan of distinct IPs interleaved with hot IPs hammering the server."""
+    for i in range(DISTINCT_IPS):
+        now = i / ATTEMPTS_PER_SECOND
+        yield f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}", now
+        if i % 100 == 0:
+            yield f"192.168.0.{i // 100 % HOT_IPS}", now
+
+
+def run(limiter):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    checks = 0
+    for ip, now in workload():
+        limiter.allow(ip, now)
+        checks += 1
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    end = DISTINCT_IPS / ATTEMPTS_PER_SECOND
+    scrape_start = time.perf_counter()
+    limited = limiter.limited_count(end)
+    scrape = time.perf_counter() - scrape_start
+    return checks, elapsed, current, peak, limiter.tracked(), limited, scrape
+
+
+def main():
+    print(f"{DISTINCT_IPS} distinct IPs + {HOT_IPS} hot IPs (cap {MAX_TRACKED_IPS} tracked)")
+    print(f"{'limiter':>8} {'checks/s':>10} {'tracked':>9} {'MB held':>8} {'MB peak':>8} "
+          f"{'limited':>8} {'scrape ms':>10}")
+    for name, limiter in (("list", ListLimiter()), ("bucket", BucketLimiter())):
+        checks, elapsed, current, peak, tracked, limited, scrape = run(limiter)
+        print(f"{name:>8} {checks / elapsed:>10.0f} {tracked:>9} {current / 1e6:>8.1f} "
+              f"{peak / 1e6:>8.1f} {limited:>8} {scrape * 1000:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Record Representation Benchmark
+Compares memory, allocations and build time of the original dict records with
+the slotted records used internally, and checks their JSON is byte-identical.
+
+Usage:
+    python -m benchmarks.records_bench
+"""
+
+import gc
+import json
+import random
+import time
+import tracemalloc
+
+from protocol import encode_message
+from traffic_simulation import LightRecord, TrafficRecord, VehicleRecord, now_ms
+
+
+RECORD_COUNT = 100_000
+
+
+# ============================================================================
+#  ORIGINAL DICT BUILDERS (as they were before the slotted records)
+# ============================================================================
+
+def dict_light(direction, color, timer):
+    now_ms = int(time.time() * 1000)
+    timer = max(0.0, float(timer))
+    timer_ms = int(timer * 1000)
+    expires_at = now_ms + timer_ms
+    return {
+        "Sens": direction,
+        "Couleur": color,
+        "Timer": timer,
+        "TimerMs": timer_ms,
+        "ExpiresAt": expires_at
+    }
+
+
+def dict_vehicle(id, direction, lane, position, speed):
+    return {
+        "Id": id,
+        "Sens": direction,
+        "Voie": f"Lane{lane}",
+        "Position": position,
+        "Speed": speed,
+        "Waiting": False
+    }
+
+
+def dict_traffic(direction, flow, event=None):
+    return {"direction": direction, "flow": flow, "event": event}
+
+
+# ============================================================================
+#  BENCHMARK
+# ============================================================================
+
+def build_dicts(params):
+    return [dict_vehicle(*p) for p in params]
+
+
+def build_records(params):
+    return [VehicleRecord(*p) for p in params]
+
+
+def measure(builder, params):
+    """Return (build seconds, bytes retained, allocated blocks) for one build."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    start = time.perf_counter()
+    records = builder(params)
+    elapsed = time.perf_counter() - start
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = after.compare_to(before, 'filename')
+    size = sum(stat.size_diff for stat in stats)
+    blocks = sum(stat.count_diff for stat in stats)
+    del records
+    return elapsed, size, blocks
+
+
+def check_identical():
+    """Assert both representations serialize to the same bytes."""
+    timestamp = now_ms()
+    light = LightRecord("N", "GREEN", 12.345, timestamp)
+    expected_light = dict_light("N", "GREEN", 12.345)
+    expected_light["ExpiresAt"] = light.expires_at  # builders sample the clock independently
+    state = {"Lights": [light], "Vehicles": [VehicleRecord(7, "E", 1, -50, 9.5)],
+             "Traffic": [TrafficRecord("W", 8, {"name": "Accident", "flow_mult": 0.4})]}
+    expected = {"Lights": [expected_light], "Vehicles": [dict_vehicle(7, "E", 1, -50, 9.5)],
+                "Traffic": [dict_traffic("W", 8, {"name": "Accident", "flow_mult": 0.4})]}
+    assert encode_message(state) == json.dumps(expected), "record JSON differs from dict JSON"
+
+
+def main():
+    check_identical()
+    print("JSON output: byte-identical")
+
+    rng = random.Random(0)
+    params = [(i, rng.choice("NSEW"), 1, rng.uniform(-50, 60), rng.uniform(8, 15))
+              for i in range(RECORD_COUNT)]
+
+    print(f"{RECORD_COUNT} vehicle records")
+    print(f"{'representation':>15} {'build ms':>9} {'bytes/record':>13} {'blocks/record':>14}")
+    for name, builder in (("dict", build_dicts), ("slotted", build_records)):
+        elapsed, size, blocks = measure(builder, params)
+        print(f"{name:>15} {elapsed * 1000:>9.1f} {size / RECORD_COUNT:>13.1f} {blocks / RECORD_COUNT:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
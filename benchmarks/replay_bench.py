@@ -0,0 +1,100 @@
+"""
+Recorder / Replay Benchmark
+Records a synthetic history (one patch per second, a snapshot per interval),
+then measures random seeks through the time index and a full scan of the
+memory-mapped log, reporting peak heap use against the log size.
+
+Usage:
+    python -m benchmarks.replay_bench [hours]
+"""
+
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from protocol import apply_message, encode_message, make_patch, make_snapshot
+from recorder import ReplayLog, StateRecorder
+from traffic_simulation import TrafficSimulator
+
+
+DEFAULT_HOURS = 24
+SEEKS = 200
+START_MS = 1_700_000_000_000
+
+
+def record_history(path, hours):
+    """Write hours of synthetic history: a snapshot every interval and a light patch every second."""
+    simulator = TrafficSimulator(seed=0)
+    state = {"seq": 0, "text": None}
+    recorder = StateRecorder(path, lambda: state["text"])
+
+    for second in range(int(hours * 3600)):
+        server_time = START_MS + second * 1000
+        state["seq"] += 1
+        if second % simulator.interval == 0:
+            current = simulator.generate_state()
+            current["ServerTime"] = server_time
+            message = make_snapshot(current, state["seq"])
+        else:
+            simulator.update_lights(1.0)
+            message = make_patch(simulator.get_current_lights(), state["seq"], server_time)
+        payload = encode_message(message)
+        if message["Type"] == "snapshot":
+            state["text"] = payload
+        recorder.record(message, payload)
+    recorder.close()
+
+
+def seek_to(log, target):
+    """Rebuild the state at target the way ReplayServer does: index seek, then fast-forward."""
+    state = None
+    for server_time, payload in log.frames(log.seek(target)):
+        state = apply_message(state, json.loads(payload))
+        if server_time >= target:
+            break
+    return state
+
+
+def main():
+    hours = float(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_HOURS
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "history.log")
+
+        start = time.perf_counter()
+        record_history(path, hours)
+        record_seconds = time.perf_counter() - start
+        log_mb = os.path.getsize(path) / 1e6
+        print(f"recorded {hours:g}h: {log_mb:.1f} MB log, "
+              f"{os.path.getsize(path + '.idx') / 1e3:.1f} kB index in {record_seconds:.1f}s")
+
+        log = ReplayLog(path)
+        end_ms = START_MS + int(hours * 3600 * 1000)
+        rng = random.Random(0)
+        start = time.perf_counter()
+        for _ in range(SEEKS):
+            seek_to(log, rng.randrange(START_MS, end_ms))
+        seek_ms = (time.perf_counter() - start) / SEEKS * 1000
+        print(f"random seek + fast-forward: {seek_ms:.2f} ms average over {SEEKS} seeks")
+
+        start = time.perf_counter()
+        frames = sum(1 for _ in log.frames())
+        scan_seconds = time.perf_counter() - start
+        print(f"full scan: {frames:,} frames in {scan_seconds:.2f}s ({frames / scan_seconds:,.0f} frames/s)")
+
+        # Heap use while replaying everything from the middle, measured separately from the timings
+        tracemalloc.start()
+        state = seek_to(log, (START_MS + end_ms) // 2)
+        for _, payload in log.frames(log.seek((START_MS + end_ms) // 2)):
+            state = apply_message(state, json.loads(payload))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        log.close()
+        print(f"peak heap while replaying half the log: {peak / 1e6:.2f} MB for a {log_mb:.1f} MB log "
+              f"(log pages are file-backed mmap, reclaimable by the kernel)")
+
+if __name__ == "__main__":
+    main()
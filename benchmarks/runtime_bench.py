@@ -0,0 +1,188 @@
+"""
+Runtime Profile Benchmark
+Compares the "stdlib" and "fast" runtime profiles (see runtime.py):
+- in process: encoding physics-mode snapshots and patches with json and with
+  orjson, and how often the orjson backend falls back to json to stay
+  byte-identical to compact json.dumps (the stdlib profile keeps the default spacing)
+- end to end: a live server process under heavy demand broadcasting vehicles
+  at a high rate to many clients, once per profile; reports delivered
+  messages per second, latency, and the server's CPU per broadcast
+
+Usage:
+    python -m benchmarks.runtime_bench [clients]
+"""
+
+import asyncio
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import aiohttp
+
+import runtime
+from benchmarks.load_test import (
+    HOST, ROOT, free_port, percentile, process_stats, raise_file_limit, scrape_counters, wait_ready,
+)
+from demand import FLAT_PROFILE, DemandModel, turning_od
+from protocol import JSON_BACKENDS, make_patch, make_snapshot, orjson, orjson_may_differ
+from server import WebSocketServer
+from traffic_simulation import TrafficSimulator, record_to_wire
+
+
+DEFAULT_CLIENTS = 200
+DURATION = 15
+BROADCAST_HZ = 50
+HEAVY_FLOW = 300  # vehicles/min per approach
+MESSAGES = 1000
+REPEATS = 5
+
+
+# ============================================================================
+#  IN-PROCESS: ENCODERS
+# ============================================================================
+
+def physics_messages():
+    """A snapshot and MESSAGES patches from a heavy-demand physics run."""
+    demand = DemandModel(turning_od(HEAVY_FLOW), profile=FLAT_PROFILE, seed=0)
+    simulator = TrafficSimulator(interval=60, physics=True, seed=0, demand=demand)
+    messages = [make_snapshot(simulator.generate_state(), 0)]
+    for seq in range(1, MESSAGES + 1):
+        simulator.update_lights(1 / BROADCAST_HZ)
+        simulator.update_vehicles(1 / BROADCAST_HZ)
+        messages.append(make_patch(simulator.get_current_lights(), seq, 0, simulator.get_current_vehicles()))
+    return messages
+
+
+def encoder_comparison():
+    messages = physics_messages()
+    vehicles = statistics.mean(len(message["Vehicles"]) for message in messages)
+    print(f"Encoding {len(messages)} physics messages ({vehicles:.0f} vehicles on average), best of {REPEATS}")
+    print(f"{'backend':>8} {'us/message':>11} {'MB/s':>7}")
+    stdlib_seconds = None
+    for name, (dumps, _, reference_dumps) in JSON_BACKENDS.items():
+        reference = [reference_dumps(message) for message in messages]
+        total_bytes = sum(len(payload) for payload in reference)
+        best = float("inf")
+        for _ in range(REPEATS):
+            started = time.perf_counter()
+            payloads = [dumps(message) for message in messages]
+            best = min(best, time.perf_counter() - started)
+        assert payloads == reference, f"{name} is not byte-identical to its json.dumps reference"
+        stdlib_seconds = stdlib_seconds or best
+        print(f"{name:>8} {best / len(messages) * 1e6:>11.1f} {total_bytes / best / 2**20:>7.1f}"
+              f"  ({stdlib_seconds / best:.1f}x)")
+    if orjson is not None:
+        fallbacks = sum(1 for message in messages
+                        if orjson_may_differ(orjson.dumps(message, default=record_to_wire)))
+        print(f"orjson fell back to json on {fallbacks} of {len(messages)} messages; all output byte-identical")
+
+
+# ============================================================================
+#  END TO END: BROADCAST THROUGHPUT
+# ============================================================================
+
+def serve(port):
+    """Server process: heavy-demand physics under the RUNTIME_PROFILE in its environment."""
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    demand = DemandModel(turning_od(HEAVY_FLOW), profile=FLAT_PROFILE, seed=0)
+    simulator = TrafficSimulator(interval=60, physics=True, seed=0, demand=demand)
+    runtime.run(WebSocketServer(simulator, host=HOST, port=port).run())
+
+
+def start_server(port, profile, clients):
+    env = dict(os.environ)
+    env.update({
+        "RUNTIME_PROFILE": profile,
+        "MAX_CLIENTS": str(clients + 10),
+        "PHYSICS_HZ": str(BROADCAST_HZ),
+        "VEHICLE_BROADCAST_HZ": str(BROADCAST_HZ),
+        "WS_COMPRESSION": "off",  # Measure the loop and the encoder, not zlib
+        "RATE_LIMIT_ENABLED": "0",
+        "ALLOWED_ORIGINS": "",
+        "CHECKPOINT_PATH": "",  # Every run starts from a fresh simulation
+    })
+    log = open(os.path.join(ROOT, "runtime_bench.server.log"), "w")
+    return subprocess.Popen([sys.executable, "-m", "benchmarks.runtime_bench", "--serve", str(port)],
+                            cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+async def client(session, url, stats, recording):
+    """Receive everything, noting each message's delivery latency while recording is set."""
+    async with session.ws_connect(url) as ws:
+        async for msg in ws:
+            if recording.is_set():
+                received_ms = time.time() * 1000
+                server_time = int(msg.data[msg.data.index('"ServerTime":') + 13:].split(",", 1)[0].rstrip("}"))
+                stats.append(received_ms - server_time)
+
+
+async def run_profile(profile, clients):
+    port = free_port()
+    base_url = f"http://{HOST}:{port}"
+    server = start_server(port, profile, clients)
+    latencies = []
+    recording = asyncio.Event()
+    try:
+        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0)) as session:
+            await wait_ready(session, base_url)
+            tasks = [asyncio.create_task(client(session, base_url + "/", latencies, recording))
+                     for _ in range(clients)]
+            await asyncio.sleep(3)
+            before = await scrape_counters(session, base_url)
+            _, cpu_before = process_stats(server.pid)
+            started = time.monotonic()
+            recording.set()
+            await asyncio.sleep(DURATION)
+            recording.clear()
+            elapsed = time.monotonic() - started
+            _, cpu = process_stats(server.pid)
+            after = await scrape_counters(session, base_url)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        server.terminate()
+        server.wait()
+
+    def delta(name):
+        return after.get(name, 0) - before.get(name, 0)
+
+    broadcasts = delta("traffic_messages_broadcast_total")
+    encodes = delta("traffic_encode_seconds_count")
+    latencies.sort()
+    return {
+        "delivered_per_s": len(latencies) / elapsed,
+        "frames_per_s": delta("traffic_frames_sent_total") / elapsed,
+        "p50": statistics.median(latencies) if latencies else 0,
+        "p99": percentile(latencies, 0.99) or 0,
+        "cpu_percent": (cpu - cpu_before) / elapsed * 100,
+        "cpu_ms_per_broadcast": (cpu - cpu_before) / broadcasts * 1000 if broadcasts else 0,
+        "encode_us": delta("traffic_encode_seconds_sum") / encodes * 1e6 if encodes else 0,
+    }
+
+
+async def throughput(clients):
+    print(f"\n{clients} clients, physics broadcasts at {BROADCAST_HZ} Hz under heavy demand, {DURATION}s per profile")
+    print(f"{'profile':>8} {'delivered/s':>12} {'frames/s':>9} {'p50 ms':>7} {'p99 ms':>7} {'srv CPU%':>9} "
+          f"{'CPU ms/bcast':>13} {'encode us':>10}")
+    for profile in runtime.RUNTIME_PROFILES:
+        r = await run_profile(profile, clients)
+        print(f"{profile:>8} {r['delivered_per_s']:>12.0f} {r['frames_per_s']:>9.0f} {r['p50']:>7.1f} "
+              f"{r['p99']:>7.1f} {r['cpu_percent']:>9.1f} {r['cpu_ms_per_broadcast']:>13.2f} {r['encode_us']:>10.1f}")
+
+
+def main():
+    if sys.argv[1:2] == ["--serve"]:
+        serve(int(sys.argv[2]))
+        return
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_CLIENTS
+    raise_file_limit()
+    encoder_comparison()
+    asyncio.run(throughput(clients))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Subscription Benchmark
+Broadcasts a physics-mode state to 1000 clients split across a few narrow
+views, comparing the grouped fan-out (filter and encode once per subscription
+and format) with filtering per client, and egress with everyone on the full view.
+
+Usage:
+    python -m benchmarks.subscription_bench
+"""
+
+import asyncio
+import statistics
+import time
+
+from benchmarks.broadcast_bench import FakeWebSocket
+from protocol import Subscription, encode_message, make_snapshot
+from server import ClientConnection, WebSocketServer
+from traffic_simulation import TrafficSimulator
+
+
+NUM_CLIENTS = 1000
+ROUNDS = 20
+
+VIEWS = {
+    "full": None,
+    "lights only": Subscription(fields=["Lights"]),
+    "north approach": Subscription(directions=["N"]),
+    "nearby vehicles": Subscription(fields=["Vehicles"], radius=30),
+}
+
+
+def make_server(views):
+    """Server with NUM_CLIENTS idle clients spread evenly over the given views."""
+    simulator = TrafficSimulator(physics=True, seed=0)
+    server = WebSocketServer(simulator)
+    for _ in range(3):  # Let a few intervals of vehicles build up
+        simulator.generate_state()
+        simulator.update_vehicles(5.0)
+    server.current_state = simulator.generate_state()
+    for index in range(NUM_CLIENTS):
+        client = ClientConnection(FakeWebSocket(), "bench", queue_size=ROUNDS)
+        client.subscription = views[index % len(views)]
+        server.clients.add(client)
+    return server
+
+
+def drain(server):
+    """Bytes waiting in every client's queue, emptying them."""
+    total = 0
+    for client in server.clients:
+        while not client.queue.empty():
+            total += len(client.queue.get_nowait()[1])
+    return total
+
+
+async def measure(views, per_client):
+    """Median broadcast time (ms) and bytes queued per broadcast."""
+    server = make_server(views)
+    times = []
+    for seq in range(ROUNDS):
+        message = make_snapshot(server.current_state, seq)
+        start = time.perf_counter()
+        if per_client:
+            for client in server.clients:
+                client.enqueue(encode_message(client.view(message), client.format))
+        else:
+            await server.broadcast(message)
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times), drain(server) / ROUNDS
+
+
+async def main():
+    views = list(VIEWS.values())
+    print(f"{NUM_CLIENTS} clients over {len(views)} views: {', '.join(VIEWS)}")
+    print(f"{'mode':>24} {'median ms':>10} {'kB/broadcast':>13}")
+    for label, mode_views, per_client in (
+        ("everyone full view", [None], False),
+        ("per-client filtering", views, True),
+        ("grouped subscriptions", views, False),
+    ):
+        median_ms, queued = await measure(mode_views, per_client)
+        print(f"{label:>24} {median_ms:>10.2f} {queued / 1000:>13.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,50 @@
+"""
+Wire Format Benchmark
+Compares JSON and MessagePack message size and encode time for snapshots
+with growing vehicle counts (the high-frequency server-physics stream).
+
+Usage:
+    python -m benchmarks.wire_bench
+"""
+
+import time
+
+from grid_simulation import GridSimulator
+from protocol import JSON, MSGPACK, available_formats, encode_message, make_snapshot
+
+
+VEHICLE_COUNTS = [24, 1_000, 10_000]
+REPEATS = 20
+
+
+def make_state(num_vehicles):
+    """Per-intersection snapshot carrying roughly num_vehicles vehicles."""
+    grid = GridSimulator(max(1, num_vehicles // 20), seed=0, physics=True)
+    state = grid.generate_state(0)
+    # Gather the whole grid's vehicles into one state to emulate a dense stream
+    state["Vehicles"] = [record for i in range(grid.num_intersections)
+                         for record in grid.get_current_vehicles(i)][:num_vehicles]
+    return make_snapshot(state, 1)
+
+
+def time_encode(message, fmt):
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        payload = encode_message(message, fmt)
+    return (time.perf_counter() - start) / REPEATS, len(payload)
+
+
+def main():
+    formats = [fmt for fmt in (JSON, MSGPACK) if fmt in available_formats()]
+    if MSGPACK not in formats:
+        print("msgpack is not installed; only JSON is measured")
+    print(f"{'vehicles':>9} {'format':>8} {'bytes':>9} {'encode ms':>10}")
+    for count in VEHICLE_COUNTS:
+        message = make_state(count)
+        for fmt in formats:
+            elapsed, size = time_encode(message, fmt)
+            print(f"{len(message['Vehicles']):>9} {fmt:>8} {size:>9} {elapsed * 1000:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+State Bus and Broadcaster Workers
+Runs the simulation in one process that publishes every message over a local
+Unix socket, and N stateless worker processes that share the public port
+(SO_REUSEPORT) and fan those messages out to their own WebSocket clients
+"""
+
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import struct
+
+from protocol import JSON, apply_message, decode_json, encode_message
+from recorder import StateRecorder
+from server import WebSocketServer
+import runtime
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================================================
+#  FRAMING
+# ============================================================================
+
+FRAME_HEADER = struct.Struct('!cI')  # kind, payload length
+STATE = b'S'    # publisher -> workers: a JSON-encoded snapshot or patch message
+METRICS = b'M'  # workers -> publisher: worker metrics; publisher -> workers: cluster totals
+
+MAX_SUBSCRIBER_BUFFER = 16 * 1024 * 1024  # Drop a worker that falls this far behind
+METRICS_PERIOD = 1.0  # seconds between metrics reports
+RECONNECT_DELAY = 0.5  # seconds between bus connection attempts
+
+
+def pack_frame(kind, payload):
+    """Prefix a payload with its kind and length."""
+    return FRAME_HEADER.pack(kind, len(payload)) + payload
+
+
+async def read_frame(reader):
+    """Read one (kind, payload) frame from a stream."""
+    kind, length = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+    return kind, await reader.readexactly(length)
+
+
+# ============================================================================
+#  PUBLISHER
+# ============================================================================
+
+class StateBusPublisher:
+    """Unix socket server that fans encoded messages out to broadcaster workers."""
+
+    def __init__(self, path, snapshot_source):
+        self.path = path
+        self.snapshot_source = snapshot_source  # Callable returning the current snapshot's JSON text
+        self.subscribers = set()
+        self.worker_metrics = {}  # subscriber writer -> latest reported metrics
+        self.server = None
+
+    async def start(self):
+        """Listen on the bus socket, replacing a stale one from a previous run."""
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self.server = await asyncio.start_unix_server(self._handle_subscriber, path=self.path)
+
+    async def _handle_subscriber(self, reader, writer):
+        """Send a fresh snapshot to a new worker, then collect its metrics reports."""
+        snapshot = self.snapshot_source()
+        if snapshot is not None:
+            writer.write(pack_frame(STATE, snapshot.encode()))
+        self.subscribers.add(writer)
+        logger.info(f"Broadcaster worker attached ({len(self.subscribers)} total)")
+
+        try:
+            while True:
+                kind, payload = await read_frame(reader)
+                if kind == METRICS:
+                    self.worker_metrics[writer] = json.loads(payload)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.subscribers.discard(writer)
+            self.worker_metrics.pop(writer, None)
+            writer.close()
+            logger.info(f"Broadcaster worker detached ({len(self.subscribers)} total)")
+
+    def publish(self, kind, payload):
+        """Write a frame to every worker without waiting, dropping workers that lag too far."""
+        frame = pack_frame(kind, payload)
+        for writer in list(self.subscribers):
+            if writer.transport.get_write_buffer_size() > MAX_SUBSCRIBER_BUFFER:
+                logger.warning("Dropping lagging broadcaster worker")
+                self.subscribers.discard(writer)
+                writer.close()
+                continue
+            writer.write(frame)
+
+    def aggregate_metrics(self):
+        """Sum the latest metrics reported by every worker."""
+        reports = list(self.worker_metrics.values())
+        return {
+            "workers": len(reports),
+            "connected_clients": sum(report["connected_clients"] for report in reports),
+            "max_clients": sum(report["max_clients"] for report in reports),
+            "rate_limited_ips": sum(report["rate_limited_ips"] for report in reports),
+        }
+
+
+class SimulationPublisher(WebSocketServer):
+    """Runs the simulation loop and publishes every message to the state bus instead of sockets."""
+
+    def __init__(self, simulator, bus_path):
+        super().__init__(simulator)
+        self.bus = StateBusPublisher(bus_path, self.snapshot_payload)
+
+    async def broadcast(self, state, payloads=None):
+        """Encode once and hand the message to every worker (and the recorder, if any)."""
+        payloads = dict(payloads) if payloads else {}
+        if self.recorder:
+            self.record(state, payloads)
+        payload = payloads.get(JSON) or encode_message(state)
+        self.bus.publish(STATE, payload.encode())
+
+    async def metrics_loop(self):
+        """Periodically publish cluster-wide totals so any worker can serve /metrics."""
+        while True:
+            await asyncio.sleep(METRICS_PERIOD)
+            totals = self.bus.aggregate_metrics()
+            totals["uptime_intervals"] = self.total_intervals
+            self.bus.publish(METRICS, json.dumps(totals).encode())
+
+    async def run(self):
+        """Start the bus and run the simulation loop."""
+        await self.bus.start()
+        logger.info(f"State bus listening on {self.bus.path}")
+        logger.info(f"State updates every {self.simulator.interval} seconds")
+        metrics_task = asyncio.create_task(self.metrics_loop())
+        try:
+            await self.state_loop()
+        finally:
+            metrics_task.cancel()
+
+
+# ============================================================================
+#  BROADCASTER WORKER
+# ============================================================================
+
+class BroadcastWorker(WebSocketServer):
+    """Stateless fan-out process: relays bus messages to its own WebSocket clients.
+
+    It keeps a copy of the current state, rebuilt from snapshots and patches, so
+    it can answer joins and resyncs without asking the simulator.
+    """
+
+    def __init__(self, bus_path, host="0.0.0.0", port=8000, worker_id=0):
+        super().__init__(None, host=host, port=port)
+        self.bus_path = bus_path
+        self.worker_id = worker_id
+        self.reuse_port = True
+        self.cluster_metrics = None
+
+    async def state_loop(self):
+        """Relay messages from the state bus, reconnecting if it goes away."""
+        while True:
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.bus_path)
+            except (FileNotFoundError, ConnectionError):
+                await asyncio.sleep(RECONNECT_DELAY)
+                continue
+
+            report_task = asyncio.create_task(self.report_metrics(writer))
+            try:
+                while True:
+                    kind, payload = await read_frame(reader)
+                    if kind == STATE:
+                        await self.relay(payload)
+                    elif kind == METRICS:
+                        self.cluster_metrics = json.loads(payload)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                logger.warning(f"Worker {self.worker_id} lost the state bus, reconnecting")
+            finally:
+                report_task.cancel()
+                writer.close()
+            await asyncio.sleep(RECONNECT_DELAY)
+
+    async def relay(self, payload):
+        """Apply a bus message to the local state copy and fan it out, reusing the JSON text."""
+        text = payload.decode()
+        message = decode_json(text)
+        self.apply_message(message)
+        await self.broadcast(message, {JSON: text})
+
+    def apply_message(self, message):
+        """Update the local state copy from a snapshot or patch."""
+        self.seq = message["Seq"]
+        self.current_state = apply_message(self.current_state, message)
+
+    async def report_metrics(self, writer):
+        """Send this worker's metrics to the publisher once per period."""
+        while True:
+            writer.write(pack_frame(METRICS, json.dumps(super().collect_metrics()).encode()))
+            await asyncio.sleep(METRICS_PERIOD)
+
+    def collect_metrics(self):
+        """Cluster-wide totals from the publisher, plus this worker's own numbers."""
+        local = super().collect_metrics()
+        if not self.cluster_metrics:
+            return dict(local, worker=dict(local, id=self.worker_id))
+        metrics = dict(self.cluster_metrics)
+        metrics["worker"] = dict(local, id=self.worker_id)
+        return metrics
+
+
+# ============================================================================
+#  CLUSTER
+# ============================================================================
+
+def run_worker(bus_path, host, port, worker_id):
+    """Process entry point for one broadcaster worker."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f'%(asctime)s - worker {worker_id} - %(levelname)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+    try:
+        runtime.run(BroadcastWorker(bus_path, host, port, worker_id).run())
+    except KeyboardInterrupt:
+        pass
+
+
+async def run_cluster(simulator, host, port, workers, bus_path, record_path=None):
+    """Run the simulator here and N broadcaster workers as separate processes on one port.
+    
+    With record_path, the simulator process also records every message it publishes.
+    """
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=run_worker, args=(bus_path, host, port, worker_id),
+                        name=f"broadcaster-{worker_id}", daemon=True)
+        for worker_id in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    logger.info(f"Started {workers} broadcaster workers on http://{host}:{port}")
+
+    publisher = SimulationPublisher(simulator, bus_path)
+    if record_path:
+        publisher.recorder = StateRecorder(record_path, publisher.snapshot_payload)
+    try:
+        await publisher.run()
+    finally:
+        if publisher.recorder:
+            publisher.recorder.close()
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
@@ -0,0 +1,65 @@
+"""
+Simulation Checkpoints
+Saves the server's simulation state to a JSON file and loads it back, so a
+restarted server picks up where the last one stopped instead of starting over.
+
+File: one JSON object with a format version, written to a temporary file next
+to the checkpoint, fsynced and renamed over it (then the directory is fsynced),
+so a crash mid-write leaves the previous checkpoint intact.
+"""
+
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+CHECKPOINT_VERSION = 1
+
+
+def temp_path(path):
+    """Path the next checkpoint is written to before it replaces path."""
+    return path + ".tmp"
+
+
+def save_checkpoint(path, data):
+    """Atomically replace the checkpoint at path with data. Blocks on disk; returns the bytes written."""
+    body = json.dumps({"version": CHECKPOINT_VERSION, **data}, separators=(",", ":")).encode()
+    temp = temp_path(path)
+    with open(temp, "wb") as f:
+        f.write(body)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp, path)
+    directory = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(directory)  # Make the rename itself durable
+    finally:
+        os.close(directory)
+    return len(body)
+
+
+def load_checkpoint(path):
+    """The checkpoint saved at path, or None if there is none or it cannot be used (it is then set aside)."""
+    try:
+        with open(path, "rb") as f:
+            data = json.loads(f.read())
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        discard_checkpoint(path, f"unreadable: {e}")
+        return None
+    if not isinstance(data, dict) or data.get("version") != CHECKPOINT_VERSION:
+        discard_checkpoint(path, f"not a version {CHECKPOINT_VERSION} checkpoint")
+        return None
+    return data
+
+
+def discard_checkpoint(path, reason):
+    """Set an unusable checkpoint aside as <path>.bad, so the next start does not trip over it again."""
+    logger.warning(f"Ignoring checkpoint {path} ({reason}), moving it to {path}.bad")
+    try:
+        os.replace(path, path + ".bad")
+    except OSError as e:
+        logger.warning(f"Could not move checkpoint {path} aside: {e}")
@@ -0,0 +1,223 @@
+"""
+Traffic Demand Model
+Generates an interval's vehicle arrivals in one vectorized batch with NumPy's
+Generator API: origin-destination flows per approach, scaled by a time-of-day
+profile and the current event, arriving as a Poisson process of platoons
+"""
+
+import numpy as np
+
+from traffic_simulation import BASE_FLOW, DIRECTIONS
+
+
+# ============================================================================
+#  DEMAND CONSTANTS
+# ============================================================================
+
+DAY_SECONDS = 24 * 3600
+STRAIGHT_SHARE = 0.7        # Fraction of an approach's vehicles going straight through
+PLATOON_SIZE = 4.0          # Mean vehicles per platoon for platoon arrivals
+PLATOON_HEADWAY = 2.0       # Seconds between vehicles within a platoon
+ENTRY_HEADWAY = 1.5         # Minimum seconds between vehicles entering the same approach
+SPEED_RANGE = (8, 15)       # Cruise speeds, as drawn by TrafficSimulator.generate_state
+
+# Hourly demand multipliers from midnight (weekday, with morning and evening peaks),
+# interpolated linearly and wrapped around the day
+WEEKDAY_PROFILE = (
+    0.3, 0.2, 0.15, 0.15, 0.2, 0.4, 0.9, 1.6, 1.9, 1.4, 1.0, 1.0,
+    1.1, 1.0, 1.0, 1.2, 1.6, 2.0, 1.8, 1.2, 0.9, 0.7, 0.5, 0.4,
+)
+FLAT_PROFILE = (1.0,)
+
+OPPOSITE = {"N": "S", "S": "N", "E": "W", "W": "E"}
+
+
+def turning_od(flow=BASE_FLOW, straight_share=STRAIGHT_SHARE):
+    """OD matrix in vehicles/min: rows are origin approaches, columns exit directions (DIRECTIONS order).
+
+    Each approach carries flow, straight_share of it to the opposite side and the
+    rest split evenly between the two turns. Nobody makes a U-turn.
+    """
+    num_directions = len(DIRECTIONS)
+    od = np.full((num_directions, num_directions), flow * (1 - straight_share) / 2)
+    np.fill_diagonal(od, 0.0)
+    for i, direction in enumerate(DIRECTIONS):
+        od[i, DIRECTIONS.index(OPPOSITE[direction])] = flow * straight_share
+    return od
+
+
+# ============================================================================
+#  ARRIVALS
+# ============================================================================
+
+class Arrivals:
+    """A batch of arrivals as parallel arrays, sorted by entry time.
+
+    time: seconds at which each vehicle enters its approach (from the interval
+    start, or on whatever clock the owner shifts them to); origin and
+    destination: DIRECTIONS indices; id: vehicle id; speed: cruise speed.
+    """
+
+    __slots__ = ('time', 'origin', 'destination', 'id', 'speed')
+
+    def __init__(self, time, origin, destination, ids, speed):
+        self.time = time
+        self.origin = origin
+        self.destination = destination
+        self.id = ids
+        self.speed = speed
+
+    def __len__(self):
+        return self.id.size
+
+    def counts(self):
+        """Vehicles per origin approach, in DIRECTIONS order."""
+        return np.bincount(self.origin, minlength=len(DIRECTIONS))
+
+    def checkpoint(self):
+        """Every field as a plain list, for a JSON checkpoint."""
+        return {field: getattr(self, field).tolist() for field in self.__slots__}
+
+    @classmethod
+    def from_checkpoint(cls, data):
+        """The batch saved by checkpoint(). Raises ValueError if the fields differ in length."""
+        batch = cls(
+            np.asarray(data['time'], dtype=np.float64),
+            np.asarray(data['origin'], dtype=np.int8),
+            np.asarray(data['destination'], dtype=np.int8),
+            np.asarray(data['id'], dtype=np.int64),
+            np.asarray(data['speed'], dtype=np.float64),
+        )
+        if len({getattr(batch, field).shape for field in cls.__slots__}) != 1 or batch.id.ndim != 1:
+            raise ValueError("checkpoint arrival fields differ in length")
+        return batch
+
+    def take(self, index):
+        """The arrivals selected by an index array or boolean mask."""
+        return Arrivals(*(getattr(self, field)[index] for field in self.__slots__))
+
+    def merge(self, other):
+        """Both batches in one, still sorted by entry time."""
+        fields = [np.concatenate([getattr(self, field), getattr(other, field)]) for field in self.__slots__]
+        order = np.argsort(fields[0], kind='stable')
+        return Arrivals(*(values[order] for values in fields))
+
+    def release(self, until, clear):
+        """Split off the vehicles due to enter by time until: at most one per approach,
+        and only where clear (a bool per direction) says the entry has room.
+        Returns (entering, still waiting); the rest keep their place in line.
+        """
+        due = int(np.searchsorted(self.time, until, side='right'))
+        origin = self.origin[:due]
+        first = np.sort(np.unique(origin, return_index=True)[1])
+        first = first[np.asarray(clear)[origin[first]]]
+        waiting = np.ones(len(self), dtype=bool)
+        waiting[first] = False
+        return self.take(first), self.take(waiting)
+
+
+# ============================================================================
+#  DEMAND MODEL
+# ============================================================================
+
+class DemandModel:
+    """Origin-destination demand with a time-of-day profile and platoon arrivals.
+
+    od: vehicles/min from each origin approach to each exit direction (see turning_od).
+    profile: demand multipliers spread evenly over the day from midnight.
+    platoon_size: mean vehicles per platoon; 1 gives plain Poisson arrivals, larger
+    values bunch vehicles (as released by an upstream signal) at the same mean flow.
+    The model keeps its own time of day, advanced by each interval it generates,
+    and draws everything from one seeded Generator, so a seed fixes the whole stream.
+    """
+
+    def __init__(self, od=None, profile=WEEKDAY_PROFILE, platoon_size=1.0, start_hour=0.0, seed=None):
+        if platoon_size < 1:
+            raise ValueError("platoon_size must be at least 1")
+        self.od = turning_od() if od is None else np.asarray(od, dtype=np.float64)
+        self.profile = np.asarray(profile, dtype=np.float64)
+        self.platoon_size = platoon_size
+        self.time_of_day = (start_hour * 3600.0) % DAY_SECONDS
+        self.rng = np.random.default_rng(seed)
+
+    def checkpoint(self):
+        """Time of day and generator state, for a JSON checkpoint (od and profile are configuration)."""
+        return {"time_of_day": self.time_of_day, "rng": self.rng.bit_generator.state}
+
+    def restore(self, data):
+        """Carry on the arrival stream saved by checkpoint()."""
+        self.time_of_day = float(data["time_of_day"])
+        self.rng.bit_generator.state = data["rng"]
+
+    def skip(self, seconds):
+        """Move the time of day on by seconds without drawing arrivals (e.g. over server downtime)."""
+        self.time_of_day = (self.time_of_day + seconds) % DAY_SECONDS
+
+    def multiplier(self, time_of_day):
+        """Profile multiplier at a time of day (seconds from midnight)."""
+        hours = np.linspace(0, 24, self.profile.size + 1)
+        return float(np.interp((time_of_day / 3600.0) % 24, hours, np.append(self.profile, self.profile[0])))
+
+    def arrivals(self, duration, flow_mult=1.0, first_id=1):
+        """Draw the next duration seconds of arrivals and advance the time of day.
+
+        Flows are the OD matrix scaled by the profile at the interval's midpoint and
+        by flow_mult. Platoons start as a Poisson process per origin-destination pair
+        and have geometric sizes. Vehicles then enter their approach no closer than
+        ENTRY_HEADWAY apart, so a burst spills a little past the interval.
+        Vehicles are numbered from first_id in entry order.
+        """
+        rng = self.rng
+        expected = self.od * (self.multiplier(self.time_of_day + duration / 2) * flow_mult * duration / 60)
+        self.time_of_day = (self.time_of_day + duration) % DAY_SECONDS
+
+        platoons = rng.poisson(expected / self.platoon_size)
+        pair = np.repeat(np.arange(platoons.size), platoons.ravel())
+        starts = rng.uniform(0, duration, pair.size)
+        if self.platoon_size > 1:
+            sizes = rng.geometric(1 / self.platoon_size, pair.size)
+        else:
+            sizes = np.ones(pair.size, dtype=np.int64)
+
+        # One row per vehicle: its platoon, and its place within the platoon
+        platoon = np.repeat(np.arange(pair.size), sizes)
+        place = np.arange(platoon.size) - (np.cumsum(sizes) - sizes)[platoon]
+        time = starts[platoon] + place * PLATOON_HEADWAY
+        origin, destination = np.divmod(pair[platoon], self.od.shape[1])
+
+        # Entry queue per approach: e[i] = max(t[i], e[i-1] + h), which unrolls to
+        # rank * h + running max of (t - rank * h); an offset per origin keeps the
+        # running max from carrying over between approaches
+        order = np.lexsort((time, origin))
+        time, origin, destination = time[order], origin[order], destination[order]
+        rank = np.arange(time.size) - np.searchsorted(origin, origin)
+        offset = (time.max() if time.size else 0.0) + time.size * ENTRY_HEADWAY + 1
+        slack = time - rank * ENTRY_HEADWAY + origin * offset
+        time = np.maximum.accumulate(slack) - origin * offset + rank * ENTRY_HEADWAY
+
+        order = np.argsort(time, kind='stable')
+        return Arrivals(
+            time[order],
+            origin[order].astype(np.int8),
+            destination[order].astype(np.int8),
+            np.arange(first_id, first_id + time.size, dtype=np.int64),
+            rng.uniform(*SPEED_RANGE, time.size),
+        )
+
+
+# ============================================================================
+#  NAMED MODELS
+# ============================================================================
+
+DEMAND_MODELS = ("classic", "poisson", "platoon")
+
+
+def make_demand(name, seed=None, start_hour=0.0):
+    """Demand model by name: None for classic (the simulator's built-in batch), or a DemandModel."""
+    if name == "classic":
+        return None
+    if name == "poisson":
+        return DemandModel(start_hour=start_hour, seed=seed)
+    if name == "platoon":
+        return DemandModel(platoon_size=PLATOON_SIZE, start_hour=start_hour, seed=seed)
+    raise ValueError(f"unknown demand model '{name}'")
@@ -0,0 +1,220 @@
+"""
+City Grid Simulation
+Vectorized engine for many intersections: light phases, timers and vehicles
+live in NumPy arrays and the whole grid advances in one batched step
+"""
+
+import numpy as np
+
+from traffic_simulation import (
+    BASE_FLOW,
+    COLOR_NAMES,
+    DIRECTIONS,
+    EVENTS,
+    GREEN,
+    MAX_NEAR,
+    MAX_VEHICLES_PER_DIRECTION,
+    RED,
+    YELLOW,
+    LightRecord,
+    TrafficRecord,
+    now_ms,
+)
+from vehicle_physics import VehicleKinematics
+
+
+# ============================================================================
+#  PHASE TABLES
+# ============================================================================
+
+# Each intersection cycles through four phases. N/S and E/W share a phase.
+PHASE_NS_GREEN = 0
+PHASE_NS_YELLOW = 1
+PHASE_EW_GREEN = 2
+PHASE_EW_YELLOW = 3
+NUM_PHASES = 4
+
+# Color index of each direction (columns N, S, E, W) for each phase
+PHASE_COLORS = np.array([
+    [GREEN, GREEN, RED, RED],
+    [YELLOW, YELLOW, RED, RED],
+    [RED, RED, GREEN, GREEN],
+    [RED, RED, YELLOW, YELLOW],
+], dtype=np.int8)
+
+EVENT_FLOW_MULTS = np.array([event["flow_mult"] if event else 1.0 for event in EVENTS])
+
+
+# ============================================================================
+#  GRID SIMULATOR
+# ============================================================================
+
+class GridSimulator:
+    """Simulates a grid of independent four-way intersections with array state.
+
+    Lights: `phase` (int8) and `phase_timer` (seconds left in phase) per intersection,
+    with per-intersection phase durations in `durations` (n x 4).
+    Vehicles: a VehicleKinematics structure-of-arrays sorted by intersection.
+    With physics enabled, vehicles move every step and persist across intervals.
+    """
+
+    def __init__(self, num_intersections, interval=60, green_duration=30, yellow_duration=3,
+                 offsets=None, seed=None, physics=False):
+        self.num_intersections = num_intersections
+        self.interval = interval
+        self.physics = physics
+        self.rng = np.random.default_rng(seed)
+        self.vehicle_counter = 0
+
+        # Light state: every intersection starts N/S green, then is advanced by its offset
+        self.durations = np.tile(
+            np.array([green_duration, yellow_duration, green_duration, yellow_duration], dtype=np.float64),
+            (num_intersections, 1)
+        )
+        self.phase = np.full(num_intersections, PHASE_NS_GREEN, dtype=np.int8)
+        self.phase_timer = np.full(num_intersections, float(green_duration))
+        if offsets is not None:
+            self.step(np.asarray(offsets, dtype=np.float64))
+
+        # Per-interval traffic state
+        self.event_index = np.zeros(num_intersections, dtype=np.intp)
+        self.flows = np.zeros((num_intersections, len(DIRECTIONS)), dtype=np.int64)
+
+        # Vehicle state (structure of arrays)
+        self.vehicles = VehicleKinematics()
+
+        self.new_interval()
+
+    # ------------------------------------------------------------------------
+    #  Lights
+    # ------------------------------------------------------------------------
+
+    def step(self, dt):
+        """Advance every intersection by dt seconds (scalar or per-intersection array)."""
+        self.phase_timer -= dt
+
+        # Walk expired intersections through as many phases as dt covered,
+        # carrying the overshoot so timers do not drift
+        expired = np.flatnonzero(self.phase_timer <= 0)
+        while expired.size:
+            next_phase = (self.phase[expired] + 1) % NUM_PHASES
+            self.phase[expired] = next_phase
+            self.phase_timer[expired] += self.durations[expired, next_phase]
+            expired = expired[self.phase_timer[expired] <= 0]
+
+    def update_lights(self, dt):
+        """Update all traffic lights (same interface as TrafficSimulator)."""
+        self.step(dt)
+
+    def update_vehicles(self, dt):
+        """Advance every vehicle in the grid when physics is enabled."""
+        if self.physics:
+            self.vehicles.step(dt, self.light_colors(), self.light_timers())
+
+    def light_colors(self):
+        """Color index (GREEN/YELLOW/RED) per intersection and direction, shape (n, 4)."""
+        return PHASE_COLORS[self.phase]
+
+    def light_timers(self):
+        """Seconds until each light changes color, shape (n, 4).
+
+        A red light waits for the cross street's remaining green and yellow.
+        """
+        timers = np.repeat(self.phase_timer[:, None], len(DIRECTIONS), axis=1)
+        rows = np.arange(self.num_intersections)
+
+        ns_waiting = self.phase == PHASE_EW_GREEN
+        timers[ns_waiting, :2] += self.durations[rows[ns_waiting], PHASE_EW_YELLOW, None]
+
+        ew_waiting = self.phase == PHASE_NS_GREEN
+        timers[ew_waiting, 2:] += self.durations[rows[ew_waiting], PHASE_NS_YELLOW, None]
+        return timers
+
+    def time_to_next_light_event(self):
+        """Seconds until the next transition or displayed-second tick anywhere in the grid."""
+        fractions = np.maximum(self.phase_timer, 0.0) % 1.0
+        fractions[fractions == 0] = 1.0
+        return float(min(self.phase_timer.min(), fractions.min()))
+
+    def get_current_lights(self, intersection=0):
+        """Light records for one intersection."""
+        colors = PHASE_COLORS[self.phase[intersection]]
+        timers = self.light_timers_at(intersection)
+        timestamp_ms = now_ms()
+        return [
+            LightRecord(d, COLOR_NAMES[colors[i]], timers[i], timestamp_ms)
+            for i, d in enumerate(DIRECTIONS)
+        ]
+
+    def light_timers_at(self, intersection):
+        """Seconds until each light of one intersection changes color."""
+        timer = float(self.phase_timer[intersection])
+        phase = self.phase[intersection]
+        ns_timer = ew_timer = timer
+        if phase == PHASE_EW_GREEN:
+            ns_timer += float(self.durations[intersection, PHASE_EW_YELLOW])
+        elif phase == PHASE_NS_GREEN:
+            ew_timer += float(self.durations[intersection, PHASE_NS_YELLOW])
+        return [ns_timer, ns_timer, ew_timer, ew_timer]
+
+    # ------------------------------------------------------------------------
+    #  Traffic and vehicles
+    # ------------------------------------------------------------------------
+
+    def new_interval(self):
+        """Draw events, flows and vehicles for every intersection in one batch."""
+        n = self.num_intersections
+        num_directions = len(DIRECTIONS)
+        rng = self.rng
+
+        self.event_index = rng.integers(len(EVENTS), size=n)
+        flow_mult = EVENT_FLOW_MULTS[self.event_index]
+        self.flows = (BASE_FLOW * flow_mult[:, None] * rng.uniform(0.8, 1.2, (n, num_directions))).astype(np.int64)
+
+        # Vehicles: one slot per possible vehicle, masked by each approach's count
+        counts = np.clip(self.flows, 1, MAX_VEHICLES_PER_DIRECTION)
+        slots = np.arange(MAX_VEHICLES_PER_DIRECTION)
+        mask = slots < counts[:, :, None]
+
+        nearest = rng.uniform(-10, MAX_NEAR, (n, num_directions, 1))
+        spacing = rng.uniform(8, 15, (n, num_directions, MAX_VEHICLES_PER_DIRECTION))
+        positions = np.maximum(nearest - slots * spacing, -50)
+        speeds = rng.uniform(8, 15, (n, num_directions, MAX_VEHICLES_PER_DIRECTION))
+
+        intersection, direction, _ = np.nonzero(mask)
+        total = intersection.size
+        ids = np.arange(self.vehicle_counter + 1, self.vehicle_counter + total + 1)
+        self.vehicle_counter += total
+
+        # With physics, vehicles already on the road keep driving; otherwise each interval starts fresh
+        spawn = self.vehicles.add if self.physics else self.vehicles.replace
+        spawn(intersection, direction, ids, positions[mask], speeds[mask])
+
+    def get_current_vehicles(self, intersection=0):
+        """Vehicle records for one intersection."""
+        return self.vehicles.records(intersection)
+
+    # ------------------------------------------------------------------------
+    #  Per-intersection views
+    # ------------------------------------------------------------------------
+
+    def generate_state(self, intersection=0):
+        """Build the state record for one intersection from the grid arrays."""
+        event = EVENTS[self.event_index[intersection]]
+
+        traffic = [
+            TrafficRecord(d, int(self.flows[intersection, i]), event)
+            for i, d in enumerate(DIRECTIONS)
+        ]
+
+        vehicles = self.vehicles.records(intersection)
+
+        return {
+            "Lights": self.get_current_lights(intersection),
+            "Vehicles": vehicles,
+            "Traffic": traffic,
+            "Event": event,
+            "Interval": self.interval,
+            "Reset": True,  # Signal to frontend to clear old vehicles
+            "ServerTime": now_ms()
+        }
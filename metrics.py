@@ -0,0 +1,110 @@
+"""
+Metrics
+Minimal Prometheus-style counters and histograms for the server hot paths,
+rendered in the Prometheus text exposition format
+"""
+
+import bisect
+
+
+# Default latency buckets (seconds), from 50 us to 1 s
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+# ============================================================================
+#  METRIC TYPES
+# ============================================================================
+
+class Counter:
+    """Monotonically increasing count."""
+
+    type = "counter"
+
+    def __init__(self, registry, name, help):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.value = 0
+
+    def inc(self, amount=1):
+        if self.registry.enabled:
+            self.value += amount
+
+    def samples(self):
+        return [(self.name, "", self.value)]
+
+
+class Histogram:
+    """Distribution of observed values in fixed cumulative buckets."""
+
+    type = "histogram"
+
+    def __init__(self, registry, name, help, buckets=LATENCY_BUCKETS):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        if self.registry.enabled:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.sum += value
+            self.count += 1
+
+    def samples(self):
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            samples.append((f"{self.name}_bucket", f'{{le="{bound}"}}', cumulative))
+        samples.append((f"{self.name}_bucket", '{le="+Inf"}', self.count))
+        samples.append((f"{self.name}_sum", "", self.sum))
+        samples.append((f"{self.name}_count", "", self.count))
+        return samples
+
+
+# ============================================================================
+#  REGISTRY
+# ============================================================================
+
+class Registry:
+    """Holds process-wide metrics. When disabled, updates are ignored."""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.metrics = []
+
+    def counter(self, name, help):
+        metric = Counter(self, name, help)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help, buckets=LATENCY_BUCKETS):
+        metric = Histogram(self, name, help, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        """All registered metrics in the Prometheus text format."""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(f"{name}{labels} {value}" for name, labels, value in metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+def render_gauge(name, help, samples):
+    """Render a gauge computed at scrape time; samples are (labels dict, value) pairs."""
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} gauge"]
+    for labels, value in samples:
+        label_text = ",".join(f'{key}="{val}"' for key, val in labels.items())
+        lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()  # WebSocketServer applies METRICS_ENABLED once .env is loaded
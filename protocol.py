@@ -0,0 +1,360 @@
+"""
+Wire Protocol
+Builds the snapshot and patch messages broadcast to clients and encodes them
+in the wire format each client negotiated (JSON text, MessagePack binary or
+dictionary-deflated JSON), optionally deflated once for permessage-deflate
+"""
+
+import json
+import zlib
+
+from traffic_simulation import DIRECTIONS, INTERSECTION_POSITION, record_to_wire
+
+try:
+    import msgpack
+except ImportError:  # Binary format is unavailable without msgpack installed
+    msgpack = None
+
+try:
+    import orjson
+except ImportError:  # Only the stdlib JSON backend is available without orjson installed
+    orjson = None
+
+
+# ============================================================================
+#  MESSAGE TYPES
+# ============================================================================
+
+SNAPSHOT = "snapshot"  # Full state, sent on connect, on each interval and on resync
+PATCH = "patch"        # Changed light records (and, with server physics, vehicle positions)
+RESYNC = "resync"      # Client -> server: request a fresh snapshot after a sequence gap
+SUBSCRIBE = "subscribe"  # Client -> server: receive only some fields, directions or nearby vehicles
+
+
+# ============================================================================
+#  WIRE FORMATS
+# ============================================================================
+
+JSON = "json"
+MSGPACK = "msgpack"
+ZJSON = "zjson"  # JSON deflated against ZJSON_DICTIONARY, for clients that can inflate with a preset dictionary
+
+# WebSocket subprotocols a client can offer to pick a format
+SUBPROTOCOLS = {
+    "traffic.json": JSON,
+    "traffic.msgpack": MSGPACK,
+    "traffic.zjson": ZJSON,
+}
+
+# Preset dictionary for ZJSON: the keys and common values of every message, so even a
+# one-light patch compresses well. deflate favors the end of the dictionary, so the
+# most frequent fragments (light and vehicle records) come last. Clients must use
+# exactly these bytes; change them only together with a new subprotocol name.
+ZJSON_DICTIONARY = "".join([
+    '{"Type": "snapshot", "Seq": , "Reset": true, "Interval": 60, "Event": null, '
+    '"Event": {"name": "Rush Hour", "flow_mult": 1.8}, "ServerTime": 17',
+    '"Traffic": [{"direction": "N", "flow": 10, "event": null}, {"direction": "S", "flow": ',
+    '{"direction": "E", "flow": , {"direction": "W", "flow": ',
+    '"Vehicles": [{"Id": , "Sens": "N", "Voie": "Lane1", "Position": , "Speed": , "Waiting": false}, ',
+    '{"Id": , "Sens": "S", "Voie": "Lane1", "Position": -, "Speed": 1, "Waiting": true}, ',
+    '{"Type": "patch", "Seq": , "Lights": [{"Sens": "E", "Couleur": "RED", "Timer": , '
+    '"TimerMs": , "ExpiresAt": 17}, {"Sens": "W", "Couleur": "YELLOW", "Timer": ',
+    '{"Sens": "N", "Couleur": "GREEN", "Timer": , "TimerMs": , "ExpiresAt": 17',
+    '{"Sens": "S", "Couleur": "RED", "Timer": , "TimerMs": , "ExpiresAt": 17',
+]).encode()
+ZJSON_WBITS = 15
+
+
+def available_formats():
+    """Wire formats this server can encode."""
+    return [JSON, MSGPACK, ZJSON] if msgpack else [JSON, ZJSON]
+
+
+def available_subprotocols():
+    """Subprotocols to offer during the WebSocket handshake."""
+    formats = available_formats()
+    return [name for name, fmt in SUBPROTOCOLS.items() if fmt in formats]
+
+
+# ============================================================================
+#  MESSAGE BUILDERS
+# ============================================================================
+
+def make_snapshot(state, seq):
+    """Snapshot message: the full state with Reset set and a sequence number."""
+    snapshot = dict(state)
+    snapshot["Type"] = SNAPSHOT
+    snapshot["Seq"] = seq
+    snapshot["Reset"] = True
+    return snapshot
+
+
+def make_patch(lights, seq, server_time, vehicles=None):
+    """Patch message: changed light records, a sequence number and the server clock.
+    Vehicles are included only when server-side physics publishes positions."""
+    patch = {
+        "Type": PATCH,
+        "Seq": seq,
+        "Lights": lights,
+        "ServerTime": server_time
+    }
+    if vehicles is not None:
+        patch["Vehicles"] = vehicles
+    return patch
+
+
+def apply_message(state, message):
+    """Fold a decoded snapshot or patch into a wire-form state dict and return the new state.
+    
+    A snapshot replaces the state; a patch merges its light records by direction
+    and takes its clock and (if present) vehicles. Patches before any snapshot are ignored.
+    """
+    if message["Type"] == SNAPSHOT:
+        return message
+    if state is None:
+        return None
+    
+    lights = {light["Sens"]: light for light in state["Lights"]}
+    for light in message["Lights"]:
+        lights[light["Sens"]] = light
+    state["Lights"] = list(lights.values())
+    state["ServerTime"] = message["ServerTime"]
+    if "Vehicles" in message:
+        state["Vehicles"] = message["Vehicles"]
+    return state
+
+
+# ============================================================================
+#  SUBSCRIPTIONS
+# ============================================================================
+
+# State fields a client can opt in to; Type, Seq, ServerTime, Interval and Reset are always sent
+SUBSCRIBABLE_FIELDS = ("Lights", "Vehicles", "Traffic", "Event")
+
+
+class Subscription:
+    """A client's view: which fields, which directions, and vehicles within a radius.
+    
+    Subscriptions compare equal when their views match, so clients sharing one
+    can share a single filtered and encoded message.
+    """
+    
+    __slots__ = ('fields', 'directions', 'radius', 'key')
+    
+    def __init__(self, fields=SUBSCRIBABLE_FIELDS, directions=DIRECTIONS, radius=None):
+        self.fields = frozenset(fields)
+        self.directions = frozenset(directions)
+        self.radius = radius  # Max distance from the intersection center, or None for all vehicles
+        self.key = (self.fields, self.directions, radius)
+    
+    def __eq__(self, other):
+        return isinstance(other, Subscription) and self.key == other.key
+    
+    def __hash__(self):
+        return hash(self.key)
+    
+    def filter(self, message):
+        """Copy of a snapshot or patch reduced to this view. Patches are kept even if
+        nothing is left in them, so sequence numbers stay contiguous."""
+        filtered = {}
+        for name, value in message.items():
+            if name in SUBSCRIBABLE_FIELDS:
+                if name not in self.fields:
+                    continue
+                if name in ("Lights", "Traffic") or (name == "Vehicles" and value is not None):
+                    value = [record for record in value if self._wanted(record)]
+            filtered[name] = value
+        return filtered
+    
+    def _wanted(self, record):
+        if isinstance(record, dict):  # Wire dicts (relayed or replayed messages)
+            direction = record.get("Sens", record.get("direction"))
+            position = record.get("Position")
+        else:
+            direction = record.direction
+            position = getattr(record, "position", None)
+        if direction not in self.directions:
+            return False
+        return (self.radius is None or position is None
+                or abs(position - INTERSECTION_POSITION) <= self.radius)
+
+
+def parse_subscription(message):
+    """Build a Subscription from a client's subscribe message.
+    
+    Omitted keys mean everything. Returns None for the full view (the default for
+    every client) and raises ValueError for unknown fields or directions.
+    """
+    fields = message.get("Fields")
+    directions = message.get("Directions")
+    radius = message.get("Radius")
+    if fields is None:
+        fields = SUBSCRIBABLE_FIELDS
+    elif not isinstance(fields, list) or not all(field in SUBSCRIBABLE_FIELDS for field in fields):
+        raise ValueError(f"Fields must be a list drawn from {list(SUBSCRIBABLE_FIELDS)}")
+    if directions is None:
+        directions = DIRECTIONS
+    elif not isinstance(directions, list) or not all(direction in DIRECTIONS for direction in directions):
+        raise ValueError(f"Directions must be a list drawn from {DIRECTIONS}")
+    if radius is not None and (isinstance(radius, bool) or not isinstance(radius, (int, float)) or radius < 0):
+        raise ValueError("Radius must be a non-negative number")
+    
+    subscription = Subscription(fields, directions, radius)
+    return None if subscription == FULL_VIEW else subscription
+
+
+FULL_VIEW = Subscription()
+
+
+def changed_lights(previous, current):
+    """Return light records whose color or displayed second differs from the previous ones."""
+    last = {light.direction: light for light in previous}
+    changed = []
+    for light in current:
+        old = last.get(light.direction)
+        if (old is None or old.color != light.color
+                or int(old.timer) != int(light.timer)):
+            changed.append(light)
+    return changed
+
+
+# ============================================================================
+#  ENCODING
+# ============================================================================
+
+# The stdlib backend keeps json.dumps' default spacing, so the default profile's frames
+# (and ZJSON's preset dictionary) are unchanged. orjson only writes the compact layout,
+# so its frames match json.dumps with these separators instead.
+JSON_SEPARATORS = (",", ":")
+
+# Where orjson's output can differ from json.dumps: floats below 1e-4 (plain decimals
+# like 0.000075 instead of Python's 7.5e-05), exponents without a sign or zero padding
+# (1e16 and 2.5e-7 where json.dumps writes 1e+16 and 2.5e-07), and non-ASCII text
+# (json.dumps escapes it). Payloads that might contain any of these are re-encoded
+# with json.dumps. Exponents are found as a digit followed by "e", after mapping
+# every digit to 0 (one C-level pass, much faster than a regular expression).
+DIGITS_TO_ZERO = bytes.maketrans(b"123456789", b"000000000")
+
+
+def orjson_may_differ(data):
+    """Whether orjson output might not be byte-identical to json.dumps for the same message."""
+    return not data.isascii() or b"0.0000" in data or b"0e" in data.translate(DIGITS_TO_ZERO)
+
+
+def stdlib_dumps(message):
+    """JSON text of a message with the standard library encoder."""
+    return json.dumps(message, default=record_to_wire)
+
+
+def compact_dumps(message):
+    """Compact JSON text of a message with the standard library encoder, as orjson lays it out."""
+    return json.dumps(message, default=record_to_wire, separators=JSON_SEPARATORS)
+
+
+def orjson_dumps(message):
+    """JSON text of a message with orjson, identical to compact_dumps."""
+    try:
+        data = orjson.dumps(message, default=record_to_wire)
+    except TypeError:  # Integers past 64 bits, non-string keys and such: let json.dumps decide
+        return compact_dumps(message)
+    if orjson_may_differ(data):
+        return compact_dumps(message)
+    return data.decode()
+
+
+# Name -> (dumps, loads, reference): reference is the json.dumps layout the backend must
+# match byte for byte; switch with use_json_backend
+JSON_BACKENDS = {"stdlib": (stdlib_dumps, json.loads, stdlib_dumps)}
+if orjson is not None:
+    JSON_BACKENDS["orjson"] = (orjson_dumps, orjson.loads, compact_dumps)
+
+json_backend = "stdlib"
+dumps_json, loads_json, _ = JSON_BACKENDS[json_backend]
+
+
+def json_backend_mismatches(name, messages):
+    """Messages a JSON backend would encode differently from its json.dumps reference, or decode differently."""
+    dumps, loads, reference = JSON_BACKENDS[name]
+    mismatches = []
+    for message in messages:
+        expected = reference(message)
+        if dumps(message) != expected or loads(expected) != json.loads(expected):
+            mismatches.append(message)
+    return mismatches
+
+
+def use_json_backend(name):
+    """Encode and parse JSON with the named backend from now on (see runtime.configure_runtime)."""
+    global json_backend, dumps_json, loads_json
+    dumps_json, loads_json, _ = JSON_BACKENDS[name]
+    json_backend = name
+
+
+def decode_json(data):
+    """Parse JSON text or bytes with the current backend."""
+    return loads_json(data)
+
+
+def encode_message(message, fmt=JSON):
+    """Serialize a message (JSON text, MessagePack or ZJSON bytes), converting compact records to wire dicts."""
+    if fmt == MSGPACK:
+        return msgpack.packb(message, default=record_to_wire)
+    if fmt == ZJSON:
+        return zjson_compress(json.dumps(message, default=record_to_wire).encode())
+    return dumps_json(message)
+
+
+def parse_client_message(data, fmt=JSON):
+    """Parse a client frame into a dict, or None if it cannot be decoded."""
+    try:
+        if fmt == MSGPACK:
+            message = msgpack.unpackb(data)
+        elif fmt == ZJSON:
+            message = loads_json(zjson_decompress(data))
+        else:
+            message = loads_json(data)
+    except (ValueError, zlib.error):
+        return None
+    return message if isinstance(message, dict) else None
+
+
+# ============================================================================
+#  COMPRESSION
+# ============================================================================
+
+DEFLATE_TRAILER = b"\x00\x00\xff\xff"  # Stripped from every permessage-deflate message (RFC 7692)
+
+
+class DeflatedPayload:
+    """An encoded message already compressed for permessage-deflate, and whether it is a binary frame."""
+    
+    __slots__ = ('data', 'binary')
+    
+    def __init__(self, data, binary):
+        self.data = data
+        self.binary = binary
+
+
+def deflate_payload(payload, wbits=15, level=zlib.Z_DEFAULT_COMPRESSION):
+    """Compress one encoded message as a self-contained permessage-deflate message.
+    
+    A fresh compressor per message means the result never refers back to earlier
+    messages, so the same bytes are valid for every client that negotiated the
+    extension with this window size, with or without context takeover.
+    """
+    binary = isinstance(payload, bytes)
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -wbits)
+    data = compressor.compress(payload if binary else payload.encode()) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    return DeflatedPayload(data.removesuffix(DEFLATE_TRAILER), binary)
+
+
+def zjson_compress(data, level=zlib.Z_DEFAULT_COMPRESSION):
+    """Raw-deflate JSON bytes against the ZJSON preset dictionary."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -ZJSON_WBITS, zdict=ZJSON_DICTIONARY)
+    return compressor.compress(data) + compressor.flush()
+
+
+def zjson_decompress(data):
+    """Inverse of zjson_compress."""
+    decompressor = zlib.decompressobj(-ZJSON_WBITS, zdict=ZJSON_DICTIONARY)
+    return decompressor.decompress(data) + decompressor.flush()
@@ -0,0 +1,264 @@
+"""
+State Recorder and Replay Server
+Appends every broadcast message to a chunked binary log with a time index, and
+serves historical replays from a memory-mapped log at 1x-100x speed
+
+Log file: a sequence of frames, each a little-endian header (ServerTime in
+epoch ms, payload length) followed by the message's JSON text. Every chunk
+starts with a full snapshot, so playback can begin at any chunk.
+Index file (<log>.idx): one fixed-size (ServerTime, offset) entry per chunk,
+binary-searched in place through mmap to seek without parsing the log.
+"""
+
+import asyncio
+import logging
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from protocol import SNAPSHOT, apply_message, decode_json, encode_message, make_snapshot
+from server import WebSocketServer
+
+logger = logging.getLogger(__name__)
+
+
+FRAME_HEADER = struct.Struct('<qI')  # ServerTime (epoch ms), payload length
+INDEX_DTYPE = np.dtype([('time', '<i8'), ('offset', '<u8')])
+
+CHUNK_SECONDS = 60       # Start a new chunk (and index entry) at least this often
+MAX_REPLAY_SPEED = 100   # Fastest playback multiplier a client may request
+MAX_REPLAY_GAP = 5.0     # Wall seconds to wait at most between frames (skips server downtime)
+
+
+def index_path(path):
+    """Path of the time index that accompanies a log."""
+    return path + ".idx"
+
+
+# ============================================================================
+#  RECORDER
+# ============================================================================
+
+class StateRecorder:
+    """Append-only writer for the state log and its chunk index."""
+
+    def __init__(self, path, snapshot_source, chunk_seconds=CHUNK_SECONDS):
+        self.path = path
+        self.snapshot_source = snapshot_source  # Callable returning the current snapshot's JSON text
+        self.chunk_ms = int(chunk_seconds * 1000)
+        self.chunk_started = None  # ServerTime of the current chunk's first frame
+        self._repair()
+        self.log = open(path, "ab")
+        self.index = open(index_path(path), "ab")
+
+    def _repair(self):
+        """Trim a torn frame or index entry left by a crash so appends stay aligned."""
+        if not os.path.exists(self.path):
+            return
+        log_size = os.path.getsize(self.path)
+        index_file = index_path(self.path)
+        if os.path.exists(index_file):
+            entries = np.fromfile(index_file, dtype=INDEX_DTYPE)
+            entries = entries[entries['offset'] < log_size]
+        else:
+            entries = np.zeros(0, dtype=INDEX_DTYPE)
+
+        # Walk the last chunk to find where the last complete frame ends
+        end = int(entries[-1]['offset']) if len(entries) else 0
+        with open(self.path, "rb") as log:
+            log.seek(end)
+            while True:
+                header = log.read(FRAME_HEADER.size)
+                if len(header) < FRAME_HEADER.size:
+                    break
+                _, length = FRAME_HEADER.unpack(header)
+                if end + FRAME_HEADER.size + length > log_size:
+                    break
+                log.seek(length, os.SEEK_CUR)
+                end += FRAME_HEADER.size + length
+
+        if end < log_size:
+            logger.warning(f"Truncating {log_size - end} bytes of incomplete frames from {self.path}")
+            os.truncate(self.path, end)
+        entries.tofile(index_file)
+
+    def record(self, message, payload):
+        """Append one encoded message, opening a new chunk when the current one is old enough."""
+        server_time = message["ServerTime"]
+        if self.chunk_started is None or server_time - self.chunk_started >= self.chunk_ms:
+            self._start_chunk(server_time, message["Type"] == SNAPSHOT)
+        self._write_frame(server_time, payload)
+
+    def _start_chunk(self, server_time, is_snapshot):
+        """Index the next frame offset; a chunk that would open on a patch gets a snapshot first."""
+        self.log.flush()
+        self.chunk_started = server_time
+        self.index.write(np.array([(server_time, self.log.tell())], dtype=INDEX_DTYPE).tobytes())
+        self.index.flush()
+        if not is_snapshot:
+            snapshot = self.snapshot_source()
+            if snapshot is not None:
+                self._write_frame(server_time, snapshot)
+
+    def _write_frame(self, server_time, payload):
+        data = payload.encode()
+        self.log.write(FRAME_HEADER.pack(server_time, len(data)))
+        self.log.write(data)
+
+    def close(self):
+        self.log.close()
+        self.index.close()
+
+
+# ============================================================================
+#  MEMORY-MAPPED LOG
+# ============================================================================
+
+def _map(path):
+    """Read-only mmap of a file, or empty bytes if it is missing or empty."""
+    try:
+        with open(path, "rb") as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (FileNotFoundError, ValueError):
+        return b""
+
+
+class ReplayLog:
+    """Read-only view of a recorded log. Pages are loaded on demand by the OS, never all at once."""
+
+    def __init__(self, path):
+        self.log = _map(path)
+        if hasattr(self.log, "madvise"):
+            self.log.madvise(mmap.MADV_SEQUENTIAL)  # Playback reads forward from each seek
+        self._index_map = _map(index_path(path))
+        entries = len(self._index_map) // INDEX_DTYPE.itemsize
+        index = np.frombuffer(self._index_map, dtype=INDEX_DTYPE, count=entries)
+        # Ignore entries for frames written after the log was mapped
+        self.index = index[:np.searchsorted(index['offset'], len(self.log))]
+
+    @property
+    def start_time(self):
+        return int(self.index['time'][0]) if len(self.index) else None
+
+    def seek(self, server_time):
+        """Offset of the chunk that covers server_time (the first chunk if it is earlier)."""
+        if not len(self.index):
+            return 0
+        chunk = max(0, int(np.searchsorted(self.index['time'], server_time, side='right')) - 1)
+        return int(self.index['offset'][chunk])
+
+    def frames(self, offset=0):
+        """Yield (ServerTime, JSON bytes) for each complete frame from offset onward."""
+        log = self.log
+        end = len(log)
+        while offset + FRAME_HEADER.size <= end:
+            server_time, length = FRAME_HEADER.unpack_from(log, offset)
+            start = offset + FRAME_HEADER.size
+            if start + length > end:
+                break
+            yield server_time, log[start:start + length]
+            offset = start + length
+
+    def close(self):
+        self.index = None  # Release the numpy view before closing its mmap
+        for mapped in (self.log, self._index_map):
+            if isinstance(mapped, mmap.mmap):
+                mapped.close()
+
+
+# ============================================================================
+#  REPLAY SERVER
+# ============================================================================
+
+class Replay:
+    """One client's playback position: the state rebuilt so far and its own sequence numbers."""
+
+    def __init__(self):
+        self.state = None
+        self.seq = 0
+        self.task = None
+
+
+class ReplayServer(WebSocketServer):
+    """Serves recorded history instead of a live simulation.
+
+    Each client gets its own playback: ws://host/?from=<epoch ms>&speed=<1-100>.
+    Playback seeks through the index to the chunk covering `from`, rebuilds the
+    state from that chunk's snapshot, then sends frames paced by their ServerTime.
+    Sequence numbers are renumbered per client so gap detection and resync work.
+    """
+
+    def __init__(self, path, host="0.0.0.0", port=8000):
+        super().__init__(None, host=host, port=port)
+        self.path = path
+        self.replays = {}  # ClientConnection -> Replay
+
+    def start_client(self, client, request):
+        """Start this client's playback at the requested time and speed."""
+        try:
+            start_time = int(request.query["from"]) if "from" in request.query else None
+            speed = float(request.query.get("speed", 1))
+        except ValueError:
+            start_time, speed = None, 1.0
+        speed = min(max(speed, 1.0), MAX_REPLAY_SPEED)
+
+        replay = self.replays[client] = Replay()
+        replay.task = asyncio.create_task(self.play(client, replay, start_time, speed))
+
+    def client_snapshot(self, client):
+        """Snapshot of this client's own playback state, for resyncs and new subscriptions."""
+        replay = self.replays.get(client)
+        if not replay or not replay.state:
+            return None
+        return self.client_payload(client, encode_message(client.view(make_snapshot(replay.state, replay.seq)),
+                                                          client.format))
+
+    async def play(self, client, replay, start_time, speed):
+        """Stream recorded frames to one client until the log ends or the client goes away."""
+        loop = asyncio.get_running_loop()
+        log = ReplayLog(self.path)
+        try:
+            if start_time is None:
+                start_time = log.start_time
+            if start_time is None:
+                logger.warning(f"Nothing recorded in {self.path} to replay")
+                return
+
+            frames = log.frames(log.seek(start_time))
+
+            # Fast-forward from the chunk's snapshot to the requested time, then send that state
+            last_time = None
+            for last_time, payload in frames:
+                replay.state = apply_message(replay.state, decode_json(payload))
+                if last_time >= start_time:
+                    break
+            if replay.state is None:
+                return
+            if not client.enqueue(self.client_snapshot(client)):
+                return
+            logger.info(f"Replaying {self.path} from {last_time} at {speed:g}x to {client.client_ip}")
+
+            due = loop.time()
+            for server_time, payload in frames:
+                due += min((server_time - last_time) / 1000 / speed, MAX_REPLAY_GAP)
+                last_time = server_time
+                await asyncio.sleep(max(0.0, due - loop.time()))
+                if client.closed:
+                    return
+
+                message = decode_json(payload)
+                replay.seq += 1
+                message["Seq"] = replay.seq
+                replay.state = apply_message(replay.state, message)
+                if not client.enqueue(self.client_payload(client, encode_message(client.view(message), client.format))):
+                    return
+            logger.info(f"Replay finished for {client.client_ip}")
+        finally:
+            self.replays.pop(client, None)
+            log.close()
+
+    async def state_loop(self):
+        """Playback is driven per client, so there is no shared loop to run."""
+        await asyncio.Event().wait()
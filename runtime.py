@@ -0,0 +1,100 @@
+"""
+Runtime Profile
+Picks the event loop and JSON backend a server process runs on. The "stdlib"
+profile uses asyncio's default loop and json; "fast" uses uvloop and orjson
+when they are installed and falls back to the standard ones when they are not.
+The fast JSON backend is only switched on after a self-check shows it produces
+exactly json.dumps' bytes (in the compact layout) for the server's own messages;
+the stdlib profile's frames keep json.dumps' default spacing.
+
+Usage:
+    RUNTIME_PROFILE=fast python traffic.py
+"""
+
+import asyncio
+import logging
+import os
+import random
+import time
+
+from protocol import JSON_BACKENDS, json_backend_mismatches, make_patch, make_snapshot, use_json_backend
+from traffic_simulation import EVENTS, TrafficSimulator
+
+try:
+    import uvloop
+except ImportError:  # Only asyncio's default event loop is available without uvloop installed
+    uvloop = None
+
+logger = logging.getLogger(__name__)
+
+
+RUNTIME_PROFILES = ("stdlib", "fast")
+SELF_CHECK_STEPS = 60     # Physics steps (0.5 s) simulated for the self-check's sample messages
+SELF_CHECK_FLOATS = 2000  # Random floats of every magnitude checked on top of them
+
+
+# ============================================================================
+#  SELF-CHECK
+# ============================================================================
+
+def sample_messages(seed=0):
+    """Messages shaped like the server's own: snapshots and patches from a short physics
+    run, every event, and records carrying floats of every magnitude, including the
+    ones where JSON encoders disagree (tiny, huge, negative zero)."""
+    simulator = TrafficSimulator(interval=10, physics=True, seed=seed)
+    messages = [make_snapshot(simulator.generate_state(), 1)]
+    for step in range(SELF_CHECK_STEPS):
+        simulator.update_lights(0.5)
+        simulator.update_vehicles(0.5)
+        if step % 20 == 19:
+            messages.append(make_snapshot(simulator.generate_state(), step))
+        elif step % 2:
+            messages.append(make_patch(simulator.get_current_lights(), step, int(time.time() * 1000),
+                                       simulator.get_current_vehicles()))
+    messages += [{"Event": event} for event in EVENTS]
+
+    rng = random.Random(seed)
+    edges = [0.0, -0.0, 1e-4, 9.9e-5, 1e-5, -7.5e-05, 2.5e-07, 5e-324, 1e15, 1e16, 1.5e22,
+             1.7976931348623157e308, 1234567890123456.7, 0.1 + 0.2]
+    floats = edges + [rng.choice((1, -1)) * 10 ** rng.uniform(-8, 20) for _ in range(SELF_CHECK_FLOATS)]
+    messages += [{"Position": value, "Speed": [value, value / 3]} for value in floats]
+    return messages
+
+
+# ============================================================================
+#  PROFILES
+# ============================================================================
+
+def configure_runtime(profile):
+    """Apply a runtime profile's JSON backend. Returns (event loop name, JSON backend name)."""
+    if profile not in RUNTIME_PROFILES:
+        logger.warning(f"Unknown RUNTIME_PROFILE '{profile}', using stdlib")
+        profile = "stdlib"
+    loop = "uvloop" if profile == "fast" and uvloop is not None else "asyncio"
+    backend = "stdlib"
+    if profile == "fast" and "orjson" in JSON_BACKENDS:
+        started = time.perf_counter()
+        mismatches = json_backend_mismatches("orjson", sample_messages())
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if mismatches:
+            logger.warning(f"orjson differs from json on {len(mismatches)} sample messages "
+                           f"(first: {mismatches[0]!r:.200}), keeping the stdlib JSON backend")
+        else:
+            backend = "orjson"
+            logger.info(f"orjson matches compact json byte for byte on the sample messages ({elapsed_ms:.0f} ms)")
+    if profile == "fast" and (loop, backend) != ("uvloop", "orjson"):
+        logger.info("uvloop or orjson is not installed (pip install uvloop orjson); "
+                    "using the standard library for the rest")
+    use_json_backend(backend)
+    return loop, backend
+
+
+def run(main, profile=None):
+    """Run a coroutine to completion under a runtime profile (RUNTIME_PROFILE by default)."""
+    if profile is None:
+        profile = os.environ.get("RUNTIME_PROFILE", "stdlib")
+    loop, backend = configure_runtime(profile)
+    logger.info(f"Runtime: {loop} event loop, {backend} JSON")
+    if loop == "uvloop":
+        return uvloop.run(main)
+    return asyncio.run(main)
@@ -4,15 +4,93 @@ Handles client connections, rate limiting, origin validation, and broadcasting
 """
 
 import asyncio
+import itertools
 import logging
 import os
 import time
 from aiohttp import web, WSMsgType
-from collections import defaultdict
+from aiohttp.http import WebSocketWriter
+from collections import OrderedDict
+
+from checkpoint import discard_checkpoint, load_checkpoint, save_checkpoint
+from metrics import REGISTRY, render_gauge
+from protocol import (
+    FULL_VIEW,
+    JSON,
+    RESYNC,
+    SNAPSHOT,
+    SUBPROTOCOLS,
+    SUBSCRIBE,
+    ZJSON,
+    DeflatedPayload,
+    Subscription,
+    available_formats,
+    available_subprotocols,
+    changed_lights,
+    deflate_payload,
+    encode_message,
+    make_patch,
+    make_snapshot,
+    parse_client_message,
+    parse_subscription,
+)
+from traffic_simulation import TrafficRecord, VehicleRecord
 
 logger = logging.getLogger(__name__)
 
 
+# ============================================================================
+#  HOT-PATH METRICS
+# ============================================================================
+
+GENERATE_STATE_SECONDS = REGISTRY.histogram(
+    "traffic_generate_state_seconds", "Time spent generating a full interval state")
+UPDATE_LIGHTS_SECONDS = REGISTRY.histogram(
+    "traffic_update_lights_seconds", "Time spent advancing the light controller")
+UPDATE_VEHICLES_SECONDS = REGISTRY.histogram(
+    "traffic_update_vehicles_seconds", "Time spent advancing server-side vehicle physics")
+ENCODE_SECONDS = REGISTRY.histogram(
+    "traffic_encode_seconds", "Time spent encoding one message in one wire format")
+BROADCAST_SECONDS = REGISTRY.histogram(
+    "traffic_broadcast_seconds", "Time spent encoding and queueing one broadcast")
+LOOP_LAG_SECONDS = REGISTRY.histogram(
+    "traffic_state_loop_lag_seconds", "How late state_loop woke up relative to its schedule")
+MESSAGES_TOTAL = REGISTRY.counter(
+    "traffic_messages_broadcast_total", "Messages broadcast (snapshots and patches)")
+PAYLOAD_BYTES_TOTAL = REGISTRY.counter(
+    "traffic_payload_bytes_total", "Bytes encoded for broadcast, once per subscription and wire format")
+FRAMES_SENT_TOTAL = REGISTRY.counter(
+    "traffic_frames_sent_total", "Frames written to client sockets")
+FRAMES_DROPPED_TOTAL = REGISTRY.counter(
+    "traffic_frames_dropped_total", "Frames skipped because a client send queue was full")
+SNAPSHOT_CACHE_HITS_TOTAL = REGISTRY.counter(
+    "traffic_snapshot_cache_hits_total", "Join and resync snapshots served from the pre-encoded cache")
+SNAPSHOT_CACHE_MISSES_TOTAL = REGISTRY.counter(
+    "traffic_snapshot_cache_misses_total", "Join and resync snapshots encoded because the cache was stale")
+ADMISSION_WAIT_SECONDS = REGISTRY.histogram(
+    "traffic_admission_wait_seconds", "Time a new connection was held back by admission pacing")
+ADMISSIONS_DEFERRED_TOTAL = REGISTRY.counter(
+    "traffic_admissions_deferred_total", "Connections turned away because the admission queue was too long")
+CLIENTS_CONGESTED_TOTAL = REGISTRY.counter(
+    "traffic_clients_congested_total", "Times a client crossed its write-buffer or lag limit")
+FRAMES_COALESCED_TOTAL = REGISTRY.counter(
+    "traffic_frames_coalesced_total", "Frames not sent to congested clients, replaced by a later snapshot")
+SLOW_CLIENTS_DISCONNECTED_TOTAL = REGISTRY.counter(
+    "traffic_slow_clients_disconnected_total", "Clients disconnected by the slow-consumer policy")
+DEFLATE_SECONDS = REGISTRY.histogram(
+    "traffic_deflate_seconds", "Time spent deflating one payload for permessage-deflate clients")
+DEFLATED_BYTES_TOTAL = REGISTRY.counter(
+    "traffic_deflated_bytes_total", "Bytes produced by shared deflating, once per payload and window size")
+CHECKPOINT_CAPTURE_SECONDS = REGISTRY.histogram(
+    "traffic_checkpoint_capture_seconds", "Time the event loop spends capturing a checkpoint")
+CHECKPOINT_WRITE_SECONDS = REGISTRY.histogram(
+    "traffic_checkpoint_write_seconds", "Time spent serializing and durably writing a checkpoint, off the loop")
+CHECKPOINTS_SKIPPED_TOTAL = REGISTRY.counter(
+    "traffic_checkpoints_skipped_total", "Checkpoints skipped because the previous one was still being written")
+CHECKPOINT_FAILURES_TOTAL = REGISTRY.counter(
+    "traffic_checkpoint_failures_total", "Checkpoints that could not be written")
+
+
 # ============================================================================
 #  SECURITY CONFIGURATION
 # ============================================================================
@@ -20,9 +98,6 @@ logger = logging.getLogger(__name__)
 # Note: Configuration is read when server is instantiated, not at import time
 # This ensures .env is loaded first in traffic.py
 
-# Rate limiting storage
-connection_attempts = defaultdict(list)  # IP -> list of timestamps
-
 
 # ============================================================================
 #  SECURITY HELPERS
@@ -44,23 +119,99 @@ def get_client_ip(request):
     return peername[0] if peername else 'unknown'
 
 
-def check_rate_limit(client_ip, window=60, max_connections=10):
-    """Check if client IP has exceeded connection rate limit."""
-    now = time.time()
-    
-    # Clean old entries
-    connection_attempts[client_ip] = [
-        ts for ts in connection_attempts[client_ip] 
-        if now - ts < window
-    ]
-    
-    # Check limit
-    if len(connection_attempts[client_ip]) >= max_connections:
-        return False
-    
-    # Record this attempt
-    connection_attempts[client_ip].append(now)
-    return True
+class RateLimiter:
+    """Per-IP token bucket with bounded memory.
+    
+    Each IP may make max_connections attempts per window: the bucket holds
+    max_connections tokens and refills continuously over the window. Buckets are
+    kept in LRU order; one untouched for a whole window is full again and is
+    evicted, and at most max_tracked_ips are kept (least recently seen go first).
+    An IP counts as limited for one window after its last rejection, and that
+    count is maintained incrementally, also over at most max_tracked_ips IPs.
+    """
+    
+    def __init__(self, window=60, max_connections=10, max_tracked_ips=100_000):
+        self.window = window
+        self.max_connections = max_connections
+        self.max_tracked_ips = max_tracked_ips
+        self.refill_rate = max_connections / window  # tokens per second
+        self.buckets = OrderedDict()  # IP -> [tokens, last_seen], least recently seen first
+        self.limited = OrderedDict()  # IP -> limited_until, earliest expiry first
+    
+    def allow(self, client_ip, now=None):
+        """Consume one token for client_ip. Returns False if the IP is over its limit."""
+        if now is None:
+            now = time.monotonic()
+        self._expire(now)
+        
+        bucket = self.buckets.get(client_ip)
+        if bucket is None:
+            if len(self.buckets) >= self.max_tracked_ips:
+                self.buckets.popitem(last=False)
+            bucket = self.buckets[client_ip] = [float(self.max_connections), now]
+        else:
+            self.buckets.move_to_end(client_ip)
+            bucket[0] = min(self.max_connections, bucket[0] + (now - bucket[1]) * self.refill_rate)
+            bucket[1] = now
+        
+        if bucket[0] < 1:
+            self.limited.pop(client_ip, None)
+            if len(self.limited) >= self.max_tracked_ips:
+                self.limited.popitem(last=False)
+            self.limited[client_ip] = now + self.window
+            return False
+        
+        bucket[0] -= 1
+        return True
+    
+    def limited_count(self, now=None):
+        """Number of IPs rejected within the last window."""
+        self._expire(time.monotonic() if now is None else now)
+        return len(self.limited)
+    
+    def _expire(self, now):
+        """Drop idle buckets and lapsed limits from the front of each LRU."""
+        # At most one idle bucket per call: each call adds at most one bucket,
+        # so eviction keeps pace while every call stays O(1)
+        buckets = self.buckets
+        if buckets:
+            oldest = next(iter(buckets))
+            if now - buckets[oldest][1] >= self.window:
+                del buckets[oldest]
+        
+        limited = self.limited
+        while limited:
+            ip = next(iter(limited))
+            if limited[ip] > now:
+                break
+            del limited[ip]
+
+
+class AdmissionPacer:
+    """Spaces out WebSocket joins so a reconnect storm is admitted at a steady rate.
+    
+    Up to burst joins go through at once; after that each join is scheduled
+    one 1/rate slot after the previous one (a virtual-clock token bucket), so
+    the event loop keeps servicing state_loop between handshakes. A join whose
+    slot is more than max_wait away is turned away to retry later.
+    """
+    
+    def __init__(self, rate=500, burst=100, max_wait=10.0):
+        self.interval = 1.0 / rate
+        self.tolerance = (burst - 1) * self.interval
+        self.max_wait = max_wait
+        self.next_slot = 0.0  # Monotonic time the next join's slot starts
+    
+    def reserve(self, now=None):
+        """Claim the next join slot. Returns seconds to wait before joining, or None if too far off."""
+        if now is None:
+            now = time.monotonic()
+        slot = max(self.next_slot, now)
+        delay = max(0.0, slot - self.tolerance - now)
+        if delay > self.max_wait:
+            return None
+        self.next_slot = slot + self.interval
+        return delay
 
 
 def validate_origin(request, allowed_origins):
@@ -79,6 +230,170 @@ def validate_origin(request, allowed_origins):
     return origin in allowed_origins
 
 
+# ============================================================================
+#  CLIENT CONNECTIONS
+# ============================================================================
+
+# aiohttp compresses inside each connection's writer; payloads deflated once for
+# everyone go through its frame writer directly, which needs this (internal) method
+SHARED_DEFLATE_SUPPORTED = hasattr(WebSocketWriter, "_write_websocket_frame")
+
+# What a broadcast does with each client (see WebSocketServer.check_congestion)
+SEND, SKIP, DROP = "send", "skip", "drop"
+SLOW_CLIENT_POLICIES = ("coalesce", "lights", "disconnect", "none")
+
+
+async def write_frame(ws, data, binary, deflated):
+    """Write one data frame through the socket's WebSocketWriter, with RSV1 set if data is pre-deflated.
+    
+    Flow control follows WebSocketWriter.send_frame: pause once the writer's
+    buffered output passes its limit and the transport asks to drain.
+    """
+    writer = ws._writer
+    if writer is None or getattr(writer, "_closing", False):
+        raise ConnectionResetError("WebSocket is closing")
+    writer._write_websocket_frame(data, WSMsgType.BINARY if binary else WSMsgType.TEXT, 0x40 if deflated else 0)
+    if writer._output_size > writer._limit:
+        writer._output_size = 0
+        if writer.protocol._paused:
+            await writer.protocol._drain_helper()
+
+
+class ClientConnection:
+    """Wraps a WebSocket with a bounded send queue drained by its own writer task.
+    
+    Payloads are pre-encoded once per broadcast (per subscription and wire format)
+    and shared by every client in that group, so enqueueing never blocks the state
+    loop. When the queue is full the oldest frame is skipped; a client that keeps
+    skipping frames is dropped.
+    
+    The server also watches each client's transport write buffer and how far its
+    writer is behind the latest Seq, and applies its slow-consumer policy to
+    clients past those limits (see WebSocketServer.check_congestion).
+    
+    deflate is the permessage-deflate window size (bits) when the server deflates
+    payloads once for everyone; such clients are written to frame by frame,
+    bypassing aiohttp's per-connection compressor. 0 leaves compression to aiohttp.
+    """
+    
+    _ids = itertools.count(1)
+    
+    def __init__(self, ws, client_ip, queue_size=8, max_dropped_frames=50, fmt=JSON, deflate=0, transport=None):
+        self.id = next(self._ids)
+        self.ws = ws
+        self.client_ip = client_ip
+        self.format = fmt
+        self.deflate = deflate
+        self.transport = transport  # The connection's asyncio transport, for its write buffer size
+        self.subscription = None  # protocol.Subscription, or None for the full view
+        self.requested_subscription = None  # What the client asked for, while downgraded to lights only
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.max_dropped_frames = max_dropped_frames
+        self.dropped_frames = 0
+        self.consecutive_drops = 0
+        self.coalesced_frames = 0
+        self.congested = False  # Past its write-buffer or lag limit, until it drains
+        self.downgraded = False  # Receiving lights only while congested
+        self.sent_seq = None  # Seq of the last frame handed to the transport
+        self.send_lag = 0.0  # Seconds the last sent frame spent queued
+        self.writer_task = None
+    
+    @property
+    def closed(self):
+        return self.ws.closed or (self.writer_task is not None and self.writer_task.done())
+    
+    def start(self):
+        """Start the writer task for this connection."""
+        self.writer_task = asyncio.create_task(self._writer())
+    
+    def view(self, message):
+        """The message reduced to this client's subscription."""
+        return self.subscription.filter(message) if self.subscription else message
+    
+    def write_buffer_size(self):
+        """Bytes waiting in the transport's write buffer (sent to the socket but not yet accepted by it)."""
+        return self.transport.get_write_buffer_size() if self.transport else 0
+    
+    def lag(self, seq):
+        """How many messages the writer is behind seq."""
+        return seq - self.sent_seq if self.sent_seq is not None else 0
+    
+    def discard_queued(self):
+        """Drop every queued frame. Returns how many there were."""
+        count = self.queue.qsize()
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        return count
+    
+    def enqueue(self, payload, queued_at=None, seq=None):
+        """Queue a pre-encoded payload without blocking. Returns False if the client should be dropped.
+        
+        queued_at (monotonic seconds) lets a broadcast stamp every client's frame with one clock read;
+        seq is the message's sequence number, for lag tracking.
+        """
+        if self.closed:
+            return False
+        
+        if self.queue.full():
+            # Skip the oldest frame so the client catches up on the latest state
+            try:
+                self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+            self.dropped_frames += 1
+            self.consecutive_drops += 1
+            FRAMES_DROPPED_TOTAL.inc()
+            if self.consecutive_drops >= self.max_dropped_frames:
+                logger.warning(f"Dropping slow client {self.client_ip} ({self.dropped_frames} frames skipped)")
+                return False
+        
+        self.queue.put_nowait((time.monotonic() if queued_at is None else queued_at, payload, seq))
+        return True
+    
+    async def _writer(self):
+        """Send queued payloads one at a time until the socket closes."""
+        try:
+            while not self.ws.closed:
+                queued_at, payload, seq = await self.queue.get()
+                if REGISTRY.enabled:
+                    self.send_lag = time.monotonic() - queued_at
+                if self.deflate:
+                    if isinstance(payload, DeflatedPayload):
+                        await write_frame(self.ws, payload.data, payload.binary, True)
+                    else:
+                        binary = isinstance(payload, bytes)
+                        await write_frame(self.ws, payload if binary else payload.encode(), binary, False)
+                elif isinstance(payload, bytes):
+                    await self.ws.send_bytes(payload)
+                else:
+                    await self.ws.send_str(payload)
+                FRAMES_SENT_TOTAL.inc()
+                self.consecutive_drops = 0
+                if seq is not None:
+                    self.sent_seq = seq
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.debug(f"Error sending to {self.client_ip}: {e}")
+    
+    async def close(self):
+        """Stop the writer task and close the socket."""
+        if self.writer_task and not self.writer_task.done():
+            self.writer_task.cancel()
+            try:
+                await self.writer_task
+            except asyncio.CancelledError:
+                pass
+        if not self.ws.closed:
+            await self.ws.close()
+    
+    async def abort(self):
+        """Stop the writer and drop the connection at once, discarding whatever it still has buffered."""
+        if self.transport:
+            self.transport.abort()
+        await self.close()
+
+
 # ============================================================================
 #  WEBSOCKET SERVER
 # ============================================================================
@@ -90,14 +405,70 @@ class WebSocketServer:
         self.simulator = simulator
         self.host = host
         self.port = port
-        self.clients = set()
+        self.reuse_port = False  # Let several worker processes share the port (SO_REUSEPORT)
+        self.clients = set()  # ClientConnection instances
+        self.closing_tasks = set()  # Background close()/abort() tasks of dropped clients, held until done
         self.current_state = None
         self.total_intervals = 0
+        self.seq = 0  # Sequence number of the last broadcast message
+        self.recorder = None  # Optional StateRecorder that logs every broadcast message
+        self.snapshot_cache = {}  # (subscription, format, deflate) -> snapshot of the current state as queued
+        self.snapshot_version = None  # state_version() the cache was built for
         
         # Load security configuration from environment
         self.max_clients = int(os.environ.get("MAX_CLIENTS", 100))
-        self.rate_limit_window = 60  # seconds
-        self.rate_limit_max_connections = 10  # max connections per IP per window
+        self.rate_limit_enabled = os.environ.get("RATE_LIMIT_ENABLED", "1") == "1"  # off only for load tests
+        self.rate_limit_window = float(os.environ.get("RATE_LIMIT_WINDOW", 60))  # seconds
+        self.rate_limit_max_connections = int(os.environ.get("RATE_LIMIT_MAX_CONNECTIONS", 10))  # per IP per window
+        self.rate_limiter = RateLimiter(
+            self.rate_limit_window,
+            self.rate_limit_max_connections,
+            int(os.environ.get("RATE_LIMIT_MAX_TRACKED_IPS", 100_000))
+        )
+        self.send_queue_size = int(os.environ.get("SEND_QUEUE_SIZE", 8))
+        self.max_dropped_frames = int(os.environ.get("MAX_DROPPED_FRAMES", 50))
+        
+        # Slow consumers: past WRITE_BUFFER_HIGH bytes buffered or MAX_CLIENT_LAG messages behind,
+        # a client is congested until it drains below WRITE_BUFFER_LOW; SLOW_CLIENT_POLICY is
+        # "coalesce" (skip frames, then one fresh snapshot), "lights" (lights only meanwhile),
+        # "disconnect" or "none" (only the send-queue limits apply)
+        self.slow_client_policy = os.environ.get("SLOW_CLIENT_POLICY", "coalesce")
+        self.write_buffer_high = int(os.environ.get("WRITE_BUFFER_HIGH", 256 * 1024))
+        self.write_buffer_low = int(os.environ.get("WRITE_BUFFER_LOW", 64 * 1024))
+        self.max_client_lag = int(os.environ.get("MAX_CLIENT_LAG", 2 * self.send_queue_size))
+        if self.slow_client_policy not in SLOW_CLIENT_POLICIES:
+            logger.warning(f"Unknown SLOW_CLIENT_POLICY '{self.slow_client_policy}', using coalesce")
+            self.slow_client_policy = "coalesce"
+        
+        # permessage-deflate: "shared" deflates each payload once for every client, "connection"
+        # lets aiohttp compress per client (with context takeover), "off" declines the extension
+        self.ws_compression = os.environ.get("WS_COMPRESSION", "shared")
+        self.compress_level = int(os.environ.get("WS_COMPRESS_LEVEL", 6))
+        self.compress_min_bytes = int(os.environ.get("WS_COMPRESS_MIN_BYTES", 128))  # smaller frames go uncompressed
+        if self.ws_compression == "shared" and not SHARED_DEFLATE_SUPPORTED:
+            logger.warning("This aiohttp cannot send pre-deflated frames, compressing per connection instead")
+            self.ws_compression = "connection"
+        
+        # Join pacing: joins per second (0 disables), burst admitted at once, longest wait before 503
+        admission_rate = float(os.environ.get("ADMISSION_RATE", 500))
+        self.admission = AdmissionPacer(
+            admission_rate,
+            int(os.environ.get("ADMISSION_BURST", 100)),
+            float(os.environ.get("ADMISSION_MAX_WAIT", 10))
+        ) if admission_rate > 0 else None
+        
+        REGISTRY.enabled = os.environ.get("METRICS_ENABLED", "1") == "1"
+        
+        # Server-side vehicle physics tick and position broadcast rates
+        self.physics_hz = float(os.environ.get("PHYSICS_HZ", 10))
+        self.vehicle_broadcast_hz = float(os.environ.get("VEHICLE_BROADCAST_HZ", 2))
+        
+        # Checkpoints (off unless CHECKPOINT_PATH is set, one file per server instance): the
+        # simulation is saved there every CHECKPOINT_INTERVAL seconds, written off the event
+        # loop, and restored from it on startup
+        self.checkpoint_path = os.environ.get("CHECKPOINT_PATH", "")
+        self.checkpoint_interval = float(os.environ.get("CHECKPOINT_INTERVAL", 5))
+        self.checkpoint_write = None  # Future of the checkpoint being written, if any
         
         # Parse ALLOWED_ORIGINS
         origins_str = os.environ.get("ALLOWED_ORIGINS", "")
@@ -114,7 +485,7 @@ class WebSocketServer:
             return web.Response(status=403, text="Forbidden: Invalid origin")
         
         # Security Check 2: Rate limiting
-        if not check_rate_limit(client_ip, self.rate_limit_window, self.rate_limit_max_connections):
+        if self.rate_limit_enabled and not self.rate_limiter.allow(client_ip):
             logger.warning(f"Rate limit exceeded for {client_ip}")
             return web.Response(status=429, text="Too Many Requests")
         
@@ -123,132 +494,548 @@ class WebSocketServer:
             logger.warning(f"Max clients reached, rejecting {client_ip}")
             return web.Response(status=503, text="Server at capacity")
         
+        # Wire format: ?format= query parameter, overridden by a negotiated subprotocol
+        fmt = request.query.get('format', JSON)
+        if fmt not in available_formats():
+            return web.Response(status=400, text=f"Unsupported format '{fmt}'")
+        
+        # Admission pacing: hold the handshake until this join's slot comes up
+        if self.admission:
+            delay = self.admission.reserve()
+            if delay is None:
+                ADMISSIONS_DEFERRED_TOTAL.inc()
+                return web.Response(status=503, text="Server busy, retry shortly",
+                                    headers={'Retry-After': str(max(1, round(self.admission.max_wait)))})
+            if delay:
+                ADMISSION_WAIT_SECONDS.observe(delay)
+                await asyncio.sleep(delay)
+                # Other joins may have filled the server while this one waited
+                if len(self.clients) >= self.max_clients:
+                    logger.warning(f"Max clients reached, rejecting {client_ip}")
+                    return web.Response(status=503, text="Server at capacity")
+        
         ws = web.WebSocketResponse(
             heartbeat=30,  # Send ping every 30 seconds
-            max_msg_size=1024  # Limit incoming message size
+            max_msg_size=1024,  # Limit incoming message size
+            protocols=available_subprotocols(),
+            compress=self.ws_compression != "off"
         )
         await ws.prepare(request)
+        if ws.ws_protocol:
+            fmt = SUBPROTOCOLS[ws.ws_protocol]
+        deflate = ws.compress if self.ws_compression == "shared" else 0  # Negotiated window bits, or 0
         
-        self.clients.add(ws)
-        logger.info(f"Client connected from {client_ip} ({len(self.clients)} total)")
+        transport = request.transport
+        if transport is not None:
+            # aiohttp waits for the transport to drain above the high mark, so the writer pauses there too
+            transport.set_write_buffer_limits(high=self.write_buffer_high, low=self.write_buffer_low)
+        client = ClientConnection(ws, client_ip, self.send_queue_size, self.max_dropped_frames, fmt, deflate,
+                                  transport)
+        client.start()
+        self.clients.add(client)
+        logger.info(f"Client connected from {client_ip} ({len(self.clients)} total, {fmt})")
         
-        # Send current state immediately
-        if self.current_state:
-            try:
-                await ws.send_json(self.current_state)
-            except Exception as e:
-                logger.error(f"Error sending initial state to {client_ip}: {e}")
+        self.start_client(client, request)
         
         try:
             async for msg in ws:
                 if msg.type == WSMsgType.TEXT:
                     logger.debug(f"Received text message from {client_ip}: {msg.data[:100]}")
+                    self.handle_client_message(client, parse_client_message(msg.data))
                 elif msg.type == WSMsgType.BINARY:
-                    logger.warning(f"Received unexpected binary message from {client_ip}")
+                    if fmt == JSON:
+                        logger.warning(f"Received unexpected binary message from {client_ip}")
+                    else:
+                        self.handle_client_message(client, parse_client_message(msg.data, fmt))
                 elif msg.type == WSMsgType.ERROR:
                     logger.error(f"WebSocket error from {client_ip}: {ws.exception()}")
                     break
         except Exception as e:
             logger.error(f"Error handling WebSocket for {client_ip}: {e}")
         finally:
-            self.clients.discard(ws)
+            self.clients.discard(client)
+            await client.close()
             logger.info(f"Client disconnected from {client_ip} ({len(self.clients)} total)")
         
         return ws
     
+    def state_version(self):
+        """Identifies the current state: every broadcast bumps seq, and light refreshes move ServerTime."""
+        return self.seq, self.current_state["ServerTime"]
+    
+    def cached_snapshot(self, subscription=None, fmt=JSON, deflate=0):
+        """Encoded snapshot of the current state for one view and format, or None before the first state.
+        
+        Each (subscription, format) is encoded, and deflated for each window size,
+        at most once per state version, so a burst of joins or resyncs between two
+        ticks shares the same payload.
+        """
+        if not self.current_state:
+            return None
+        version = self.state_version()
+        if version != self.snapshot_version:
+            self.snapshot_cache = {}
+            self.snapshot_version = version
+        
+        group = (subscription, fmt, deflate)
+        payload = self.snapshot_cache.get(group)
+        if payload is not None:
+            SNAPSHOT_CACHE_HITS_TOTAL.inc()
+            return payload
+        SNAPSHOT_CACHE_MISSES_TOTAL.inc()
+        plain = self.snapshot_cache.get((subscription, fmt, 0))
+        if plain is None:
+            message = make_snapshot(self.current_state, self.seq)
+            if subscription:
+                message = subscription.filter(message)
+            plain = self.snapshot_cache[(subscription, fmt, 0)] = encode_message(message, fmt)
+        payload = self.snapshot_cache[group] = self.deflated(plain, fmt, deflate) if deflate else plain
+        return payload
+    
+    def snapshot_payload(self):
+        """JSON text of a snapshot of the current state, or None before the first state."""
+        return self.cached_snapshot()
+    
+    def client_snapshot(self, client):
+        """Encoded snapshot of the current state in the client's view and format, or None."""
+        return self.cached_snapshot(client.subscription, client.format, client.deflate)
+    
+    def deflated(self, payload, fmt, wbits):
+        """payload as queued for clients deflating with wbits: compressed once, unless
+        it is too small to gain anything or its format is already compressed."""
+        if fmt == ZJSON or len(payload) < self.compress_min_bytes:
+            return payload
+        started = time.perf_counter()
+        frame = deflate_payload(payload, wbits, self.compress_level)
+        DEFLATE_SECONDS.observe(time.perf_counter() - started)
+        DEFLATED_BYTES_TOTAL.inc(len(frame.data))
+        return frame
+    
+    def client_payload(self, client, payload):
+        """An encoded payload meant for one client only, deflated if that client needs it."""
+        return self.deflated(payload, client.format, client.deflate) if client.deflate else payload
+    
+    def start_client(self, client, request):
+        """Send the current state to a newly connected client."""
+        payload = self.client_snapshot(client)
+        if payload is not None:
+            client.enqueue(payload, seq=self.seq)
+    
+    def handle_client_message(self, client, message):
+        """Act on a decoded client message: resync requests and subscriptions.
+        
+        Both are answered with a snapshot, so a new subscription takes effect at once.
+        """
+        if not message:
+            return
+        if message.get("Type") == SUBSCRIBE:
+            try:
+                subscription = parse_subscription(message)
+            except ValueError as e:
+                logger.warning(f"Ignoring invalid subscription from {client.client_ip}: {e}")
+                return
+            if client.downgraded:
+                client.requested_subscription = subscription  # Takes effect once it drains
+                return
+            client.subscription = subscription
+        elif message.get("Type") != RESYNC:
+            return
+        
+        payload = self.client_snapshot(client)
+        if payload is not None:
+            client.enqueue(payload, seq=self.seq)
+    
+    def check_congestion(self, client):
+        """Apply the slow-consumer policy before the message with the current Seq is queued for client.
+        
+        A client is congested once its transport buffers more than WRITE_BUFFER_HIGH bytes or
+        its writer falls MAX_CLIENT_LAG messages behind, and stays so until the buffer is back
+        under WRITE_BUFFER_LOW with nothing queued. Its backlog is dropped at once, so neither
+        the buffer nor the send queue keeps growing. Then, by policy:
+        - coalesce: nothing more is queued; on recovery one snapshot replaces everything skipped
+        - lights: the client gets lights only (same directions) until it drains, then its own
+          view back, each switch with a snapshot; even those are skipped above WRITE_BUFFER_HIGH
+        - disconnect: the connection is dropped
+        
+        Returns SEND to queue the message, SKIP when the client gets nothing (or a snapshot
+        already covering it) or DROP to disconnect the client.
+        """
+        policy = self.slow_client_policy
+        if policy == "none":
+            return SEND
+        buffered = client.write_buffer_size()
+        if client.congested:
+            if buffered > self.write_buffer_low or not client.queue.empty():
+                if policy == "coalesce" or buffered > self.write_buffer_high:
+                    client.coalesced_frames += 1
+                    FRAMES_COALESCED_TOTAL.inc()
+                    return SKIP
+                return SEND
+            client.congested = False
+            if client.downgraded:
+                client.subscription = client.requested_subscription
+                client.requested_subscription = None
+                client.downgraded = False
+            return self.resync(client)
+        
+        if buffered <= self.write_buffer_high and client.lag(self.seq) <= self.max_client_lag:
+            return SEND
+        client.congested = True
+        CLIENTS_CONGESTED_TOTAL.inc()
+        if policy == "disconnect":
+            SLOW_CLIENTS_DISCONNECTED_TOTAL.inc()
+            logger.info(f"Disconnecting slow client {client.client_ip} "
+                        f"({buffered} bytes buffered, {client.lag(self.seq)} messages behind)")
+            return DROP
+        discarded = client.discard_queued()
+        client.coalesced_frames += discarded
+        FRAMES_COALESCED_TOTAL.inc(discarded)
+        if policy == "lights":
+            view = client.subscription or FULL_VIEW
+            client.requested_subscription = client.subscription
+            client.subscription = Subscription(("Lights",), view.directions)
+            client.downgraded = True
+            return self.resync(client)
+        client.coalesced_frames += 1
+        FRAMES_COALESCED_TOTAL.inc()
+        return SKIP
+    
+    def resync(self, client):
+        """Queue a snapshot of the current state (which includes the message being broadcast)."""
+        payload = self.client_snapshot(client)
+        if payload is not None and not client.enqueue(payload, seq=self.seq):
+            return DROP
+        return SKIP
+    
     async def health_check(self, request):
         """Handle HTTP health check requests."""
         return web.Response(text="OK")
     
-    async def metrics_endpoint(self, request):
-        """Return server metrics for monitoring."""
-        metrics = {
+    def collect_metrics(self):
+        """Gather this process's server metrics."""
+        return {
             "connected_clients": len(self.clients),
             "max_clients": self.max_clients,
             "uptime_intervals": self.total_intervals,
-            "rate_limited_ips": len([
-                ip for ip, attempts in connection_attempts.items() 
-                if len(attempts) >= self.rate_limit_max_connections
-            ])
+            "rate_limited_ips": self.rate_limiter.limited_count()
         }
-        return web.json_response(metrics)
     
-    async def broadcast(self, state):
-        """Send state to all connected clients with error handling."""
+    def prometheus_metrics(self):
+        """Hot-path metrics plus server and per-client gauges in the Prometheus text format."""
+        gauges = [
+            render_gauge(f"traffic_{name}", f"Server metric {name}", [({}, value)])
+            for name, value in self.collect_metrics().items()
+            if isinstance(value, (int, float))
+        ]
+        clients = sorted(self.clients, key=lambda client: client.id)
+        gauges.append(render_gauge(
+            "traffic_client_send_queue_depth", "Frames waiting in each client's send queue",
+            [({"client": client.id}, client.queue.qsize()) for client in clients]))
+        gauges.append(render_gauge(
+            "traffic_client_send_lag_seconds", "Time the last frame sent to each client spent queued",
+            [({"client": client.id}, client.send_lag) for client in clients]))
+        gauges.append(render_gauge(
+            "traffic_client_dropped_frames", "Frames skipped for each client",
+            [({"client": client.id}, client.dropped_frames) for client in clients]))
+        gauges.append(render_gauge(
+            "traffic_client_coalesced_frames", "Frames replaced by a later snapshot for each congested client",
+            [({"client": client.id}, client.coalesced_frames) for client in clients]))
+        gauges.append(render_gauge(
+            "traffic_client_lag_messages", "Messages each client's writer is behind the latest Seq",
+            [({"client": client.id}, client.lag(self.seq)) for client in clients]))
+        gauges.append(render_gauge(
+            "traffic_client_write_buffer_bytes", "Bytes waiting in each client's transport write buffer",
+            [({"client": client.id}, client.write_buffer_size()) for client in clients]))
+        gauges.append(render_gauge(
+            "traffic_client_congested", "1 while a client is past its write-buffer or lag limit",
+            [({"client": client.id}, int(client.congested)) for client in clients]))
+        return REGISTRY.render() + "".join(gauges)
+    
+    async def metrics_endpoint(self, request):
+        """Return server metrics for monitoring (JSON, or Prometheus text with ?format=prometheus)."""
+        if request.query.get('format') == 'prometheus':
+            return web.Response(text=self.prometheus_metrics(), content_type='text/plain',
+                                headers={'X-Content-Type-Options': 'nosniff'})
+        return web.json_response(self.collect_metrics())
+    
+    async def broadcast(self, state, payloads=None):
+        """Filter and encode state once per subscription and wire format, then fan it
+        out to every client's send queue.
+        
+        payloads may carry already-encoded forms of the full message, keyed by format.
+        Clients that deflate share one compressed payload per group and window size.
+        A snapshot's payloads also seed the join cache, since they encode the current state.
+        """
+        payloads = dict(payloads) if payloads else {}
+        if self.recorder:
+            self.record(state, payloads)
         if not self.clients:
             return
         
-        dead_clients = set()
-        
-        for ws in self.clients:
-            try:
-                if ws.closed:
-                    dead_clients.add(ws)
-                else:
-                    await ws.send_json(state)
-            except Exception as e:
-                logger.debug(f"Error broadcasting to client: {e}")
-                dead_clients.add(ws)
+        started = time.perf_counter()
+        queued_at = time.monotonic()
+        views = {None: state}  # Subscription -> filtered message
+        encoded = {(None, fmt): payload for fmt, payload in payloads.items()}
+        frames = {}  # (subscription, format, window bits) -> deflated payload
+        dead_clients = []
+        slow_clients = []
+        for client in self.clients:
+            action = self.check_congestion(client)
+            if action != SEND:
+                if action == DROP:
+                    slow_clients.append(client)
+                continue
+            group = (client.subscription, client.format)
+            payload = encoded.get(group)
+            if payload is None:
+                encode_started = time.perf_counter()
+                message = views.get(client.subscription)
+                if message is None:
+                    message = views[client.subscription] = client.view(state)
+                payload = encoded[group] = encode_message(message, client.format)
+                ENCODE_SECONDS.observe(time.perf_counter() - encode_started)
+                PAYLOAD_BYTES_TOTAL.inc(len(payload))
+            if client.deflate:
+                key = group + (client.deflate,)
+                frame = frames.get(key)
+                if frame is None:
+                    frame = frames[key] = self.deflated(payload, client.format, client.deflate)
+                payload = frame
+            if not client.enqueue(payload, queued_at, self.seq):
+                dead_clients.append(client)
+        if state["Type"] == SNAPSHOT and self.current_state:
+            self.snapshot_cache = {(subscription, fmt, 0): payload for (subscription, fmt), payload in encoded.items()}
+            self.snapshot_cache.update(frames)
+            self.snapshot_version = self.state_version()
+        MESSAGES_TOTAL.inc()
+        BROADCAST_SECONDS.observe(time.perf_counter() - started)
         
         # Clean up dead connections
-        for ws in dead_clients:
-            self.clients.discard(ws)
+        for client in dead_clients:
+            self.drop_client(client, client.close)
+        for client in slow_clients:
+            self.drop_client(client, client.abort)
     
-    async def state_loop(self):
-        """Generate new state every INTERVAL seconds and broadcast light updates."""
-        # Track last colors and timers
-        last_colors = {d: self.simulator.traffic_controller.lights[d]['color'] for d in ['N', 'S', 'E', 'W']}
-        last_displayed_timers = {d: int(self.simulator.traffic_controller.lights[d]['timer']) for d in ['N', 'S', 'E', 'W']}
-        elapsed = 0
-        timer_update_elapsed = 0
-        
-        # Initial state
+    def drop_client(self, client, close):
+        """Remove a client and run close (its close or abort) in the background."""
+        self.clients.discard(client)
+        task = asyncio.create_task(close())
+        self.closing_tasks.add(task)
+        task.add_done_callback(self._client_closed)
+    
+    def _client_closed(self, task):
+        self.closing_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Error closing a client: {task.exception()!r}")
+    
+    def record(self, state, payloads):
+        """Append a message to the recorder, reusing (or filling in) its JSON encoding."""
+        payload = payloads.get(JSON)
+        if payload is None:
+            payload = payloads[JSON] = encode_message(state)
+        self.recorder.record(state, payload)
+    
+    async def broadcast_snapshot(self):
+        """Broadcast the full current state as a new snapshot."""
+        self.seq += 1
+        await self.broadcast(make_snapshot(self.current_state, self.seq))
+    
+    async def broadcast_lights(self, vehicles=None):
+        """Refresh lights in the current state and broadcast only the changed records.
+        
+        With server-side physics, fresh vehicle positions can ride along in the patch.
+        """
+        lights = self.simulator.get_current_lights()
+        changed = changed_lights(self.current_state["Lights"], lights)
+        server_time = int(time.time() * 1000)
+        
+        self.current_state["Lights"] = lights
+        self.current_state["ServerTime"] = server_time
+        if vehicles is not None:
+            self.current_state["Vehicles"] = vehicles
+        
+        if changed or vehicles is not None:
+            self.seq += 1
+            await self.broadcast(make_patch(changed, self.seq, server_time, vehicles))
+    
+    def advance(self, dt):
+        """Advance lights and vehicles by dt seconds, timing each step."""
+        started = time.perf_counter()
+        self.simulator.update_lights(dt)
+        lights_done = time.perf_counter()
+        self.simulator.update_vehicles(dt)
+        UPDATE_LIGHTS_SECONDS.observe(lights_done - started)
+        UPDATE_VEHICLES_SECONDS.observe(time.perf_counter() - lights_done)
+    
+    def regenerate_state(self):
+        """Replace the current state with a freshly generated interval."""
+        started = time.perf_counter()
         self.current_state = self.simulator.generate_state()
-        await self.broadcast(self.current_state)
-        
-        while True:
-            await asyncio.sleep(0.1)
-            elapsed += 0.1
-            timer_update_elapsed += 0.1
-            
-            # Update traffic controller
-            self.simulator.update_lights(0.1)
-            
-            # If interval elapsed, regenerate full state
-            if elapsed >= self.simulator.interval:
-                elapsed = 0
-                self.total_intervals += 1
-                self.current_state = self.simulator.generate_state()
-                event_name = self.current_state["Event"]["name"] if self.current_state["Event"] else "Normal"
-                logger.info(f"New state: {event_name} traffic, {len(self.current_state['Vehicles'])} vehicles")
-                await self.broadcast(self.current_state)
+        GENERATE_STATE_SECONDS.observe(time.perf_counter() - started)
+    
+    def checkpoint_state(self, interval_remaining):
+        """The simulation and broadcast state to carry over a restart, as JSON-serializable data.
+        
+        Shares nothing mutable with the live state, so it can be written out while the loop runs on.
+        """
+        physics = self.simulator.physics
+        return {
+            "saved_at": time.time(),
+            "interval_remaining": interval_remaining,
+            "seq": self.seq,
+            "total_intervals": self.total_intervals,
+            "simulator": self.simulator.checkpoint(),
+            "state": {
+                # With physics the simulator's own vehicles are the current ones
+                "Vehicles": None if physics else [v.to_wire() for v in self.current_state["Vehicles"]],
+                "Traffic": [t.to_wire() for t in self.current_state["Traffic"]],
+                "Event": self.current_state["Event"],
+            },
+        }
+    
+    def write_checkpoint(self, data):
+        """Serialize and durably write a checkpoint (runs in the default executor)."""
+        started = time.perf_counter()
+        try:
+            save_checkpoint(self.checkpoint_path, data)
+        except (OSError, TypeError, ValueError) as e:
+            CHECKPOINT_FAILURES_TOTAL.inc()
+            logger.warning(f"Could not write checkpoint {self.checkpoint_path}: {e}")
+            return
+        CHECKPOINT_WRITE_SECONDS.observe(time.perf_counter() - started)
+    
+    def schedule_checkpoint(self, interval_remaining):
+        """Capture a checkpoint on the loop and write it in the background, unless the last write is still running."""
+        if self.checkpoint_write is not None and not self.checkpoint_write.done():
+            CHECKPOINTS_SKIPPED_TOTAL.inc()
+            return
+        started = time.perf_counter()
+        data = self.checkpoint_state(interval_remaining)
+        CHECKPOINT_CAPTURE_SECONDS.observe(time.perf_counter() - started)
+        self.checkpoint_write = asyncio.get_running_loop().run_in_executor(None, self.write_checkpoint, data)
+    
+    def restore_checkpoint(self):
+        """Take up the simulation from CHECKPOINT_PATH, fast-forwarded over the downtime.
+        
+        Lights and the demand clock run through the whole downtime, so signal timing
+        stays in step with the wall clock; vehicle IDs carry on where they left off.
+        Returns the seconds left of the restored interval, or None if a new interval
+        is due now (no usable checkpoint, or its interval ran out while down).
+        A checkpoint that fails to restore in any way leaves the simulation as it was
+        (a cold start) and is set aside.
+        """
+        started = time.perf_counter()
+        data = load_checkpoint(self.checkpoint_path)
+        if data is None:
+            return None
+        fresh = self.simulator.checkpoint()
+        try:
+            saved_at = float(data["saved_at"])
+            seq = int(data["seq"])
+            total_intervals = int(data["total_intervals"])
+            interval_remaining = float(data["interval_remaining"])
+            state = data["state"]
+            event = state["Event"]
+            vehicles = None if state["Vehicles"] is None else [VehicleRecord.from_wire(v) for v in state["Vehicles"]]
+            traffic = [TrafficRecord.from_wire(t) for t in state["Traffic"]]
+            self.simulator.restore(data["simulator"])
+            downtime = max(0.0, time.time() - saved_at)
+            self.simulator.fast_forward(downtime, 1.0 / self.physics_hz)
+        except Exception as e:
+            self.simulator.restore(fresh)
+            discard_checkpoint(self.checkpoint_path, f"cannot restore it: {e!r}")
+            return None
+        
+        self.seq = seq
+        self.total_intervals = total_intervals
+        remaining = interval_remaining - downtime
+        if remaining > 0:
+            self.current_state = {
+                "Lights": self.simulator.get_current_lights(),
+                "Vehicles": self.simulator.get_current_vehicles() if vehicles is None else vehicles,
+                "Traffic": traffic,
+                "Event": event,
+                "Interval": self.simulator.interval,
+                "Reset": True,
+                "ServerTime": int(time.time() * 1000),
+            }
+        logger.info(f"Restored checkpoint from {downtime:.1f}s ago in {(time.perf_counter() - started) * 1000:.0f} ms "
+                    f"(seq {self.seq}, next vehicle ID {self.simulator.vehicle_counter + 1})")
+        return remaining if remaining > 0 else None
+    
+    async def state_loop(self):
+        """Generate new state every INTERVAL seconds and broadcast light updates.
+        
+        Instead of polling, the loop sleeps until the next light transition,
+        displayed-second tick or interval boundary (and, with server-side
+        physics, the next physics tick). Elapsed time is measured on the event
+        loop's monotonic clock so the simulation does not drift.
+        With checkpoints on, it starts from the last one and saves a new one
+        every CHECKPOINT_INTERVAL seconds, and once more when cancelled.
+        """
+        loop = asyncio.get_running_loop()
+        controller = self.simulator.traffic_controller
+        physics = self.simulator.physics
+        
+        # Initial state: the checkpointed interval if it is still running, else a new one
+        interval_remaining = self.restore_checkpoint() if self.checkpoint_path else None
+        if interval_remaining is None:
+            self.regenerate_state()
+            interval_remaining = self.simulator.interval
+        await self.broadcast_snapshot()
+        last_colors = {d: controller.lights[d]['color'] for d in ['N', 'S', 'E', 'W']}
+        
+        last_tick = loop.time()
+        next_interval = last_tick + interval_remaining
+        next_physics_tick = last_tick + 1.0 / self.physics_hz if physics else float('inf')
+        next_vehicle_broadcast = last_tick + 1.0 / self.vehicle_broadcast_hz
+        next_checkpoint = last_tick + self.checkpoint_interval if self.checkpoint_path else float('inf')
+        
+        try:
+            while True:
+                # Wake just past the next boundary so timers have crossed it
+                wake_at = min(next_interval, next_physics_tick, next_checkpoint,
+                              loop.time() + self.simulator.time_to_next_light_event() + 0.001)
+                await asyncio.sleep(max(0.0, wake_at - loop.time()))
                 
-                # Reset tracking
-                last_colors = {d: self.simulator.traffic_controller.lights[d]['color'] for d in ['N', 'S', 'E', 'W']}
-                last_displayed_timers = {d: int(self.simulator.traffic_controller.lights[d]['timer']) for d in ['N', 'S', 'E', 'W']}
-                timer_update_elapsed = 0
-                continue
-            
-            # Check if colors changed or 1 second passed
-            current_colors = {d: self.simulator.traffic_controller.lights[d]['color'] for d in ['N', 'S', 'E', 'W']}
-            current_displayed_timers = {d: int(self.simulator.traffic_controller.lights[d]['timer']) for d in ['N', 'S', 'E', 'W']}
-            
-            colors_changed = current_colors != last_colors
-            should_update_timers = timer_update_elapsed >= 1.0
-            
-            if colors_changed or should_update_timers:
-                # Update lights in current state
-                self.current_state["Lights"] = self.simulator.get_current_lights()
-                self.current_state["Reset"] = False
-                self.current_state["ServerTime"] = int(time.time() * 1000)
-                await self.broadcast(self.current_state)
+                now = loop.time()
+                LOOP_LAG_SECONDS.observe(max(0.0, now - wake_at))
+                self.advance(now - last_tick)
+                last_tick = now
+                while next_physics_tick <= now:
+                    next_physics_tick += 1.0 / self.physics_hz
                 
-                last_colors = current_colors
-                last_displayed_timers = current_displayed_timers
-                timer_update_elapsed = 0
+                # If interval elapsed, regenerate full state
+                if now >= next_interval:
+                    while next_interval <= now:
+                        next_interval += self.simulator.interval
+                    self.total_intervals += 1
+                    self.regenerate_state()
+                    event_name = self.current_state["Event"]["name"] if self.current_state["Event"] else "Normal"
+                    logger.info(f"New state: {event_name} traffic, {len(self.current_state['Vehicles'])} vehicles")
+                    await self.broadcast_snapshot()
+                else:
+                    # Send only the light records that changed, plus positions when due
+                    vehicles = None
+                    if physics and now >= next_vehicle_broadcast:
+                        while next_vehicle_broadcast <= now:
+                            next_vehicle_broadcast += 1.0 / self.vehicle_broadcast_hz
+                        vehicles = self.simulator.get_current_vehicles()
+                    await self.broadcast_lights(vehicles)
                 
-                if colors_changed:
+                current_colors = {d: controller.lights[d]['color'] for d in ['N', 'S', 'E', 'W']}
+                if current_colors != last_colors:
                     logger.info(f"Light change: {[(d, current_colors[d]) for d in ['N', 'S', 'E', 'W']]}")
+                    last_colors = current_colors
+                
+                if now >= next_checkpoint:
+                    next_checkpoint = now + self.checkpoint_interval
+                    self.schedule_checkpoint(next_interval - now)
+        except asyncio.CancelledError:
+            # Shutting down: save the latest state, unless a write is still in flight
+            if self.checkpoint_path and (self.checkpoint_write is None or self.checkpoint_write.done()):
+                self.write_checkpoint(self.checkpoint_state(next_interval - loop.time()))
+            raise
     
     async def init_app(self):
         """Initialize the aiohttp application."""
@@ -266,9 +1053,16 @@ class WebSocketServer:
     async def run(self):
         """Start the WebSocket server."""
         logger.info(f"Traffic server starting on http://{self.host}:{self.port}")
-        logger.info(f"State updates every {self.simulator.interval} seconds")
+        if self.simulator:
+            logger.info(f"State updates every {self.simulator.interval} seconds")
         logger.info(f"Max clients: {self.max_clients}")
-        logger.info(f"Rate limit: {self.rate_limit_max_connections} connections per {self.rate_limit_window}s per IP")
+        logger.info(f"WebSocket compression: {self.ws_compression}")
+        logger.info(f"Slow clients: {self.slow_client_policy} above {self.write_buffer_high} bytes buffered "
+                    f"or {self.max_client_lag} messages behind")
+        if self.rate_limit_enabled:
+            logger.info(f"Rate limit: {self.rate_limit_max_connections} connections per {self.rate_limit_window:g}s per IP")
+        else:
+            logger.warning("Rate limiting disabled (RATE_LIMIT_ENABLED=0)")
         
         if self.allowed_origins and self.allowed_origins != ['']:
             logger.info(f"Allowed origins: {self.allowed_origins}")
@@ -278,7 +1072,7 @@ class WebSocketServer:
         app = await self.init_app()
         runner = web.AppRunner(app)
         await runner.setup()
-        site = web.TCPSite(runner, self.host, self.port)
+        site = web.TCPSite(runner, self.host, self.port, reuse_port=self.reuse_port or None)
         await site.start()
         
         logger.info("Server ready!")
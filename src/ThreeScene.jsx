@@ -168,8 +168,30 @@ export default function ThreeScene() {
 
     let ws = null;
     let reconnectTimeout = null;
+    let lastSeq = -1;
+    let resyncPending = false; // A resync was requested; patches are stale until the snapshot arrives
+
+    // Snapshots replace every light; patches only carry the records that changed
+    const applyLights = (lights, packetServerTime, replace) => {
+      const newLocalLights = replace ? {} : { ...sceneDataRef.current.localLights };
+      const serverTime = packetServerTime || Date.now();
+      sceneDataRef.current.serverTimeAtLastPacket = serverTime;
+      sceneDataRef.current.clientPerfAtLastPacket = performance.now();
+
+      lights.forEach(light => {
+        const expiresAt = light.ExpiresAt || (serverTime + (light.Timer || 0) * 1000);
+        newLocalLights[light.Sens] = {
+          color: light.Couleur,
+          expiresAt,
+          lastUpdateTime: performance.now()
+        };
+      });
+      sceneDataRef.current.localLights = newLocalLights;
+    };
 
     const connect = () => {
+      lastSeq = -1;
+      resyncPending = false;
       ws = new WebSocket(wsUrl);
 
       ws.onopen = () => {
@@ -180,12 +202,31 @@ export default function ThreeScene() {
       ws.onmessage = (event) => {
         try {
           const data = JSON.parse(event.data);
-          sceneDataRef.current.simulationData = data;
           sceneDataRef.current.lastPacketTime = performance.now();
 
+          // Patches must follow the last message without a gap, otherwise ask for a fresh snapshot
+          if (data.Type === 'patch') {
+            if (resyncPending) return;
+            if (data.Seq !== lastSeq + 1) {
+              resyncPending = true;
+              ws.send(JSON.stringify({ Type: 'resync' }));
+              return;
+            }
+            lastSeq = data.Seq;
+            applyLights(data.Lights, data.ServerTime, false);
+            return;
+          }
+
+          if (data.Seq !== undefined) lastSeq = data.Seq;
+          if (data.Type === 'snapshot') resyncPending = false;
+          sceneDataRef.current.simulationData = data;
+
           if (data.Vehicles) {
             if (data.Reset === true) {
+              // Keep vehicles still present in the snapshot (resync within the same interval)
+              const snapshotIds = new Set(data.Vehicles.map(v => v.Id));
               Object.values(sceneDataRef.current.localVehicles).forEach(v => {
+                if (snapshotIds.has(v.Id)) return;
                 v.fading = true;
                 v.fadeStart = performance.now();
               });
@@ -248,20 +289,7 @@ export default function ThreeScene() {
           }
 
           if (data.Lights) {
-            const newLocalLights = {};
-            const serverTime = data.ServerTime || Date.now();
-            sceneDataRef.current.serverTimeAtLastPacket = serverTime;
-            sceneDataRef.current.clientPerfAtLastPacket = performance.now();
-
-            data.Lights.forEach(light => {
-              const expiresAt = light.ExpiresAt || (serverTime + (light.Timer || 0) * 1000);
-              newLocalLights[light.Sens] = {
-                color: light.Couleur,
-                expiresAt,
-                lastUpdateTime: performance.now()
-              };
-            });
-            sceneDataRef.current.localLights = newLocalLights;
+            applyLights(data.Lights, data.ServerTime, true);
           }
 
           if (data.Event) {
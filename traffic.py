@@ -5,18 +5,32 @@ This is the main entry point for the traffic simulation server.
 It imports and runs the modular components:
 - traffic_simulation.py: Traffic lights, vehicle generation, state management
 - server.py: WebSocket server, security, rate limiting, broadcasting
+- bus.py: optional multi-process mode (simulator + broadcaster workers)
+- recorder.py: optional state recording and replay of recorded history
+- checkpoint.py: optional periodic simulation checkpoints, restored on startup
 
 Usage:
     python traffic.py
+    WORKERS=4 python traffic.py   # simulator process + 4 broadcaster workers
+    RECORD_PATH=traffic.log python traffic.py   # also record every broadcast message
+    REPLAY_PATH=traffic.log python traffic.py   # serve recorded history (?from=<ms>&speed=<1-100>)
+    SIGNAL_CONTROL=actuated python traffic.py   # size green phases from live demand
+    DEMAND_MODEL=platoon python traffic.py   # time-of-day OD demand (poisson or platoon arrivals)
+    RUNTIME_PROFILE=fast python traffic.py   # uvloop and orjson, when installed
+    CHECKPOINT_PATH=traffic.checkpoint.json python traffic.py   # resume from the last checkpoint on restart
 """
 
-import asyncio
 import logging
 import os
+import time
 from dotenv import load_dotenv
 
-from traffic_simulation import TrafficSimulator
+from demand import make_demand
+from traffic_simulation import ActuatedLightController, TrafficLightController, TrafficSimulator
 from server import WebSocketServer
+from bus import run_cluster
+from recorder import ReplayServer, StateRecorder
+import runtime
 
 # Load environment variables from .env file
 load_dotenv()
@@ -41,19 +55,44 @@ async def main():
     # Configuration
     host = "0.0.0.0"
     port = int(os.environ.get("PORT", 8000))
-    interval = 60  # seconds per state update
+    interval = int(os.environ.get("INTERVAL", 60))  # seconds per state update
+    physics = os.environ.get("SERVER_PHYSICS", "0") == "1"  # server-side vehicle physics
+    actuated = os.environ.get("SIGNAL_CONTROL", "fixed") == "actuated"  # demand-driven green times
+    demand_model = os.environ.get("DEMAND_MODEL", "classic")  # classic, poisson or platoon
+    now = time.localtime()
+    start_hour = float(os.environ.get("DEMAND_START_HOUR", now.tm_hour + now.tm_min / 60))  # profile clock
+    workers = int(os.environ.get("WORKERS", 0))  # broadcaster processes (0 = single process)
+    bus_path = os.environ.get("STATE_BUS_PATH", "/tmp/traffic-state-bus.sock")
+    record_path = os.environ.get("RECORD_PATH")  # append every broadcast message to this log
+    replay_path = os.environ.get("REPLAY_PATH")  # serve this log instead of simulating
+    
+    if replay_path:
+        await ReplayServer(replay_path, host=host, port=port).run()
+        return
     
     # Create simulator
-    simulator = TrafficSimulator(interval=interval)
+    controller = ActuatedLightController() if actuated else TrafficLightController()
+    simulator = TrafficSimulator(interval=interval, physics=physics, controller=controller,
+                                 demand=make_demand(demand_model, start_hour=start_hour))
+    
+    if workers > 0:
+        await run_cluster(simulator, host, port, workers, bus_path, record_path)
+        return
     
     # Create and run server
     server = WebSocketServer(simulator, host=host, port=port)
-    await server.run()
+    if record_path:
+        server.recorder = StateRecorder(record_path, server.snapshot_payload)
+    try:
+        await server.run()
+    finally:
+        if server.recorder:
+            server.recorder.close()
 
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        runtime.run(main())
     except KeyboardInterrupt:
         logger.info("Server stopped by user")
     except Exception as e:
@@ -8,40 +8,92 @@ import time
 
 
 # ============================================================================
-#  RECORD BUILDERS
+#  RECORDS
 # ============================================================================
 
-def make_light(direction, color, timer):
-    """Light record: Sens (N/S/E/W), Couleur (RED/YELLOW/GREEN), Timer (seconds left).
-    Also includes TimerMs and ExpiresAt (epoch ms) so clients can interpolate smoothly."""
-    now_ms = int(time.time() * 1000)
-    timer = max(0.0, float(timer))
-    timer_ms = int(timer * 1000)
-    expires_at = now_ms + timer_ms
-    return {
-        "Sens": direction,
-        "Couleur": color,
-        "Timer": timer,
-        "TimerMs": timer_ms,
-        "ExpiresAt": expires_at
-    }
-
-
-def make_vehicle(id, direction, lane, position, speed):
-    """Vehicle record: Id, Sens, Voie (Lane1/Lane2), Position, Speed"""
-    return {
-        "Id": id,
-        "Sens": direction,
-        "Voie": f"Lane{lane}",
-        "Position": position,
-        "Speed": speed,
-        "Waiting": False
-    }
-
-
-def make_traffic(direction, flow, event=None):
-    """Traffic record: direction, flow (vehicles/min), optional event"""
-    return {"direction": direction, "flow": flow, "event": event}
+# The simulator works with these compact slotted records and only converts them
+# to wire dicts (see record_to_wire) when a message is serialized.
+
+class LightRecord:
+    """Light: direction, color, timer (seconds left), timer_ms and expires_at (epoch ms)."""
+    
+    __slots__ = ('direction', 'color', 'timer', 'timer_ms', 'expires_at')
+    
+    def __init__(self, direction, color, timer, now_ms):
+        timer = max(0.0, float(timer))
+        self.direction = direction
+        self.color = color
+        self.timer = timer
+        self.timer_ms = int(timer * 1000)
+        self.expires_at = now_ms + self.timer_ms
+    
+    def to_wire(self):
+        return {
+            "Sens": self.direction,
+            "Couleur": self.color,
+            "Timer": self.timer,
+            "TimerMs": self.timer_ms,
+            "ExpiresAt": self.expires_at
+        }
+
+
+class VehicleRecord:
+    """Vehicle: id, direction, lane (1/2), position, speed, waiting."""
+    
+    __slots__ = ('id', 'direction', 'lane', 'position', 'speed', 'waiting')
+    
+    def __init__(self, id, direction, lane, position, speed, waiting=False):
+        self.id = id
+        self.direction = direction
+        self.lane = lane
+        self.position = position
+        self.speed = speed
+        self.waiting = waiting
+    
+    def to_wire(self):
+        return {
+            "Id": self.id,
+            "Sens": self.direction,
+            "Voie": f"Lane{self.lane}",
+            "Position": self.position,
+            "Speed": self.speed,
+            "Waiting": self.waiting
+        }
+    
+    @classmethod
+    def from_wire(cls, wire):
+        return cls(wire["Id"], wire["Sens"], int(wire["Voie"].removeprefix("Lane")), wire["Position"],
+                   wire["Speed"], wire.get("Waiting", False))
+
+
+class TrafficRecord:
+    """Traffic: direction, flow (vehicles/min), optional event."""
+    
+    __slots__ = ('direction', 'flow', 'event')
+    
+    def __init__(self, direction, flow, event=None):
+        self.direction = direction
+        self.flow = flow
+        self.event = event
+    
+    def to_wire(self):
+        return {"direction": self.direction, "flow": self.flow, "event": self.event}
+    
+    @classmethod
+    def from_wire(cls, wire):
+        return cls(wire["direction"], wire["flow"], wire["event"])
+
+
+def record_to_wire(record):
+    """json.dumps default hook: convert a compact record to its wire dict."""
+    if isinstance(record, (LightRecord, VehicleRecord, TrafficRecord)):
+        return record.to_wire()
+    raise TypeError(f"Object of type {type(record).__name__} is not JSON serializable")
+
+
+def now_ms():
+    """Current wall-clock time in epoch milliseconds."""
+    return int(time.time() * 1000)
 
 
 # ============================================================================
@@ -51,16 +103,18 @@ def make_traffic(direction, flow, event=None):
 class TrafficLightController:
     """Manages traffic light states with proper transitions."""
     
-    def __init__(self):
+    demand_driven = False  # Fixed-time plan: per-direction demand is not used
+    
+    def __init__(self, green_duration=30, yellow_duration=3):
         # Initial state: N/S green, E/W red
         self.lights = {
-            'N': {'color': 'GREEN', 'timer': 30},
-            'S': {'color': 'GREEN', 'timer': 30},
-            'E': {'color': 'RED', 'timer': 30},
-            'W': {'color': 'RED', 'timer': 30},
+            'N': {'color': 'GREEN', 'timer': green_duration},
+            'S': {'color': 'GREEN', 'timer': green_duration},
+            'E': {'color': 'RED', 'timer': green_duration},
+            'W': {'color': 'RED', 'timer': green_duration},
         }
-        self.green_duration = 30  # seconds
-        self.yellow_duration = 3   # seconds
+        self.green_duration = green_duration  # seconds
+        self.yellow_duration = yellow_duration  # seconds
     
     def update(self, dt):
         """Update all lights by dt seconds. Returns list of light records."""
@@ -68,40 +122,175 @@ class TrafficLightController:
         for direction in self.lights:
             self.lights[direction]['timer'] -= dt
         
-        # Check for transitions (use N as reference for N/S pair, E for E/W pair)
-        self._check_transition('N', 'S', 'E', 'W')
-        self._check_transition('E', 'W', 'N', 'S')
+        # Check for transitions (use N as reference for N/S pair, E for E/W pair).
+        # Loop so a large dt (e.g. a late wake-up) walks through every phase it skipped.
+        while (self._check_transition('N', 'S', 'E', 'W') or
+               self._check_transition('E', 'W', 'N', 'S')):
+            pass
         
         # Return current state as records
+        return self.records()
+    
+    def records(self):
+        """Light records for all four directions, sharing one timestamp."""
+        timestamp_ms = now_ms()
         return [
-            make_light(d, self.lights[d]['color'], max(0, self.lights[d]['timer']))
+            LightRecord(d, self.lights[d]['color'], self.lights[d]['timer'], timestamp_ms)
             for d in ['N', 'S', 'E', 'W']
         ]
     
+    def time_to_transition(self):
+        """Seconds until the next color change."""
+        return max(0.0, min(self.lights['N']['timer'], self.lights['E']['timer']))
+    
+    def time_to_next_second(self):
+        """Seconds until the displayed (whole-second) timers next tick down."""
+        return min((max(0.0, light['timer']) % 1.0) or 1.0 for light in self.lights.values())
+    
     def _check_transition(self, dir1, dir2, opp1, opp2):
-        """Check and handle transition for a pair of lights."""
+        """Check and handle transition for a pair of lights. Returns True if a transition happened.
+        
+        Any overshoot past zero is carried into the next phase so timers do not drift.
+        """
         light = self.lights[dir1]
         
-        if light['timer'] <= 0:
-            if light['color'] == 'GREEN':
-                # GREEN -> YELLOW (3 seconds)
-                self.lights[dir1]['color'] = 'YELLOW'
-                self.lights[dir2]['color'] = 'YELLOW'
-                self.lights[dir1]['timer'] = self.yellow_duration
-                self.lights[dir2]['timer'] = self.yellow_duration
+        if light['timer'] > 0:
+            return False
+        
+        overshoot = light['timer']
+        
+        if light['color'] == 'GREEN':
+            # GREEN -> YELLOW (3 seconds)
+            self.lights[dir1]['color'] = 'YELLOW'
+            self.lights[dir2]['color'] = 'YELLOW'
+            self.lights[dir1]['timer'] = self.yellow_duration + overshoot
+            self.lights[dir2]['timer'] = self.yellow_duration + overshoot
+            return True
+        
+        if light['color'] == 'YELLOW':
+            # YELLOW -> RED, and opposite goes GREEN
+            green = self.green_time(opp1, opp2)
+            self.lights[dir1]['color'] = 'RED'
+            self.lights[dir2]['color'] = 'RED'
+            self.lights[dir1]['timer'] = green + self.yellow_duration + overshoot
+            self.lights[dir2]['timer'] = green + self.yellow_duration + overshoot
             
-            elif light['color'] == 'YELLOW':
-                # YELLOW -> RED, and opposite goes GREEN
-                self.lights[dir1]['color'] = 'RED'
-                self.lights[dir2]['color'] = 'RED'
-                self.lights[dir1]['timer'] = self.green_duration + self.yellow_duration
-                self.lights[dir2]['timer'] = self.green_duration + self.yellow_duration
-                
-                # Opposite pair goes green
-                self.lights[opp1]['color'] = 'GREEN'
-                self.lights[opp2]['color'] = 'GREEN'
-                self.lights[opp1]['timer'] = self.green_duration
-                self.lights[opp2]['timer'] = self.green_duration
+            # Opposite pair goes green
+            self.lights[opp1]['color'] = 'GREEN'
+            self.lights[opp2]['color'] = 'GREEN'
+            self.lights[opp1]['timer'] = green + overshoot
+            self.lights[opp2]['timer'] = green + overshoot
+            return True
+        
+        return False
+    
+    def green_time(self, dir1, dir2):
+        """Green duration for a pair that is about to turn green."""
+        return self.green_duration
+    
+    def checkpoint(self):
+        """Light colors and timers as plain data (see TrafficSimulator.checkpoint)."""
+        return {"lights": {d: dict(light) for d, light in self.lights.items()}}
+    
+    def restore(self, data):
+        """Take up the colors and timers saved by checkpoint(). Raises ValueError on unknown lights or colors."""
+        lights = {d: {'color': light['color'], 'timer': float(light['timer'])} for d, light in data["lights"].items()}
+        if set(lights) != set(self.lights) or any(light['color'] not in COLOR_NAMES for light in lights.values()):
+            raise ValueError(f"checkpoint lights are not one of {COLOR_NAMES} per direction: {data['lights']}")
+        self.lights = lights
+
+
+MIN_GREEN = 10       # seconds an actuated green always runs
+MAX_GREEN = 60       # seconds an actuated green may run at most
+GREEN_EXTENSION = 2  # seconds added at a time while the green approach still has demand
+
+
+class ActuatedLightController(TrafficLightController):
+    """Sizes and ends green phases from live per-direction demand.
+    
+    Each green starts at the pair's share of the cycle's green time
+    (2 * green_duration), bounded by min_green and max_green. While green, it is
+    extended in steps if a vehicle is in the detection zone when it would end, and
+    cut short (gap-out) once min_green has run, the pair's zones are empty and
+    vehicles are queued on the cross street. Detection is set by the simulator
+    with server-side physics: per direction, vehicles due at the stop line within
+    one extension at cruise speed, and vehicles queued at it. Without physics the
+    interval's flows stand in, which only size the split (extension and gap-out
+    need live detection).
+    """
+    
+    demand_driven = True
+    
+    def __init__(self, green_duration=30, yellow_duration=3, min_green=MIN_GREEN,
+                 max_green=MAX_GREEN, extension=GREEN_EXTENSION):
+        super().__init__(green_duration, yellow_duration)
+        self.min_green = min_green
+        self.max_green = max_green
+        self.extension = extension
+        self.demand = {d: 0 for d in ['N', 'S', 'E', 'W']}  # Vehicles in each detection zone (or planned flows)
+        self.queued = {d: 0 for d in ['N', 'S', 'E', 'W']}  # Vehicles queued at each stop line
+        self.live = False  # Whether demand comes from live detection
+        self.green_elapsed = 0.0  # seconds the current green pair has been green
+    
+    def set_demand(self, demand, live=True, queued=None):
+        """Update per-direction demand from {direction: count} mappings: demand is the
+        detection-zone count, queued the stop-line queue.
+        
+        live=False marks planning estimates (e.g. flows) that size greens but do not actuate them.
+        """
+        self.demand.update(demand)
+        if queued is not None:
+            self.queued.update(queued)
+        self.live = live
+    
+    def update(self, dt):
+        """Apply gap-out and extensions, then advance the lights as usual."""
+        for pair, cross in ((('N', 'S'), ('E', 'W')), (('E', 'W'), ('N', 'S'))):
+            if self.lights[pair[0]]['color'] == 'GREEN':
+                self._actuate(pair, cross, dt)
+        return super().update(dt)
+    
+    def _actuate(self, pair, cross, dt):
+        self.green_elapsed += dt
+        if not self.live:
+            return
+        served = sum(self.demand[d] for d in pair)
+        waiting = sum(self.queued[d] for d in cross)
+        remaining = self.lights[pair[0]]['timer']
+        
+        if self.green_elapsed >= self.min_green and served == 0 and waiting > 0:
+            # Gap-out: end this green within the current step
+            remaining = min(remaining, dt)
+        elif remaining <= dt and served > 0:
+            # Extend while vehicles keep reaching the detection zone, up to max_green
+            remaining += max(0.0, min(self.extension, self.max_green - self.green_elapsed))
+        else:
+            return
+        
+        for d in pair:
+            self.lights[d]['timer'] = remaining
+        for d in cross:
+            self.lights[d]['timer'] = remaining + self.yellow_duration
+    
+    def green_time(self, dir1, dir2):
+        """The pair's demand share of the cycle's green time, within min/max green."""
+        self.green_elapsed = 0.0
+        total = sum(self.demand.values())
+        share = (self.demand[dir1] + self.demand[dir2]) / total if total else 0.5
+        return min(self.max_green, max(self.min_green, 2 * self.green_duration * share))
+    
+    def checkpoint(self):
+        data = super().checkpoint()
+        data.update(demand=dict(self.demand), queued=dict(self.queued), live=self.live,
+                    green_elapsed=self.green_elapsed)
+        return data
+    
+    def restore(self, data):
+        super().restore(data)
+        self.demand.update(data["demand"])
+        self.queued.update(data["queued"])
+        self.live = data["live"]
+        self.green_elapsed = data["green_elapsed"]
 
 
 # ============================================================================
@@ -119,78 +308,251 @@ EVENTS = [
     None,  # Weight toward normal
 ]
 
+DIRECTIONS = ['N', 'S', 'E', 'W']
+COLOR_NAMES = ['GREEN', 'YELLOW', 'RED']
+GREEN, YELLOW, RED = 0, 1, 2  # Indices into COLOR_NAMES for array-based engines
+BASE_FLOW = 10  # vehicles/min per direction before event multiplier
+STOP_LINE = 64  # Keep consistent with frontend stop line
+MAX_NEAR = min(30, STOP_LINE - 5)
+MAX_VEHICLES_PER_DIRECTION = 6
+ENTRY_POSITION = -50  # Where vehicles enter an approach, at the edge of the scene
+INTERSECTION_POSITION = 50  # Position of the intersection center along an approach
+FAST_FORWARD_PHYSICS = 60  # Seconds of downtime replayed with vehicle physics on restore (the rest moves lights only)
+
 
 class TrafficSimulator:
     """Generates traffic states and manages simulation."""
     
-    def __init__(self, interval=60):
+    def __init__(self, interval=60, physics=False, seed=None, controller=None, events=None, demand=None):
         self.interval = interval  # seconds per state update
         self.vehicle_counter = 0
-        self.traffic_controller = TrafficLightController()
+        self.rng = random.Random(seed)  # Seeded for reproducible offline runs
+        self.events = EVENTS if events is None else events  # Events drawn from each interval
+        self.traffic_controller = controller or TrafficLightController()
+        
+        # Optional demand.DemandModel; without one each interval spawns a small batch near the stop line
+        self.demand = demand
+        self.clock = 0.0  # Simulated seconds of physics, the time base of pending arrivals
+        self.pending = None  # demand.Arrivals generated but not yet on the road (physics only)
+        
+        # Optional server-side vehicle physics (requires numpy)
+        self.physics = physics
+        self.vehicles = None
+        if physics:
+            from vehicle_physics import VehicleKinematics
+            self.vehicles = VehicleKinematics()
     
     def generate_state(self):
         """Generate a complete traffic state for the current interval."""
         # Pick random event (or None for normal traffic)
-        event = random.choice(EVENTS)
-        base_flow = 10
+        event = self.rng.choice(self.events)
         flow_mult = event["flow_mult"] if event else 1.0
         
+        # Get current light states from controller
+        lights = self.traffic_controller.records()
+        
+        if self.demand is not None:
+            traffic, vehicles = self._generate_arrivals(event, flow_mult)
+        else:
+            traffic, vehicles = self._generate_batch(event, flow_mult)
+        
+        if self.traffic_controller.demand_driven:
+            if self.physics:
+                self._update_demand()
+            else:
+                self.traffic_controller.set_demand({t.direction: t.flow for t in traffic}, live=False)
+        
+        return {
+            "Lights": lights,
+            "Vehicles": vehicles,
+            "Traffic": traffic,
+            "Event": event,
+            "Interval": self.interval,
+            "Reset": True,  # Signal to frontend to clear old vehicles
+            "ServerTime": now_ms()
+        }
+    
+    def _generate_batch(self, event, flow_mult):
+        """Classic demand: jittered flows and up to MAX_VEHICLES_PER_DIRECTION cars queued near each stop line."""
         # Traffic for each direction
         traffic = [
-            make_traffic("N", int(base_flow * flow_mult * random.uniform(0.8, 1.2)), event),
-            make_traffic("S", int(base_flow * flow_mult * random.uniform(0.8, 1.2)), event),
-            make_traffic("E", int(base_flow * flow_mult * random.uniform(0.8, 1.2)), event),
-            make_traffic("W", int(base_flow * flow_mult * random.uniform(0.8, 1.2)), event),
-        ]
-        
-        # Get current light states from controller
-        lights = [
-            make_light(d, self.traffic_controller.lights[d]['color'], 
-                       max(0, self.traffic_controller.lights[d]['timer']))
-            for d in ['N', 'S', 'E', 'W']
+            TrafficRecord("N", int(BASE_FLOW * flow_mult * self.rng.uniform(0.8, 1.2)), event),
+            TrafficRecord("S", int(BASE_FLOW * flow_mult * self.rng.uniform(0.8, 1.2)), event),
+            TrafficRecord("E", int(BASE_FLOW * flow_mult * self.rng.uniform(0.8, 1.2)), event),
+            TrafficRecord("W", int(BASE_FLOW * flow_mult * self.rng.uniform(0.8, 1.2)), event),
         ]
         
         # Vehicles: spawn based on flow
         vehicles = []
-        STOP_LINE = 64  # Keep consistent with frontend stop line
-        MAX_NEAR = min(30, STOP_LINE - 5)
-        MAX_VEHICLES_PER_DIRECTION = 6
         
         for t in traffic:
-            count = max(1, min(MAX_VEHICLES_PER_DIRECTION, int(t["flow"])))
-            nearest_pos = random.uniform(-10, MAX_NEAR)
+            count = max(1, min(MAX_VEHICLES_PER_DIRECTION, int(t.flow)))
+            nearest_pos = self.rng.uniform(-10, MAX_NEAR)
             
             for i in range(count):
                 self.vehicle_counter += 1
-                spacing = random.uniform(8, 15)
-                pos = max(nearest_pos - i * spacing, -50)
+                spacing = self.rng.uniform(8, 15)
+                pos = max(nearest_pos - i * spacing, ENTRY_POSITION)
                 
-                vehicles.append(make_vehicle(
+                vehicles.append(VehicleRecord(
                     id=self.vehicle_counter,
-                    direction=t["direction"],
+                    direction=t.direction,
                     lane=1,
                     position=pos,
-                    speed=random.uniform(8, 15)
+                    speed=self.rng.uniform(8, 15)
                 ))
         
-        return {
-            "Lights": lights,
-            "Vehicles": vehicles,
-            "Traffic": traffic,
-            "Event": event,
-            "Interval": self.interval,
-            "Reset": True,  # Signal to frontend to clear old vehicles
-            "ServerTime": int(time.time() * 1000)
-        }
+        if self.physics:
+            # New arrivals join the vehicles still driving from earlier intervals
+            self.vehicles.add(
+                [0] * len(vehicles),
+                [DIRECTIONS.index(v.direction) for v in vehicles],
+                [v.id for v in vehicles],
+                [v.position for v in vehicles],
+                [v.speed for v in vehicles]
+            )
+            vehicles = self.vehicles.records()
+        
+        return traffic, vehicles
+    
+    def _generate_arrivals(self, event, flow_mult):
+        """Draw the interval's arrivals from the demand model.
+        
+        With physics, arrivals wait in self.pending and enter the road at their
+        entry times (see _release_arrivals); otherwise the snapshot carries them all, placed upstream of
+        the scene edge by how far they still have to drive.
+        """
+        arrivals = self.demand.arrivals(self.interval, flow_mult, self.vehicle_counter + 1)
+        self.vehicle_counter += len(arrivals)
+        flows = arrivals.counts() * 60 / self.interval
+        traffic = [TrafficRecord(d, int(flows[i]), event) for i, d in enumerate(DIRECTIONS)]
+        
+        if self.physics:
+            arrivals.time += self.clock
+            self.pending = arrivals if self.pending is None else self.pending.merge(arrivals)
+            self._release_arrivals()
+            return traffic, self.vehicles.records()
+        
+        positions = ENTRY_POSITION - arrivals.speed * arrivals.time
+        vehicles = [
+            VehicleRecord(vehicle_id, DIRECTIONS[origin], 1, position, speed)
+            for vehicle_id, origin, position, speed in zip(
+                arrivals.id.tolist(), arrivals.origin.tolist(), positions.tolist(), arrivals.speed.tolist())
+        ]
+        return traffic, vehicles
+    
+    def _release_arrivals(self):
+        """Move pending arrivals whose entry time has passed onto the road at the scene edge.
+        
+        A queue backed up to the edge holds later arrivals back (spillback).
+        """
+        if self.pending is None or not len(self.pending):
+            return
+        entering, self.pending = self.pending.release(self.clock, self.vehicles.entry_clear(ENTRY_POSITION))
+        if len(entering):
+            self.vehicles.add(
+                [0] * len(entering),
+                entering.origin,
+                entering.id,
+                [ENTRY_POSITION] * len(entering),
+                entering.speed
+            )
     
     def update_lights(self, dt):
         """Update traffic light controller."""
         self.traffic_controller.update(dt)
     
+    def update_vehicles(self, dt):
+        """Advance server-side vehicle physics, if enabled. Returns the number of vehicles that left."""
+        if not self.physics:
+            return 0
+        self.clock += dt
+        self._release_arrivals()
+        lights = self.traffic_controller.lights
+        colors = [[COLOR_NAMES.index(lights[d]['color']) for d in DIRECTIONS]]
+        timers = [[max(0, lights[d]['timer']) for d in DIRECTIONS]]
+        exited = self.vehicles.step(dt, colors, timers)
+        if self.traffic_controller.demand_driven:
+            self._update_demand()
+        return exited
+    
+    def _update_demand(self):
+        """Feed vehicles approaching each stop line to a demand-driven controller."""
+        arriving, queued = self.vehicles.detector_counts(self.traffic_controller.extension)
+        self.traffic_controller.set_demand(dict(zip(DIRECTIONS, arriving.tolist())),
+                                           queued=dict(zip(DIRECTIONS, queued.tolist())))
+    
+    def get_current_vehicles(self):
+        """Get current vehicle records (server-side physics only)."""
+        return self.vehicles.records() if self.physics else []
+    
+    def time_to_next_light_event(self):
+        """Seconds until the next light transition or displayed-second tick."""
+        return min(self.traffic_controller.time_to_transition(),
+                   self.traffic_controller.time_to_next_second())
+    
     def get_current_lights(self):
         """Get current light states."""
-        return [
-            make_light(d, self.traffic_controller.lights[d]['color'], 
-                       max(0, self.traffic_controller.lights[d]['timer']))
-            for d in ['N', 'S', 'E', 'W']
-        ]
+        return self.traffic_controller.records()
+    
+    # ------------------------------------------------------------------------
+    #  Checkpoints
+    # ------------------------------------------------------------------------
+    
+    def config(self):
+        """The settings a checkpoint only makes sense under; restore() refuses any other."""
+        return {
+            "interval": self.interval,
+            "physics": self.physics,
+            "controller": type(self.traffic_controller).__name__,
+            "demand": type(self.demand).__name__ if self.demand is not None else None,
+        }
+    
+    def checkpoint(self):
+        """Everything needed to carry on this simulation, as JSON-serializable data."""
+        version, internal, gauss = self.rng.getstate()
+        return {
+            "config": self.config(),
+            "vehicle_counter": self.vehicle_counter,
+            "rng": [version, list(internal), gauss],
+            "clock": self.clock,
+            "lights": self.traffic_controller.checkpoint(),
+            "vehicles": self.vehicles.checkpoint() if self.physics else None,
+            "pending": self.pending.checkpoint() if self.pending is not None else None,
+            "demand": self.demand.checkpoint() if self.demand is not None else None,
+        }
+    
+    def restore(self, data):
+        """Carry on from checkpoint() data. Raises ValueError if it was taken under another config()."""
+        if data["config"] != self.config():
+            raise ValueError(f"checkpoint was taken with {data['config']}, not {self.config()}")
+        version, internal, gauss = data["rng"]
+        self.rng.setstate((version, tuple(internal), gauss))
+        self.vehicle_counter = data["vehicle_counter"]
+        self.clock = data["clock"]
+        self.traffic_controller.restore(data["lights"])
+        if self.physics:
+            from demand import Arrivals
+            self.vehicles.restore(data["vehicles"])
+            self.pending = Arrivals.from_checkpoint(data["pending"]) if data["pending"] is not None else None
+        if self.demand is not None:
+            self.demand.restore(data["demand"])
+    
+    def fast_forward(self, seconds, physics_step, physics_limit=FAST_FORWARD_PHYSICS):
+        """Catch up on seconds of downtime: the lights and the demand model's time of day
+        run through all of it, vehicle physics (in physics_step steps) through the last
+        physics_limit seconds at most, since traffic long gone would only be replayed to be
+        thrown away."""
+        if seconds <= 0:
+            return
+        if self.demand is not None:
+            self.demand.skip(seconds)
+        replay = min(seconds, physics_limit) if self.physics else 0
+        self.update_lights(seconds - replay)
+        steps = int(replay / physics_step)
+        for _ in range(steps):
+            self.update_lights(physics_step)
+            self.update_vehicles(physics_step)
+        if replay > steps * physics_step:
+            self.update_lights(replay - steps * physics_step)
+            self.update_vehicles(replay - steps * physics_step)
@@ -0,0 +1,193 @@
+"""
+Server-side Vehicle Physics
+Vectorized port of the straight-line rules in src/scene/VehiclePhysics.js:
+car-following, stopping at red/yellow lights and discharge on green,
+applied to every vehicle at once over structure-of-arrays storage
+"""
+
+import numpy as np
+
+from traffic_simulation import DIRECTIONS, GREEN, INTERSECTION_POSITION, VehicleRecord
+
+
+# ============================================================================
+#  PHYSICS CONSTANTS
+# ============================================================================
+
+# Keep in sync with PHYSICS in src/utils/Constants.js
+PHYSICS = {
+    "STOP_LINE": 35,             # Position where cars should stop
+    "SAFE_DISTANCE": 4,          # Minimum distance between cars
+    "STOPPING_BUFFER": 2,        # Extra buffer to start stopping
+    "SCENE_BOUNDARY": 140,       # Distance from center to remove vehicles (edge of scene)
+    "LIGHT_ZONE_RADIUS": 50,     # Radius around traffic light where stopping rules apply
+}
+
+EXIT_POSITION = INTERSECTION_POSITION + PHYSICS["SCENE_BOUNDARY"]
+
+ACCELERATION = 15          # Speed gained per second when free to move
+BRAKING = 15               # Speed lost per second when stopping
+HARD_BRAKING = 20          # Used within 5 units of the stop target
+PLANNING_DECELERATION = 25 # Assumed deceleration when deciding whether to stop
+COMMIT_TIME = 1.0          # Seconds left on yellow/red below which a close car goes through
+COMMIT_DISTANCE = 10       # Distance from the stop line within which a car may commit
+
+
+# ============================================================================
+#  VEHICLE KINEMATICS
+# ============================================================================
+
+class VehicleKinematics:
+    """Structure-of-arrays vehicle storage advanced with array operations.
+
+    Arrays are kept sorted by intersection so one intersection's vehicles are a
+    contiguous slice. `speed` is the current speed; `desired_speed` is the cruise
+    speed sent to clients as the record's Speed.
+    """
+
+    FIELDS = ('intersection', 'direction', 'id', 'position', 'speed', 'desired_speed', 'waiting')
+
+    def __init__(self):
+        self.intersection = np.zeros(0, dtype=np.int64)
+        self.direction = np.zeros(0, dtype=np.int8)
+        self.id = np.zeros(0, dtype=np.int64)
+        self.position = np.zeros(0)
+        self.speed = np.zeros(0)
+        self.desired_speed = np.zeros(0)
+        self.waiting = np.zeros(0, dtype=bool)
+
+    def __len__(self):
+        return self.id.size
+
+    def replace(self, intersection, direction, ids, position, desired_speed):
+        """Discard all vehicles and store a new batch (which must be sorted by intersection)."""
+        self.intersection = np.asarray(intersection, dtype=np.int64)
+        self.direction = np.asarray(direction, dtype=np.int8)
+        self.id = np.asarray(ids, dtype=np.int64)
+        self.position = np.asarray(position, dtype=np.float64)
+        self.desired_speed = np.asarray(desired_speed, dtype=np.float64)
+        self.speed = self.desired_speed.copy()
+        self.waiting = np.zeros(self.id.size, dtype=bool)
+
+    def add(self, intersection, direction, ids, position, desired_speed):
+        """Append a batch of vehicles, entering at their cruise speed."""
+        batch = VehicleKinematics()
+        batch.replace(intersection, direction, ids, position, desired_speed)
+        for field in self.FIELDS:
+            setattr(self, field, np.concatenate([getattr(self, field), getattr(batch, field)]))
+        self._reorder(np.argsort(self.intersection, kind='stable'))
+
+    def checkpoint(self):
+        """Every field as a plain list, for a JSON checkpoint."""
+        return {field: getattr(self, field).tolist() for field in self.FIELDS}
+
+    def restore(self, data):
+        """Take up the vehicles saved by checkpoint(), keeping each field's dtype.
+        Raises ValueError if the fields do not all hold one value per vehicle."""
+        fields = {field: np.asarray(data[field], dtype=getattr(self, field).dtype) for field in self.FIELDS}
+        if len({values.shape for values in fields.values()}) != 1 or fields['id'].ndim != 1:
+            raise ValueError("checkpoint vehicle fields differ in length")
+        for field, values in fields.items():
+            setattr(self, field, values)
+
+    def _reorder(self, order):
+        for field in self.FIELDS:
+            setattr(self, field, getattr(self, field)[order])
+
+    def step(self, dt, colors, timers):
+        """Advance every vehicle by dt seconds. Returns how many vehicles left the scene.
+
+        colors: light color index per intersection and direction, shape (n, 4)
+        timers: seconds until each of those lights changes, shape (n, 4)
+        (nested lists are accepted for a single intersection)
+        """
+        count = len(self)
+        if count == 0:
+            return 0
+
+        stop_line = PHYSICS["STOP_LINE"]
+        safe_distance = PHYSICS["SAFE_DISTANCE"]
+        stopping_buffer = PHYSICS["STOPPING_BUFFER"]
+
+        # Order vehicles lane by lane, front-most first, so each car's leader is the previous one
+        lane = self.intersection * len(DIRECTIONS) + self.direction
+        order = np.lexsort((-self.position, lane))
+        self._reorder(order)
+        lane = lane[order]
+        position = self.position
+        speed = self.speed
+
+        has_leader = np.zeros(count, dtype=bool)
+        has_leader[1:] = lane[1:] == lane[:-1]
+        leader_position = np.empty(count)
+        leader_position[0] = np.inf
+        leader_position[1:] = position[:-1]
+
+        # Car-following: stop behind the car ahead
+        following = has_leader & (leader_position - position < safe_distance + stopping_buffer)
+
+        # Lights: stop at the line on red/yellow unless already committed to going through
+        color = np.asarray(colors)[self.intersection, self.direction]
+        remaining = np.asarray(timers)[self.intersection, self.direction]
+        in_light_zone = np.abs(position - INTERSECTION_POSITION) < PHYSICS["LIGHT_ZONE_RADIUS"]
+        committed = (remaining <= COMMIT_TIME) & (position >= stop_line - COMMIT_DISTANCE)
+        stopping_distance = speed ** 2 / (2 * PLANNING_DECELERATION)
+        at_light = (
+            ~following & in_light_zone & (color != GREEN) & (position < stop_line) & ~committed
+            & (position + stopping_distance >= stop_line - stopping_buffer)
+        )
+
+        stopping = following | at_light
+        distance_to_stop = np.where(following, leader_position - safe_distance, stop_line) - position
+        braking = np.where(distance_to_stop < 5, HARD_BRAKING, BRAKING)
+        braked = np.where(distance_to_stop < 0.5, 0.0, np.maximum(0.0, speed - braking * dt))
+        accelerated = np.minimum(self.desired_speed, speed + ACCELERATION * dt)
+
+        self.speed = np.where(stopping, braked, accelerated)
+        self.waiting = stopping
+        self.position = position + self.speed * dt
+
+        # Remove vehicles that have left the scene
+        exited = self.position > EXIT_POSITION
+        num_exited = int(np.count_nonzero(exited))
+        if num_exited:
+            self._reorder(~exited)
+        return num_exited
+
+    def detector_counts(self, passage_time, intersection=0):
+        """Stop-line detection per direction, as (arriving, queued) counts.
+
+        arriving: vehicles short of the stop line that would reach it within
+        passage_time seconds at their cruise speed (a detection zone next to the line);
+        queued: vehicles short of the line that are stopped or stopping in its queue.
+        """
+        span = self.vehicle_slice(intersection)
+        to_line = PHYSICS["STOP_LINE"] - self.position[span]
+        before_line = to_line > 0
+        arriving = before_line & (to_line <= passage_time * self.desired_speed[span])
+        queued = before_line & self.waiting[span]
+        direction = self.direction[span]
+        return (np.bincount(direction[arriving], minlength=len(DIRECTIONS)),
+                np.bincount(direction[queued], minlength=len(DIRECTIONS)))
+
+    def entry_clear(self, entry, intersection=0):
+        """Per direction, whether a vehicle entering at position entry has room behind the last car."""
+        span = self.vehicle_slice(intersection)
+        rearmost = np.full(len(DIRECTIONS), np.inf)
+        np.minimum.at(rearmost, self.direction[span], self.position[span])
+        return rearmost >= entry + PHYSICS["SAFE_DISTANCE"] + PHYSICS["STOPPING_BUFFER"]
+
+    def vehicle_slice(self, intersection):
+        """Index range of one intersection's vehicles."""
+        start, stop = np.searchsorted(self.intersection, [intersection, intersection + 1])
+        return slice(int(start), int(stop))
+
+    def records(self, intersection=0):
+        """Vehicle records for one intersection."""
+        span = self.vehicle_slice(intersection)
+        return [
+            VehicleRecord(vehicle_id, DIRECTIONS[direction], 1, position, speed, waiting)
+            for vehicle_id, direction, position, speed, waiting in zip(
+                self.id[span].tolist(), self.direction[span].tolist(), self.position[span].tolist(),
+                self.desired_speed[span].tolist(), self.waiting[span].tolist())
+        ]